@@ -0,0 +1,76 @@
+"""
+Checkout latency by cart size: the old per-line Sale.add + Product.update_quantity
+loop versus models.transactions.checkout(). Backups, restore points and the
+change journal go to a temp folder.
+
+    python benchmarks/bench_checkout.py [--runs 5] [--sales 20000]
+"""
+import argparse
+import os
+import sqlite3
+import time
+
+from common import create_schema, seed, temp_db_path, print_table
+import db.database as database
+
+
+def setup(args):
+    path = temp_db_path()
+    conn = sqlite3.connect(path)
+    create_schema(conn)
+    seed(conn, n_products=args.products, n_sales=args.sales)
+    conn.execute("UPDATE products SET quantity = 1000000")
+    conn.commit()
+    conn.close()
+
+    database.DB_PATH = path
+    import utils.backup as backup
+    import utils.backup_store as backup_store
+    import utils.change_journal as change_journal
+    # Restore points and journal state go next to the synthetic DB, never into backups/
+    folder = os.path.join(os.path.dirname(path), "backups")
+    backup.DB_PATH = path
+    backup.BACKUP_DIR = folder
+    backup_store._store = backup_store.BackupStore(os.path.join(folder, "store"))
+    change_journal._journal = change_journal.Journal(os.path.join(folder, "journal"))
+
+
+def legacy_checkout(cart):
+    from models.product import Product
+    from models.sale import Sale
+    from models.transactions import create_transaction, finalize_transaction
+
+    transaction_id = create_transaction()
+    for item in cart:
+        product = Product.get_by_id(item["product_id"])
+        Sale.add(product_id=product.id, quantity_sold=item["quantity"], transaction_id=transaction_id)
+        Product.update_quantity(product.id, product.quantity - item["quantity"])
+    return finalize_transaction(transaction_id)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--products", type=int, default=500)
+    parser.add_argument("--sales", type=int, default=20000)
+    args = parser.parse_args()
+    setup(args)
+
+    from models.transactions import checkout
+
+    rows = []
+    for lines in (1, 5, 10, 25):
+        cart = [{"product_id": i + 1, "quantity": 1} for i in range(lines)]
+        timings = {}
+        for name, fn in (("legacy", legacy_checkout), ("checkout", checkout)):
+            start = time.perf_counter()
+            for _ in range(args.runs):
+                fn(cart)
+            timings[name] = (time.perf_counter() - start) / args.runs * 1000
+        rows.append([lines, f"{timings['legacy']:.1f}", f"{timings['checkout']:.1f}",
+                     f"{timings['legacy'] / timings['checkout']:.1f}x"])
+    print_table(["cart lines", "legacy ms", "checkout ms", "speedup"], rows)
+
+
+if __name__ == "__main__":
+    main()
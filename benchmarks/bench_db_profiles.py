@@ -0,0 +1,134 @@
+"""
+Compare the SQLite performance profiles from db/database.py against the
+old default connection (rollback journal, synchronous=FULL).
+
+    python benchmarks/bench_db_profiles.py [--checkouts 200] [--sales 50000]
+
+Workloads:
+  checkout  - a 5-line sale done the current way (one commit per statement)
+  dashboard - the queries Dashboard.update_overview/refresh_chart run
+  mixed     - checkout writer + dashboard reader threads at the same time
+"""
+import argparse
+import sqlite3
+import threading
+import time
+
+from common import create_schema, seed, temp_db_path, print_table
+from db.database import PERFORMANCE_PROFILES, apply_profile
+
+DASHBOARD_QUERIES = [
+    "SELECT id, name, category, quantity, price, cost_price FROM products",
+    """SELECT sales.id, products.name, sales.quantity_sold, sales.total_price, sales.profit, sales.timestamp
+       FROM sales JOIN products ON sales.product_id = products.id ORDER BY sales.timestamp DESC""",
+    """SELECT s.product_id, p.name, SUM(s.quantity_sold) AS total_qty, SUM(s.total_price)
+       FROM sales s JOIN products p ON s.product_id = p.id GROUP BY s.product_id ORDER BY total_qty DESC LIMIT 1""",
+    "SELECT SUM(profit) FROM sales",
+    """SELECT p.name, SUM(s.quantity_sold) AS total_quantity FROM sales s JOIN products p ON s.product_id = p.id
+       GROUP BY p.id ORDER BY total_quantity DESC""",
+]
+
+
+def connect(path, profile):
+    conn = sqlite3.connect(path, timeout=10, check_same_thread=False)
+    if profile != "default":
+        apply_profile(conn, profile)
+    return conn
+
+
+def checkout(conn, n_products, i, lines=5):
+    cur = conn.cursor()
+    cur.execute("INSERT INTO transactions (timestamp, grand_total) VALUES (datetime('now'), 0)")
+    tid = cur.lastrowid
+    conn.commit()
+    for line in range(lines):
+        pid = (i * lines + line) % n_products + 1
+        cur.execute(
+            "INSERT INTO sales (product_id, product_name, quantity_sold, total_price, profit, timestamp, transaction_id) "
+            "VALUES (?, ?, 1, 1000, 200, datetime('now'), ?)", (pid, f"Product {pid}", tid))
+        conn.commit()
+        cur.execute("UPDATE products SET quantity = quantity - 1 WHERE id = ?", (pid,))
+        conn.commit()
+    cur.execute("UPDATE transactions SET grand_total = "
+                "(SELECT SUM(total_price) FROM sales WHERE transaction_id = ?) WHERE id = ?", (tid, tid))
+    conn.commit()
+
+
+def dashboard(conn):
+    for sql in DASHBOARD_QUERIES:
+        conn.execute(sql).fetchall()
+
+
+def run_profile(profile, args):
+    path = temp_db_path(f"{profile}.db")
+    setup = connect(path, profile)
+    create_schema(setup)
+    seed(setup, n_products=args.products, n_sales=args.sales)
+    setup.close()
+
+    conn = connect(path, profile)
+    start = time.perf_counter()
+    for i in range(args.checkouts):
+        checkout(conn, args.products, i)
+    write_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(args.reads):
+        dashboard(conn)
+    read_s = time.perf_counter() - start
+    conn.close()
+
+    # Mixed: one writer, one reader, count lock failures
+    errors = [0]
+    stop = threading.Event()
+    reads_done = [0]
+
+    def reader():
+        rconn = connect(path, profile)
+        while not stop.is_set():
+            try:
+                dashboard(rconn)
+                reads_done[0] += 1
+            except sqlite3.OperationalError:
+                errors[0] += 1
+        rconn.close()
+
+    wconn = connect(path, profile)
+    t = threading.Thread(target=reader)
+    t.start()
+    start = time.perf_counter()
+    for i in range(args.checkouts):
+        try:
+            checkout(wconn, args.products, i)
+        except sqlite3.OperationalError:
+            errors[0] += 1
+            wconn.rollback()
+    mixed_s = time.perf_counter() - start
+    stop.set()
+    t.join()
+    wconn.close()
+
+    return [
+        profile,
+        f"{args.checkouts / write_s:,.0f}",
+        f"{args.reads / read_s:,.1f}",
+        f"{args.checkouts / mixed_s:,.0f}",
+        reads_done[0],
+        errors[0],
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--checkouts", type=int, default=200)
+    parser.add_argument("--reads", type=int, default=20)
+    parser.add_argument("--products", type=int, default=500)
+    parser.add_argument("--sales", type=int, default=50000)
+    args = parser.parse_args()
+
+    rows = [run_profile(p, args) for p in ["default", *PERFORMANCE_PROFILES]]
+    print_table(["profile", "checkouts/s", "dashboards/s", "mixed checkouts/s", "mixed reads", "lock errors"], rows)
+
+
+if __name__ == "__main__":
+    main()
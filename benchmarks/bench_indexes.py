@@ -0,0 +1,90 @@
+"""
+Time each model query on a synthetic sales table before and after the
+index migrations (db/migrations.py, migrations 4 and 5).
+
+    python benchmarks/bench_indexes.py [--sales 1000000] [--repeat 3]
+"""
+import argparse
+import sqlite3
+import time
+from datetime import datetime
+
+from common import create_schema, seed, temp_db_path, print_table
+import db.database as database
+
+REPEAT_FAST = 200  # point lookups are too quick to time once
+
+
+def queries():
+    from models.product import Product
+    from models.sale import Sale
+    from models.transactions import get_transaction_details
+
+    def finalize_sum():
+        conn = database.get_connection()
+        conn.execute("SELECT COALESCE(SUM(total_price), 0) FROM sales WHERE transaction_id = ?",
+                     (12345,)).fetchone()
+        conn.close()
+
+    return [
+        ("finalize_transaction (sum)", finalize_sum, REPEAT_FAST),
+        ("get_transaction_details", lambda: get_transaction_details(12345), REPEAT_FAST),
+        ("Sale.get_sales_summary_per_product", Sale.get_sales_summary_per_product, 1),
+        ("Sale.get_best_selling_product", Sale.get_best_selling_product, 1),
+        ("Sale.get_all (sorted)", Sale.get_all, 1),
+        ("Sale.get_all_with_category", lambda: Sale.get_all_with_category("Drinks"), 1),
+        ("Sale.get_all_with_category (1 month)",
+         lambda: Sale.get_all_with_category(start=datetime(2024, 3, 1), end=datetime(2024, 4, 1)), 1),
+        ("Product.get_low_stock", Product.get_low_stock, REPEAT_FAST),
+    ]
+
+
+def time_all(repeat):
+    results = {}
+    for label, fn, inner in queries():
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for _ in range(inner):
+                fn()
+            best = min(best, (time.perf_counter() - start) / inner)
+        results[label] = best * 1000
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sales", type=int, default=1_000_000)
+    parser.add_argument("--products", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    path = temp_db_path()
+    conn = sqlite3.connect(path)
+    create_schema(conn)
+    print(f"Seeding {args.sales:,} sales...")
+    seed(conn, n_products=args.products, n_sales=args.sales)
+    conn.close()
+    database.DB_PATH = path
+
+    before = time_all(args.repeat)
+
+    from db.migrations import _add_sales_epoch, _create_indexes
+    conn = sqlite3.connect(path)
+    start = time.perf_counter()
+    _create_indexes(conn.cursor())
+    _add_sales_epoch(conn.cursor())
+    conn.commit()
+    conn.close()
+    print(f"Index migration took {time.perf_counter() - start:.1f}s")
+    database.close_all_connections()  # fresh connections see the new statistics
+
+    after = time_all(args.repeat)
+
+    rows = [[label, f"{before[label]:.2f}", f"{after[label]:.2f}", f"{before[label] / after[label]:.1f}x"]
+            for label in before]
+    print_table(["query", "before ms", "after ms", "speedup"], rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+"""
+Firebase sync against the local RTDB stand-in (utils/rtdb_server.py) over
+real HTTP/SSE, with optional simulated latency and bandwidth:
+
+  startup  sync_from_firebase() pulling N remote sales (+ N/20 products)
+  stream   remote edits to sales arriving on the listener and applied locally
+  push     full re-push of the N local sales (upload_sales)
+  changes  sync_to_firebase() after M local edits: only the outbox goes up
+
+    python benchmarks/bench_sync.py [--sizes 10000 100000 1000000] [--latency-ms 20]
+                                    [--bandwidth-kbps 0] [--stream-edits 2000] [--stream-mode row|field] [--local-edits 500]
+                                    [--phases startup stream push changes]
+"""
+import argparse
+import os
+import time
+from contextlib import redirect_stdout
+from datetime import datetime, timedelta
+
+from common import temp_db_path, print_table
+import db.database as database
+
+
+def remote_tree(n_sales, seed_ts):
+    """Products and sales as sync_products writes them to the RTDB."""
+    n_products = max(1, n_sales // 20)
+    start = datetime.now() - timedelta(days=60)
+    products = {
+        str(i): {"id": i, "name": f"Product {i}", "category": "Bench", "quantity": 100,
+                 "price": 150.0, "cost_price": 90.0, "last_updated": seed_ts}
+        for i in range(1, n_products + 1)
+    }
+    sales = {}
+    for i in range(1, n_sales + 1):
+        pid = i % n_products + 1
+        sales[str(i)] = {"id": i, "product_id": pid, "product_name": f"Product {pid}", "quantity_sold": 1,
+                         "total_price": 150.0, "profit": 60.0,
+                         "timestamp": (start + timedelta(seconds=i * 3)).strftime("%Y-%m-%d %H:%M:%S"),
+                         "transaction_id": None, "last_updated": seed_ts}
+    return {"products": products, "sales": sales}
+
+
+def fresh_local_db():
+    """Point the app at an empty migrated DB; backups/journal go next to it."""
+    from db.writer import stop_writer
+    import utils.backup as backup
+    import utils.backup_store as backup_store
+    import utils.change_journal as change_journal
+
+    stop_writer()
+    database.close_all_connections()
+    database._pool = database._read_pool = None   # pools keep the path they were opened with
+    path = temp_db_path()
+    folder = os.path.dirname(path)
+    database.DB_PATH = path
+    backup.BACKUP_DIR = os.path.join(folder, "backups")
+    backup_store._store = backup_store.BackupStore(os.path.join(folder, "backups", "store"))
+    change_journal._journal = change_journal.Journal(os.path.join(folder, "backups", "journal"))
+
+    from db.migrations import run_migrations, invalidate_schema
+    invalidate_schema()
+    run_migrations()
+
+
+def count_sales(min_ts=None):
+    conn = database.get_read_connection()
+    try:
+        if min_ts is None:
+            return conn.execute("SELECT COUNT(*) FROM sales").fetchone()[0]
+        return conn.execute("SELECT COUNT(*) FROM sales WHERE last_updated >= ?", (min_ts,)).fetchone()[0]
+    finally:
+        conn.close()
+
+
+def wait_for(predicate, timeout):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def stream_edits(server, edits, n_sales, timeout, mode="row"):
+    """
+    Seconds from the first remote edit until every edit is applied locally (None on timeout).
+    mode "row" rewrites whole sales; "field" sets quantity_sold, then last_updated, as two leaf writes.
+    """
+    import sync_products
+
+    sync_products.start_listeners()
+    try:
+        # Events arrive in order: once this marker sale is local, the initial snapshot is done
+        marker_ts = time.time() + 1000
+        server.db.write(["sales", str(n_sales + 1)], {
+            "id": n_sales + 1, "product_id": 1, "product_name": "Product 1", "quantity_sold": 1,
+            "total_price": 1.0, "profit": 0.0, "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "transaction_id": None, "last_updated": marker_ts})
+        if not wait_for(lambda: count_sales(marker_ts) == 1, timeout):
+            return None
+
+        edit_ts = marker_ts + 1
+        start = time.perf_counter()
+        for i in range(1, edits + 1):
+            if mode == "field":
+                server.db.write(["sales", str(i), "quantity_sold"], 2)
+                server.db.write(["sales", str(i), "last_updated"], edit_ts)
+                continue
+            sale = server.db.read(["sales", str(i)])
+            sale.update(quantity_sold=2, last_updated=edit_ts)
+            server.db.write(["sales", str(i)], sale)
+        if not wait_for(lambda: count_sales(edit_ts) >= edits, timeout):
+            return None
+        return time.perf_counter() - start
+    finally:
+        sync_products.stop_listeners()
+
+
+def local_edits(edits):
+    """Edit the first `edits` sales locally, as the UI would (the outbox triggers queue them)."""
+    from db.writer import execute_write
+    execute_write("UPDATE sales SET quantity_sold = quantity_sold + 1 WHERE id <= ?", (edits,)).result()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000],
+                        help="remote sales per run (e.g. 10000 100000 1000000)")
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--bandwidth-kbps", type=float, default=0, help="0 = unlimited")
+    parser.add_argument("--stream-edits", type=int, default=2000)
+    parser.add_argument("--stream-mode", choices=["row", "field"], default="row")
+    parser.add_argument("--local-edits", type=int, default=500)
+    parser.add_argument("--phases", nargs="+", default=["startup", "stream", "push", "changes"])
+    parser.add_argument("--timeout", type=float, default=600, help="per phase, seconds")
+    args = parser.parse_args()
+
+    from utils.local_rtdb import LocalRTDB
+    from utils.remote_db import set_remote_db
+    from utils.rtdb_rest import RestRTDB
+    from utils.rtdb_server import RTDBServer
+    import sync_products
+
+    rows = []
+    for size in args.sizes:
+        fresh_local_db()
+        tree = remote_tree(size, seed_ts=time.time())
+        server = RTDBServer(LocalRTDB(), latency_ms=args.latency_ms, bandwidth_kbps=args.bandwidth_kbps).start()
+        server.db.write([], tree)
+        set_remote_db(RestRTDB(server.url))
+        total_rows = size + len(tree["products"])
+        devnull = open(os.devnull, "w")   # sync prints a line per row
+        try:
+            if "startup" in args.phases:
+                start = time.perf_counter()
+                with redirect_stdout(devnull):
+                    sync_products.sync_from_firebase()
+                elapsed = time.perf_counter() - start
+                rows.append([size, "startup pull", total_rows, f"{elapsed:.2f}", f"{total_rows / elapsed:,.0f}"])
+            if "stream" in args.phases:
+                edits = min(args.stream_edits, size)
+                with redirect_stdout(devnull):
+                    elapsed = stream_edits(server, edits, size, args.timeout, args.stream_mode)
+                rows.append([size, "stream apply", edits, f"{elapsed:.2f}" if elapsed else "timeout",
+                             f"{edits / elapsed:,.0f}" if elapsed else "-"])
+            if "push" in args.phases:
+                local_rows = count_sales()
+                start = time.perf_counter()
+                with redirect_stdout(devnull):
+                    sync_products.upload_sales()
+                elapsed = time.perf_counter() - start
+                rows.append([size, "push", local_rows, f"{elapsed:.2f}", f"{local_rows / elapsed:,.0f}"])
+            if "changes" in args.phases:
+                edits = min(args.local_edits, size)
+                local_edits(edits)
+                queued = sync_products.outbox_size()
+                start = time.perf_counter()
+                with redirect_stdout(devnull):
+                    sync_products.sync_to_firebase()
+                elapsed = time.perf_counter() - start
+                rows.append([size, "changed push", queued, f"{elapsed:.2f}", f"{queued / elapsed:,.0f}"])
+        finally:
+            devnull.close()
+            server.stop()
+    print(f"latency {args.latency_ms:g} ms, bandwidth {args.bandwidth_kbps or 'unlimited'} kbps")
+    print_table(["remote sales", "phase", "rows", "seconds", "rows/s"], rows)
+
+
+if __name__ == "__main__":
+    main()
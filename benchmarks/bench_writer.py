@@ -0,0 +1,98 @@
+"""
+Sync-burst write throughput: several threads upserting directly, each with
+its own connection and commit (the old stream-handler pattern), versus the
+same upserts queued on the single writer (db/writer.py).
+
+    python benchmarks/bench_writer.py [--threads 3] [--rows 2000] [--profile durable]
+"""
+import argparse
+import sqlite3
+import threading
+import time
+
+from common import create_schema, temp_db_path, print_table
+import db.database as database
+
+UPSERT = """
+    INSERT INTO products (id, name, category, quantity, price, cost_price, last_updated)
+    VALUES (?, ?, 'Bench', ?, 100, 50, ?)
+    ON CONFLICT(id) DO UPDATE SET quantity=excluded.quantity, last_updated=excluded.last_updated
+"""
+
+
+def fresh_db():
+    path = temp_db_path()
+    conn = sqlite3.connect(path)
+    database.apply_profile(conn)
+    create_schema(conn)
+    conn.close()
+    return path
+
+
+def direct(path, threads, rows):
+    errors = [0]
+
+    def worker(t):
+        conn = sqlite3.connect(path, timeout=database.POOL_TIMEOUT)
+        database.apply_profile(conn)
+        for i in range(rows):
+            pid = t * rows + i + 1
+            try:
+                conn.execute(UPSERT, (pid, f"P{pid}", i, time.time()))
+                conn.commit()
+            except sqlite3.OperationalError:
+                errors[0] += 1
+                conn.rollback()
+        conn.close()
+
+    return run_threads(worker, threads), errors[0]
+
+
+def queued(path, threads, rows):
+    from db.writer import WriteQueue
+    writer = WriteQueue(path)
+    errors = [0]
+
+    def worker(t):
+        futures = [writer.execute(UPSERT, (t * rows + i + 1, f"P{t * rows + i + 1}", i, time.time()))
+                   for i in range(rows)]
+        for f in futures:
+            try:
+                f.result()
+            except sqlite3.OperationalError:
+                errors[0] += 1
+
+    elapsed = run_threads(worker, threads)
+    writer.stop()
+    return elapsed, errors[0]
+
+
+def run_threads(worker, n):
+    pool = [threading.Thread(target=worker, args=(t,)) for t in range(n)]
+    start = time.perf_counter()
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--threads", type=int, default=3)
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--profile", default=database.DB_PROFILE,
+                        help="durable shows group commit best (one fsync per batch)")
+    args = parser.parse_args()
+    database.DB_PROFILE = args.profile
+    total = args.threads * args.rows
+
+    rows = []
+    for name, fn in (("direct connections", direct), ("single writer", queued)):
+        elapsed, errors = fn(fresh_db(), args.threads, args.rows)
+        rows.append([name, f"{total / elapsed:,.0f}", f"{elapsed:.2f}", errors])
+    print_table(["mode", "upserts/s", "seconds", "lock errors"], rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""Shared helpers for the scripts in benchmarks/ (synthetic DBs + timing)."""
+import os
+import random
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+# Allow `python benchmarks/<script>.py` from the project root
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS products (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL,
+        category TEXT,
+        quantity INTEGER NOT NULL,
+        price REAL NOT NULL,
+        cost_price REAL NOT NULL DEFAULT 0,
+        supplier_name TEXT DEFAULT 'Unknown',
+        last_updated REAL DEFAULT 0
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS transactions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        timestamp TEXT NOT NULL,
+        grand_total REAL NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS sales (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        product_id INTEGER NOT NULL,
+        product_name TEXT,
+        quantity_sold INTEGER NOT NULL,
+        total_price REAL NOT NULL,
+        profit REAL NOT NULL DEFAULT 0,
+        timestamp TEXT NOT NULL,
+        transaction_id INTEGER,
+        last_updated REAL DEFAULT 0,
+        ts_epoch INTEGER
+    )
+    """,
+]
+
+CATEGORIES = ["Drinks", "Snacks", "Household", "Toiletries", "Stationery", None]
+
+
+def temp_db_path(name="bench.db"):
+    return os.path.join(tempfile.mkdtemp(prefix="inventory_bench_"), name)
+
+
+def create_schema(conn):
+    for ddl in SCHEMA:
+        conn.execute(ddl)
+    conn.commit()
+
+
+def seed(conn, n_products=500, n_sales=10000, seed_value=42, batch=50000):
+    """Fill products/sales/transactions with reproducible synthetic data."""
+    rnd = random.Random(seed_value)
+    conn.executemany(
+        "INSERT INTO products (name, category, quantity, price, cost_price) VALUES (?, ?, ?, ?, ?)",
+        [(f"Product {i}", rnd.choice(CATEGORIES), rnd.randint(0, 200),
+          round(rnd.uniform(100, 5000), 2), round(rnd.uniform(50, 3000), 2))
+         for i in range(1, n_products + 1)]
+    )
+    start = datetime(2023, 1, 1)
+    span = 3 * 365 * 24 * 3600
+    done = 0
+    while done < n_sales:
+        rows = []
+        for _ in range(min(batch, n_sales - done)):
+            pid = rnd.randint(1, n_products)
+            qty = rnd.randint(1, 5)
+            ts = start + timedelta(seconds=rnd.randint(0, span))
+            rows.append((pid, f"Product {pid}", qty, qty * 1000.0, qty * 200.0,
+                         ts.isoformat(), int(ts.timestamp()), done // 3 + 1))
+            done += 1
+        conn.executemany(
+            "INSERT INTO sales (product_id, product_name, quantity_sold, total_price, profit, timestamp, ts_epoch, "
+            "transaction_id) VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows
+        )
+    conn.execute(
+        "INSERT INTO transactions (id, timestamp, grand_total) "
+        "SELECT transaction_id, MIN(timestamp), SUM(total_price) FROM sales GROUP BY transaction_id"
+    )
+    conn.commit()
+
+
+@contextmanager
+def timer(results, key):
+    start = time.perf_counter()
+    yield
+    results[key] = time.perf_counter() - start
+
+
+def print_table(headers, rows):
+    widths = [max(len(str(h)), *(len(str(r[i])) for r in rows)) for i, h in enumerate(headers)]
+    line = "  ".join(str(h).ljust(w) for h, w in zip(headers, widths))
+    print(line)
+    print("-" * len(line))
+    for r in rows:
+        print("  ".join(str(c).ljust(w) for c, w in zip(r, widths)))
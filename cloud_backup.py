@@ -1,77 +1,476 @@
 import base64
+import hashlib
+import json
 import os
-from firebase_config import fire_db
-from db.database import DB_PATH
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import db.database as database
+from utils.app_config import get_config
+from utils.backup import BACKUP_DIR, snapshot_database
+from utils.change_journal import get_journal, journal_position
+from utils.compression import decode, get_codec
+from utils.remote_db import get_remote_db
+from utils.restore import restore_database
 
-# -------- Convert file -> base64 -------- #
-def encode_file_to_base64(file_path):
+# ----------------- Chunked cloud backup ----------------- #
+# The DB snapshot is cut into fixed-size chunks; each is compressed with the
+# backup codec, base64-encoded and stored under its SHA-256. A manifest
+# lists the chunks in order and is written last, so the remote always
+# holds one complete backup.
+#
+#   backups/inventory/manifest           {id, size, sha256, codec, chunk_bytes, chunks: [...]}
+#   backups/inventory/meta               {id, generation, size, sha256, created_ts} - cheap to read
+#   backups/inventory/chunks/<sha256>    base64(codec tag + compressed chunk)
+#
+# Progress is saved locally after every chunk (backups/cloud_upload.json):
+# an interrupted upload resumes with the chunks it hasn't sent. Downloads
+# stream chunk by chunk to disk and verify every hash.
+#
+# Uploads are deltas: backups/cloud_manifest.json remembers the last
+# manifest this machine published, and chunks listed there are already in
+# the cloud, so only changed chunks go up. Every CLOUD_REBASE_EVERY uploads,
+# or when the remote generation isn't the one we last wrote (another till
+# uploaded, or the remote was reset), the upload is a full rebase instead.
+#
+# At startup only meta is read: the backup is downloaded only when its
+# generation isn't the one this machine last uploaded or downloaded.
+
+REMOTE_ROOT = ("backups", "inventory")
+LEGACY_NODE = ("backups", "inventory_db")   # single base64 string written by older versions
+CLOUD_CHUNK_BYTES = get_config("cloud_chunk_bytes", 256 * 1024)   # small enough that a day's edits touch few chunks
+CLOUD_UPLOAD_WORKERS = get_config("cloud_upload_workers", 4)
+CLOUD_REBASE_EVERY = get_config("cloud_rebase_every", 20)          # full upload after this many deltas
+CLOUD_RETRIES = 3
+
+SQLITE_HEADER = b"SQLite format 3\x00"
+
+_upload_lock = threading.Lock()   # one upload at a time: they share the pending slot
+
+
+class CloudBackupError(Exception):
+    pass
+
+
+class UploadPaused(CloudBackupError):
+    """The upload was stopped (deadline); its progress is kept for the next run."""
+
+
+def _remote(*path):
+    return get_remote_db().child(*REMOTE_ROOT, *path)
+
+
+def _pending_paths():
+    return os.path.join(BACKUP_DIR, "cloud_upload.db"), os.path.join(BACKUP_DIR, "cloud_upload.json")
+
+
+def _last_manifest_path():
+    return os.path.join(BACKUP_DIR, "cloud_manifest.json")
+
+
+def load_last_manifest():
+    """Manifest of the last upload this machine published (None if unknown)."""
     try:
-        with open(file_path, "rb") as f:
-            return base64.b64encode(f.read()).decode("utf-8")
-    except Exception as e:
-        print("❌ Failed to encode file:", e)
+        with open(_last_manifest_path(), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
         return None
 
 
-# -------- Convert base64 -> file -------- #
-def decode_base64_to_file(data, file_path):
+def _save_last_manifest(manifest):
+    os.makedirs(BACKUP_DIR, exist_ok=True)
+    tmp = _last_manifest_path() + ".part"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    os.replace(tmp, _last_manifest_path())
+
+
+def _save_state(state):
+    _, state_path = _pending_paths()
+    tmp = state_path + ".part"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(tmp, state_path)
+
+
+def _load_state():
+    snapshot_path, state_path = _pending_paths()
+    if not (os.path.exists(snapshot_path) and os.path.exists(state_path)):
+        return None
     try:
-        with open(file_path, "wb") as f:
-            f.write(base64.b64decode(data))
-    except Exception as e:
-        print("❌ Failed to decode/restore file:", e)
+        with open(state_path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _clear_pending():
+    for path in _pending_paths():
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def iter_file_chunks(path, chunk_bytes=CLOUD_CHUNK_BYTES):
+    with open(path, "rb") as f:
+        while True:
+            data = f.read(chunk_bytes)
+            if not data:
+                return
+            yield data
+
+
+def _build_manifest(path, chunk_bytes):
+    whole = hashlib.sha256()
+    chunks = []
+    for data in iter_file_chunks(path, chunk_bytes):
+        whole.update(data)
+        chunks.append(hashlib.sha256(data).hexdigest())
+    created = time.time()
+    return {
+        "id": time.strftime("%Y%m%d-%H%M%S", time.localtime(created)),
+        "created_ts": created,
+        "size": os.path.getsize(path),
+        "sha256": whole.hexdigest(),
+        "codec": get_codec().name,
+        "chunk_bytes": chunk_bytes,
+        "chunks": chunks,
+    }
+
+
+def _meta(manifest):
+    return {key: manifest.get(key) for key in ("id", "generation", "size", "sha256", "created_ts")}
+
+
+def read_remote_meta():
+    """The small metadata node of the cloud backup (None if there is none)."""
+    return _with_retries(lambda: _remote("meta").get().val(), "Reading the cloud backup metadata")
+
+
+def remote_is_newer():
+    """
+    (newer, meta): whether the cloud holds a backup this machine hasn't
+    uploaded or downloaded itself. One small read, no chunk traffic.
+    """
+    meta = read_remote_meta()
+    if not meta:
+        # Nothing chunked up there; an old single-node backup still counts
+        legacy = get_remote_db().child(*LEGACY_NODE).shallow().get().val()
+        return bool(legacy), None
+    last = load_last_manifest()
+    if last is None or not os.path.exists(database.DB_PATH):
+        return True, meta
+    if meta.get("generation") == last.get("generation") and meta.get("sha256") == last.get("sha256"):
+        return False, meta
+    return (meta.get("generation") or 0) >= (last.get("generation") or 0), meta
+
+
+def _with_retries(action, what):
+    for attempt in range(1, CLOUD_RETRIES + 1):
+        try:
+            return action()
+        except Exception as e:
+            if attempt == CLOUD_RETRIES:
+                raise CloudBackupError(f"{what} failed after {CLOUD_RETRIES} attempts: {e}")
+            time.sleep(0.5 * attempt)
+
+
+def _db_position():
+    """[timeline, last change_log seq] of the live DB; moves with every journaled row change."""
+    conn = database.get_read_connection()
+    try:
+        return [get_journal().timeline, journal_position(conn)]
+    finally:
+        conn.close()
+
+
+def _start_upload():
+    """Snapshot the DB into the pending slot and decide between a delta and a full rebase."""
+    os.makedirs(BACKUP_DIR, exist_ok=True)
+    snapshot_path, _ = _pending_paths()
+    info = {}
+    snapshot_database(snapshot_path, info=info)
+    manifest = _build_manifest(snapshot_path, CLOUD_CHUNK_BYTES)
+
+    last = load_last_manifest()
+    remote_generation = (read_remote_meta() or {}).get("generation")
+    delta = (
+        last is not None
+        and remote_generation == last.get("generation")
+        and last.get("chunk_bytes") == manifest["chunk_bytes"]
+        and last.get("deltas", 0) + 1 < CLOUD_REBASE_EVERY
+    )
+    manifest["generation"] = max(remote_generation or 0, (last or {}).get("generation", 0)) + 1
+    manifest["kind"] = "delta" if delta else "full"
+    manifest["deltas"] = last.get("deltas", 0) + 1 if delta else 0
+    # A delta trusts that the chunks we published last time are still there
+    state = {"manifest": manifest, "done": sorted(set(last["chunks"])) if delta else [], "sent_bytes": 0,
+             "source": [info.get("timeline"), info.get("journal_seq")]}
+    _save_state(state)
+    return state
 
 
 # -------- Upload (Backup) -------- #
-def upload_backup():
-    if not os.path.exists(DB_PATH):
+def has_pending_upload():
+    return _load_state() is not None
+
+
+def upload_backup(resume=True, progress=None, cancel=None):
+    """
+    Upload a snapshot of the DB as chunks + manifest. With resume, an
+    upload interrupted earlier is finished first (only its missing chunks
+    are sent) instead of starting over - as long as the DB hasn't changed
+    since its snapshot; otherwise a fresh snapshot replaces it. progress(done, total) is called
+    after each chunk; setting the cancel Event pauses the upload after the
+    chunks in flight. Returns a status message.
+    """
+    if not os.path.exists(database.DB_PATH):
         msg = "❌ No local database found."
         print(msg)
         return msg
+    with _upload_lock:
+        return _upload(resume, progress, cancel)
 
-    data_b64 = encode_file_to_base64(DB_PATH)
-    if not data_b64:
-        return "❌ Failed to encode database."
 
+def _upload(resume, progress, cancel):
     try:
-        fire_db.child("backups").child("inventory_db").set(data_b64)
-        msg = "✅ Backup uploaded to Firebase Realtime DB."
+        state = _load_state() if resume else None
+        orphans = []
+        if state is not None and state.get("source") != _db_position():
+            # Finishing it would publish an old snapshot (e.g. at exit, without this session's sales)
+            print(f"☁️ Local data changed since the unfinished upload {state['manifest']['id']}; "
+                  "uploading a fresh snapshot instead.")
+            # Chunks it already sent are referenced by no manifest: let the GC take them
+            published = set((load_last_manifest() or {}).get("chunks", []))
+            orphans = sorted((set(state["done"]) | set(state.get("orphans", []))) - published)
+            _clear_pending()
+            state = None
+        if state is None:
+            state = _start_upload()
+            if orphans:
+                state["orphans"] = orphans
+                _save_state(state)
+        else:
+            print(f"☁️ Resuming cloud upload {state['manifest']['id']} "
+                  f"({len(state['done'])}/{len(state['manifest']['chunks'])} chunks already sent)")
+        manifest = state["manifest"]
+        _upload_chunks(state, progress, cancel)
+        last = load_last_manifest() or {}
+        previous = _remote_chunks()
+        # One multi-path write: manifest and meta always change together
+        _with_retries(lambda: _remote().update({"manifest": manifest, "meta": _meta(manifest)}),
+                      "Publishing the manifest")
+        # Chunks only the replaced manifest used stay one more generation (readers may be on it)
+        retired = sorted(set(previous or []) - set(manifest["chunks"]))
+        _save_last_manifest({**manifest, "retired": retired})
+        _clear_pending()
+        _collect_garbage(manifest, previous, set(last.get("retired", [])) | set(state.get("orphans", [])))
+    except UploadPaused:
+        msg = "⏸️ Cloud upload paused; it will continue on the next launch."
         print(msg)
         return msg
     except Exception as e:
-        msg = f"❌ Upload failed: {e}"
+        msg = f"❌ Upload failed: {e} (it will resume next time)"
         print(msg)
         return msg
 
+    msg = (f"✅ Backup uploaded to the cloud ({manifest['kind']}: sent {state.get('sent_bytes', 0) / 1024:.0f} KB "
+           f"for a {manifest['size'] / 1024 / 1024:.1f} MB database).")
+    print(msg)
+    return msg
 
-# -------- Download (Restore) -------- #
-def download_backup():
+
+def _upload_chunks(state, progress=None, cancel=None):
+    manifest = state["manifest"]
+    snapshot_path, _ = _pending_paths()
+    done = set(state["done"])
+    codec = get_codec(manifest["codec"])
+    total = len(set(manifest["chunks"]) - done)
+    sent = [0]
+    lock = threading.Lock()
+
+    def send(index, digest):
+        if cancel is not None and cancel.is_set():
+            return
+        with open(snapshot_path, "rb") as f:
+            f.seek(index * manifest["chunk_bytes"])
+            data = f.read(manifest["chunk_bytes"])
+        if hashlib.sha256(data).hexdigest() != digest:
+            raise CloudBackupError("Pending snapshot changed on disk")
+        payload = base64.b64encode(codec.encode(data)).decode("ascii")
+        _with_retries(lambda: _remote("chunks", digest).set(payload), f"Uploading chunk {index}")
+        with lock:
+            done.add(digest)
+            state["done"] = sorted(done)
+            state["sent_bytes"] = state.get("sent_bytes", 0) + len(payload)
+            _save_state(state)
+            sent[0] += 1
+            if progress:
+                progress(sent[0], total)
+
+    with ThreadPoolExecutor(max_workers=max(1, CLOUD_UPLOAD_WORKERS)) as pool:
+        futures, queued = [], set(done)
+        for index, digest in enumerate(manifest["chunks"]):
+            if digest not in queued:   # identical chunks (e.g. empty pages) go up once
+                queued.add(digest)
+                futures.append(pool.submit(send, index, digest))
+        for future in as_completed(futures):
+            future.result()
+    if cancel is not None and cancel.is_set() and not set(manifest["chunks"]) <= done:
+        raise UploadPaused()
+
+
+def _remote_chunks():
+    """Chunk list of the manifest currently published (None if it can't be read)."""
     try:
-        data_b64 = fire_db.child("backups").child("inventory_db").get().val()
-        if not data_b64:
-            msg = "⚠️ No backup found in Firebase Realtime DB."
-            print(msg)
-            return msg
+        return (_remote("manifest").get().val() or {}).get("chunks") or []
+    except Exception:
+        return None
 
-        # Backup current local DB first (safety net)
-        if os.path.exists(DB_PATH):
-            os.rename(DB_PATH, DB_PATH + ".local.bak")
 
-        decode_base64_to_file(data_b64, DB_PATH)
-        msg = f"✅ Backup restored locally: {DB_PATH}"
-        print(msg)
-        return msg
+def _collect_garbage(manifest, previous, candidates):
+    """
+    Remove retired chunks (best effort). Only chunks known to belong to
+    superseded manifests or abandoned uploads are candidates, never unknown
+    ones another till may be uploading right now. Chunks of the manifest
+    just replaced (previous) are kept for downloads still reading it, and
+    nothing is removed once another till has published after us.
+    """
+    try:
+        if previous is None:
+            return
+        meta = _remote("meta").get().val() or {}
+        if meta.get("generation") != manifest["generation"]:
+            print("☁️ Another upload was published meanwhile; leaving cloud chunks alone.")
+            return
+        for digest in set(candidates) - set(manifest["chunks"]) - set(previous):
+            _remote("chunks", digest).remove()
+        get_remote_db().child(*LEGACY_NODE).remove()
+    except Exception as e:
+        print(f"⚠️ Could not clean up old cloud chunks: {e}")
+
+
+# -------- Background upload -------- #
+class BackgroundUpload:
+    """
+    Runs before_upload() (e.g. flushing local backups) and upload_backup()
+    on a daemon thread. The UI polls phase/done/total/message and may
+    cancel(); whatever isn't sent by then resumes on the next launch.
+    """
+
+    def __init__(self, before_upload=None):
+        self.phase = "starting"
+        self.done = self.total = 0
+        self.message = None
+        self._before = before_upload
+        self._cancel = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="cloud-upload", daemon=True)
+        self._thread.start()
+
+    def _progress(self, done, total):
+        self.done, self.total = done, total
+
+    def _run(self):
+        try:
+            if self._before:
+                self.phase = "saving"
+                self._before()
+            self.phase = "uploading"
+            self.message = upload_backup(progress=self._progress, cancel=self._cancel)
+        except Exception as e:
+            self.message = f"❌ Upload failed: {e}"
+        finally:
+            self.phase = "finished"
 
+    def cancel(self):
+        self._cancel.set()
+
+    @property
+    def finished(self):
+        return not self._thread.is_alive()
+
+    def join(self, timeout=None):
+        self._thread.join(timeout)
+        return self.finished
+
+
+def start_background_upload(before_upload=None):
+    return BackgroundUpload(before_upload)
+
+
+# -------- Fetch -------- #
+def fetch_backup(dest_path):
+    """Stream the cloud backup to dest_path chunk by chunk; returns its manifest (None if no backup)."""
+    manifest = _with_retries(lambda: _remote("manifest").get().val(), "Reading the manifest")
+    if not manifest:
+        return _fetch_legacy(dest_path)
+
+    whole = hashlib.sha256()
+    with open(dest_path, "wb") as out:
+        for index, digest in enumerate(manifest["chunks"]):
+            payload = _with_retries(lambda: _remote("chunks", digest).get().val(), f"Downloading chunk {index}")
+            if not payload:
+                raise CloudBackupError(f"Cloud backup is missing chunk {index}")
+            data = decode(base64.b64decode(payload))
+            if hashlib.sha256(data).hexdigest() != digest:
+                raise CloudBackupError(f"Chunk {index} of the cloud backup is corrupt")
+            whole.update(data)
+            out.write(data)
+        out.flush()
+        os.fsync(out.fileno())
+    if whole.hexdigest() != manifest["sha256"]:
+        raise CloudBackupError("Downloaded backup does not match its checksum")
+    return manifest
+
+
+def _fetch_legacy(dest_path):
+    data_b64 = get_remote_db().child(*LEGACY_NODE).get().val()
+    if not data_b64:
+        return None
+    raw = base64.b64decode(data_b64)
+    if not raw.startswith(SQLITE_HEADER):
+        raw = decode(raw)
+    with open(dest_path, "wb") as out:
+        out.write(raw)
+    return {"id": "legacy", "size": len(raw)}
+
+
+# -------- Download (Restore) -------- #
+def download_backup(force=True):
+    """
+    Restore the cloud backup into the live DB. With force=False (startup)
+    it first compares the remote metadata with what this machine last
+    uploaded/downloaded and skips the download when nothing is newer.
+    """
+    download_path = database.DB_PATH + ".download"
+    try:
+        if not force:
+            newer, meta = remote_is_newer()
+            if not newer:
+                msg = (f"✅ Local database is up to date with the cloud "
+                       f"(generation {meta['generation']})." if meta else "⚠️ No backup found in the cloud.")
+                print(msg)
+                return msg
+        manifest = fetch_backup(download_path)
+        if manifest is None:
+            msg = "⚠️ No backup found in the cloud."
+            print(msg)
+            return msg
+        # Verified and swapped in live; the current DB is kept as a pre-restore point
+        restore_database(download_path)
+        if manifest.get("chunks"):
+            _save_last_manifest(manifest)   # its chunks are in the cloud: the next upload can be a delta
+        msg = f"✅ Cloud backup {manifest['id']} restored locally: {database.DB_PATH}"
     except Exception as e:
         msg = f"❌ Restore failed: {e}"
-        print(msg)
-        return msg
+    finally:
+        if os.path.exists(download_path):
+            os.remove(download_path)
+    print(msg)
+    return msg
 
 
 if __name__ == "__main__":
-    print("⬆️ Uploading DB to Firebase Realtime DB...")
+    print("⬆️ Uploading DB to the cloud...")
     upload_backup()
-    print("⬇️ Downloading DB from Firebase Realtime DB...")
+    print("⬇️ Downloading DB from the cloud...")
     download_backup()
-
-
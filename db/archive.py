@@ -0,0 +1,336 @@
+import os
+import re
+import sqlite3
+import threading
+from datetime import datetime
+
+import db.database as database
+from db.timestamps import to_epoch
+from db.writer import flush_writes, run_write
+from utils.app_config import get_config
+from utils.backup import backup_archive
+
+# ----------------- Yearly sales archives ----------------- #
+# Closed years of sales move out of inventory.db into archive/sales_<year>.db.
+# The hot DB keeps only the open period, so backups and dashboard queries
+# stay proportional to it. Readers ATTACH the archive years a query spans and
+# select through a UNION ALL of the hot table and those years; the ts_epoch
+# range is pushed into every arm, so each one is an index seek.
+
+ARCHIVE_HOT_YEARS = get_config("archive_hot_years", 1)   # calendar years kept hot (1 = current year)
+MAX_ATTACHED_ARCHIVES = 9   # SQLite allows 10 attached databases per connection
+
+SALES_COLUMNS = ("id", "product_id", "product_name", "quantity_sold", "total_price", "profit",
+                 "timestamp", "transaction_id", "last_updated", "ts_epoch")
+_COLUMN_LIST = ", ".join(SALES_COLUMNS)
+
+_ARCHIVE_FILE = re.compile(r"^sales_(\d{4})\.db$")
+_years = None
+_years_lock = threading.Lock()
+
+
+def archive_dir():
+    return os.path.join(os.path.dirname(os.path.abspath(database.DB_PATH)), "archive")
+
+
+def archive_path(year):
+    return os.path.join(archive_dir(), f"sales_{year}.db")
+
+
+def archive_years():
+    """Sorted list of years that have an archive file (cached until the next archive run)."""
+    global _years
+    if _years is None:
+        with _years_lock:
+            if _years is None:
+                try:
+                    names = os.listdir(archive_dir())
+                except FileNotFoundError:
+                    names = []
+                _years = sorted(int(m.group(1)) for m in map(_ARCHIVE_FILE.match, names) if m)
+    return _years
+
+
+def invalidate_archives():
+    global _years
+    _years = None
+
+
+def archived_before():
+    """Epoch where the hot table starts; older sales live in archives (None = nothing archived)."""
+    years = archive_years()
+    return to_epoch(datetime(years[-1] + 1, 1, 1)) if years else None
+
+
+def _year_bounds(year):
+    return to_epoch(datetime(year, 1, 1)), to_epoch(datetime(year + 1, 1, 1))
+
+
+def _years_for(start=None, end=None):
+    lo = to_epoch(start) if start is not None else None
+    hi = to_epoch(end) if end is not None else None
+    years = []
+    for year in archive_years():
+        year_lo, year_hi = _year_bounds(year)
+        if (lo is None or lo < year_hi) and (hi is None or hi > year_lo):
+            years.append(year)
+    return years
+
+
+def _attach(conn, years):
+    """
+    ATTACH the given archive years to conn (kept attached for reuse); returns
+    schema names, or None when there is no room: inside a transaction SQLite
+    refuses to DETACH a schema the transaction has already read.
+    """
+    if len(years) > MAX_ATTACHED_ARCHIVES:
+        raise sqlite3.OperationalError(
+            f"Query spans {len(years)} archive years; at most {MAX_ATTACHED_ARCHIVES} can be attached. "
+            "Narrow the date range."
+        )
+    raw = getattr(conn, "raw", conn)
+    wanted = {f"arch_{year}": year for year in years}
+    attached = {row[1] for row in raw.execute("PRAGMA database_list") if row[1].startswith("arch_")}
+
+    # Make room: drop archives this query doesn't need
+    for schema in sorted(attached - set(wanted)):
+        if len(attached) + len(set(wanted) - attached) <= MAX_ATTACHED_ARCHIVES:
+            break
+        try:
+            raw.execute(f"DETACH DATABASE {schema}")
+        except sqlite3.OperationalError:
+            continue   # locked by the caller's open transaction
+        attached.discard(schema)
+    if len(attached) + len(set(wanted) - attached) > MAX_ATTACHED_ARCHIVES:
+        return None
+
+    for schema, year in wanted.items():
+        if schema not in attached:
+            raw.execute(f"ATTACH DATABASE ? AS {schema}", (archive_path(year),))
+    return list(wanted)
+
+
+def _span_table(conn, kind, years, select, params=()):
+    """
+    For queries spanning more archive years than conn can attach: copy
+    `select` (formatted with each year's schema) into one TEMP table of conn.
+    The years are attached batch by batch to a separate connection, so no
+    DETACH ever runs inside the caller's transaction (e.g. read_snapshot()).
+    Returns the table name; one span table per kind is kept per connection.
+    """
+    raw = getattr(conn, "raw", conn)
+    name = f"temp.archive_span_{kind}"
+    query_only = raw.execute("PRAGMA query_only").fetchone()[0]
+    own_transaction = not raw.in_transaction
+    reader = sqlite3.connect(":memory:")
+    # Read-pool connections are query_only; the span only writes the TEMP schema
+    raw.execute("PRAGMA query_only = 0")
+    try:
+        raw.execute(f"DROP TABLE IF EXISTS {name}")
+        created = False
+        for i in range(0, len(years), MAX_ATTACHED_ARCHIVES):
+            for schema in _attach(reader, years[i:i + MAX_ATTACHED_ARCHIVES]):
+                cursor = reader.execute(select.format(schema=schema), params)
+                columns = [col[0] for col in cursor.description]
+                if not created:
+                    raw.execute(f"CREATE TABLE {name} ({', '.join(columns)})")
+                    created = True
+                insert = f"INSERT INTO {name} VALUES ({', '.join('?' * len(columns))})"
+                while rows := cursor.fetchmany(5000):
+                    raw.executemany(insert, rows)
+        if own_transaction and raw.in_transaction:
+            raw.commit()
+    finally:
+        reader.close()
+        raw.execute(f"PRAGMA query_only = {query_only}")
+    return name
+
+
+def sales_source(conn, start=None, end=None):
+    """
+    Table expression for sales in [start, end): plain "sales" when no archive
+    year overlaps the range, otherwise a UNION ALL over the hot table and the
+    overlapping archive years (attached to conn on demand, or copied into a
+    TEMP table when they can't all be attached).
+    """
+    years = _years_for(start, end)
+    if not years:
+        return "sales"
+    arms = [f"SELECT {_COLUMN_LIST} FROM main.sales"]
+    schemas = _attach(conn, years) if len(years) <= MAX_ATTACHED_ARCHIVES else None
+    if schemas is not None:
+        arms += [f"SELECT {_COLUMN_LIST} FROM {schema}.sales" for schema in schemas]
+    else:
+        lo = to_epoch(start) if start is not None else None
+        hi = to_epoch(end) if end is not None else None
+        where = " AND ".join(cond for cond, bound in (("ts_epoch >= ?", lo), ("ts_epoch < ?", hi)) if bound is not None)
+        span = _span_table(conn, "sales", years,
+                           f"SELECT {_COLUMN_LIST} FROM {{schema}}.sales" + (f" WHERE {where}" if where else ""),
+                           [bound for bound in (lo, hi) if bound is not None])
+        arms.append(f"SELECT {_COLUMN_LIST} FROM {span}")
+    return "(" + " UNION ALL ".join(arms) + ")"
+
+
+def product_totals_sources(conn):
+    """Per-product totals tables of every archive year (product_id, quantity, revenue, profit, sales_count)."""
+    years = archive_years()
+    schemas = _attach(conn, years) if len(years) <= MAX_ATTACHED_ARCHIVES else None
+    if schemas is not None:
+        return [f"{schema}.product_totals" for schema in schemas]
+    return [_span_table(conn, "totals", years,
+                        "SELECT product_id, product_name, quantity, revenue, profit, sales_count "
+                        "FROM {schema}.product_totals")]
+
+
+# ----------------- Moving closed years ----------------- #
+def _create_archive_schema(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS archive.sales (
+            id INTEGER PRIMARY KEY,
+            product_id INTEGER NOT NULL,
+            product_name TEXT,
+            quantity_sold INTEGER NOT NULL,
+            total_price REAL NOT NULL,
+            profit REAL NOT NULL DEFAULT 0,
+            timestamp TEXT NOT NULL,
+            transaction_id INTEGER,
+            last_updated REAL DEFAULT 0,
+            ts_epoch INTEGER
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS archive.idx_sales_ts_epoch ON sales(ts_epoch)")
+    conn.execute("CREATE INDEX IF NOT EXISTS archive.idx_sales_transaction ON sales(transaction_id, total_price)")
+    # A closed year never changes, so its aggregates are computed once here
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS archive.product_totals (
+            product_id INTEGER PRIMARY KEY,
+            product_name TEXT,
+            quantity INTEGER NOT NULL,
+            revenue REAL NOT NULL,
+            profit REAL NOT NULL,
+            sales_count INTEGER NOT NULL
+        )
+    """)
+
+
+def _archive_year(conn, year, chunk_days=31):
+    lo, hi = _year_bounds(year)
+    if conn.execute("SELECT 1 FROM sales WHERE ts_epoch >= ? AND ts_epoch < ? LIMIT 1", (lo, hi)).fetchone() is None:
+        return 0
+
+    os.makedirs(archive_dir(), exist_ok=True)
+    conn.execute("ATTACH DATABASE ? AS archive", (archive_path(year),))
+    moved = 0
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        _create_archive_schema(conn)
+        conn.execute("COMMIT")
+
+        # Month-sized transactions keep the write lock short for the app's writer.
+        # The two files commit separately: if a run dies in between, rows exist
+        # in both and the next run (REPLACE + DELETE) finishes the move.
+        step = chunk_days * 86400
+        for chunk_lo in range(lo, hi, step):
+            chunk_hi = min(chunk_lo + step, hi)
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(f"""
+                    INSERT OR REPLACE INTO archive.sales ({_COLUMN_LIST})
+                    SELECT {_COLUMN_LIST} FROM main.sales WHERE ts_epoch >= ? AND ts_epoch < ?
+                """, (chunk_lo, chunk_hi))
+                moved += conn.execute("DELETE FROM main.sales WHERE ts_epoch >= ? AND ts_epoch < ?",
+                                      (chunk_lo, chunk_hi)).rowcount
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute("DELETE FROM archive.product_totals")
+        conn.execute("""
+            INSERT INTO archive.product_totals (product_id, product_name, quantity, revenue, profit, sales_count)
+            SELECT product_id, MAX(product_name), SUM(quantity_sold), SUM(total_price), SUM(profit), COUNT(*)
+            FROM archive.sales
+            GROUP BY product_id
+        """)
+        conn.execute("COMMIT")
+    finally:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        conn.execute("DETACH DATABASE archive")
+    return moved
+
+
+def archive_sales(through_year=None, vacuum=True):
+    """
+    Move every sale up to the end of through_year (default: everything older
+    than the ARCHIVE_HOT_YEARS hot window) into its yearly archive file.
+    Returns {year: rows moved}. Cheap when there is nothing to move.
+    """
+    if through_year is None:
+        through_year = datetime.now().year - max(1, ARCHIVE_HOT_YEARS)
+    cutoff = to_epoch(datetime(through_year + 1, 1, 1))
+
+    flush_writes()
+    conn = database.open_connection(database.DB_PATH, isolation_level=None)
+    moved = {}
+    try:
+        oldest = conn.execute("SELECT MIN(ts_epoch) FROM sales").fetchone()[0]
+        if oldest is None or oldest >= cutoff:
+            return moved
+        for year in range(datetime.fromtimestamp(oldest).year, through_year + 1):
+            count = _archive_year(conn, year)
+            if count:
+                moved[year] = count
+                print(f"📦 Archived {count} sales from {year} to {archive_path(year)}")
+        if moved and vacuum:
+            # Give the freed pages back so the hot file (and its backups) shrink
+            conn.execute("VACUUM")
+    finally:
+        conn.close()
+        invalidate_archives()
+
+    if moved:
+        # Archives change only here, so this is the one time they need backing up
+        for year in moved:
+            backup_archive(archive_path(year))
+    return moved
+
+
+def drop_archived_from_hot():
+    """
+    Delete hot sales that fall in a year that already has an archive file -
+    e.g. brought back by restoring a restore point taken before
+    archive_sales() ran. The archive holds those sales; kept in both places,
+    sales_source()'s UNION ALL would count them twice. Returns rows deleted.
+    """
+    def drop(conn):
+        deleted = 0
+        for year in archive_years():
+            lo, hi = _year_bounds(year)
+            deleted += conn.execute("DELETE FROM sales WHERE ts_epoch >= ? AND ts_epoch < ?", (lo, hi)).rowcount
+        return deleted
+
+    return run_write(drop)
+
+
+def clear_archives():
+    """Delete every archive file (used when all sales are cleared)."""
+    database.close_all_connections()
+    for year in archive_years():
+        try:
+            os.remove(archive_path(year))
+        except OSError as e:
+            print(f"⚠️ Could not delete archive {archive_path(year)}: {e}")
+    invalidate_archives()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Move closed years of sales into yearly archive files.")
+    parser.add_argument("--through-year", type=int, default=None)
+    parser.add_argument("--no-vacuum", action="store_true")
+    args = parser.parse_args()
+    result = archive_sales(args.through_year, vacuum=not args.no_vacuum)
+    print(f"✅ Archived {sum(result.values())} sales." if result else "✅ Nothing to archive.")
@@ -1,5 +1,11 @@
 import sqlite3
 import os, sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from utils.app_config import get_config
+from db.query_stats import InstrumentedConnection
 
 def get_db_path():
     """Return correct DB path for dev vs PyInstaller build."""
@@ -17,8 +23,402 @@ def get_db_path():
 
 DB_PATH = get_db_path()
 
+# ----------------- Pool limits ----------------- #
+POOL_MAX_CONNECTIONS = 8   # hard cap on open connections across all threads
+POOL_MAX_IDLE = 4          # idle connections kept warm for the next caller
+POOL_TIMEOUT = 10          # seconds to wait for a free connection / the write lock
+
+# ----------------- Performance profiles ----------------- #
+# Applied to every connection as it is opened. All use WAL so readers
+# (Tk thread, dashboards) and the Firebase stream writers stop blocking
+# each other; they differ in how hard they flush and how much they cache.
+PERFORMANCE_PROFILES = {
+    # fsync on every commit: nothing committed is lost on power failure
+    "durable": {
+        "journal_mode": "WAL",
+        "synchronous": "FULL",
+        "cache_size": -8000,          # KiB (negative = size, not pages)
+        "mmap_size": 0,
+        "temp_store": "DEFAULT",
+        "busy_timeout": 10000,        # ms
+    },
+    # fsync at checkpoints only: a crash may drop the last commits, never corrupts
+    "balanced": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -32000,
+        "mmap_size": 64 * 1024 * 1024,
+        "temp_store": "MEMORY",
+        "busy_timeout": 10000,
+    },
+    # no fsync at all: fastest, for bulk imports/sync on a machine with a UPS
+    "throughput": {
+        "journal_mode": "WAL",
+        "synchronous": "OFF",
+        "cache_size": -128000,
+        "mmap_size": 256 * 1024 * 1024,
+        "temp_store": "MEMORY",
+        "busy_timeout": 30000,
+    },
+}
+DEFAULT_PROFILE = "balanced"
+DB_PROFILE = get_config("db_profile", DEFAULT_PROFILE)
+
+
+def apply_profile(conn, profile=None, readonly=False):
+    """Set the PRAGMAs of a named profile (or a dict of PRAGMAs) on a connection."""
+    if profile is None:
+        profile = DB_PROFILE
+    settings = profile if isinstance(profile, dict) else PERFORMANCE_PROFILES.get(profile)
+    if settings is None:
+        print(f"⚠️ Unknown database profile '{profile}', using '{DEFAULT_PROFILE}'")
+        settings = PERFORMANCE_PROFILES[DEFAULT_PROFILE]
+
+    # busy_timeout first so the journal_mode switch can wait for other writers
+    conn.execute(f"PRAGMA busy_timeout = {int(settings['busy_timeout'])}")
+    if readonly:
+        # journal_mode is a property of the file; readers just use it
+        conn.execute("PRAGMA query_only = 1")
+    else:
+        conn.execute(f"PRAGMA journal_mode = {settings['journal_mode']}")
+    conn.execute(f"PRAGMA synchronous = {settings['synchronous']}")
+    conn.execute(f"PRAGMA cache_size = {int(settings['cache_size'])}")
+    conn.execute(f"PRAGMA mmap_size = {int(settings['mmap_size'])}")
+    conn.execute(f"PRAGMA temp_store = {settings['temp_store']}")
+    return conn
+
+
+def open_connection(path=None, profile=None, readonly=False, **kwargs):
+    """
+    Open an instrumented connection with the performance profile applied.
+    readonly=True opens the file with mode=ro: it can never take the write
+    lock, and under WAL it reads a snapshot while the writer keeps going.
+    """
+    kwargs.setdefault("timeout", POOL_TIMEOUT)
+    kwargs.setdefault("check_same_thread", False)
+    target = path or DB_PATH
+    if readonly:
+        target = Path(target).resolve().as_uri() + "?mode=ro"
+        kwargs["uri"] = True
+    conn = sqlite3.connect(target, factory=InstrumentedConnection, **kwargs)
+    try:
+        apply_profile(conn, profile, readonly=readonly)
+    except Exception:
+        conn.close()
+        raise
+    return conn
+
+
+class PoolTimeout(sqlite3.OperationalError):
+    """Raised when no pooled connection frees up within the pool timeout."""
+
+
+class _Lease:
+    """One thread's checkout of a raw connection; nested calls share it."""
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.depth = 1
+
+
+class PooledConnection:
+    """
+    Handle returned by get_connection().
+    Behaves like the sqlite3 connection it wraps, except that close() hands
+    the connection back to the pool instead of closing the database file.
+    """
+
+    def __init__(self, pool, lease, nested=False):
+        self._pool = pool
+        self._lease = lease
+        self._released = False
+        self._nested = nested
+        self._savepoint = False
+
+    @property
+    def raw(self):
+        return self._lease.raw
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self._lease.raw, name)
+
+    def close(self):
+        if not self._released:
+            self._released = True
+            self._pool.release(self._lease)
+
+    def __enter__(self):
+        # A nested scope must not end the outer caller's transaction:
+        # if one is open, this scope runs inside a SAVEPOINT instead
+        if self._nested and self._lease.raw.in_transaction:
+            self._lease.raw.execute("SAVEPOINT pooled_scope")
+            self._savepoint = True
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        raw = self._lease.raw
+        try:
+            if self._savepoint:
+                if exc_type is not None:
+                    raw.execute("ROLLBACK TO pooled_scope")
+                raw.execute("RELEASE pooled_scope")
+            elif exc_type is None:
+                raw.commit()
+            else:
+                raw.rollback()
+        finally:
+            self.close()
+        return False
+
+    def __del__(self):
+        # Safety net for callers that return early without close()
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+class ConnectionPool:
+    """
+    Hands out SQLite connections that are reused across calls.
+    While a thread holds a connection, further get_connection() calls on that
+    thread get the same one back, so nested model calls share one connection
+    instead of fighting each other for the write lock.
+    """
+
+    def __init__(self, path, max_connections=POOL_MAX_CONNECTIONS,
+                 max_idle=POOL_MAX_IDLE, timeout=POOL_TIMEOUT, profile=None, readonly=False):
+        self.path = path
+        self.profile = profile or DB_PROFILE
+        self.readonly = readonly
+        self.max_connections = max_connections
+        self.max_idle = max_idle
+        self.timeout = timeout
+        self._cond = threading.Condition()
+        self._idle = []
+        self._open = 0
+        self._draining = False
+        self._local = threading.local()
+
+    def _connect(self):
+        return open_connection(self.path, self.profile, readonly=self.readonly, timeout=self.timeout)
+
+    def acquire(self):
+        lease = getattr(self._local, "lease", None)
+        if lease is not None:
+            lease.depth += 1
+            return PooledConnection(self, lease, nested=True)
+
+        raw = None
+        with self._cond:
+            deadline = time.monotonic() + self.timeout
+            while True:
+                # While draining (DB file being swapped) wait for resume()
+                if not self._draining:
+                    if self._idle:
+                        raw = self._idle.pop()
+                        break
+                    if self._open < self.max_connections:
+                        self._open += 1
+                        break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolTimeout(
+                        f"No free database connection after {self.timeout}s "
+                        f"({self.max_connections} in use)"
+                    )
+                self._cond.wait(remaining)
+
+        if raw is None:
+            try:
+                raw = self._connect()
+            except Exception:
+                with self._cond:
+                    self._open -= 1
+                    self._cond.notify()
+                raise
+
+        lease = _Lease(raw)
+        self._local.lease = lease
+        return PooledConnection(self, lease)
+
+    def release(self, lease):
+        lease.depth -= 1
+        if lease.depth > 0:
+            return
+        if getattr(self._local, "lease", None) is lease:
+            self._local.lease = None
+
+        raw = lease.raw
+        keep = True
+        try:
+            # Same as closing a plain connection: uncommitted work is dropped
+            if raw.in_transaction:
+                raw.rollback()
+        except sqlite3.Error:
+            keep = False
+
+        with self._cond:
+            if keep and len(self._idle) < self.max_idle:
+                self._idle.append(raw)
+                raw = None
+            else:
+                self._open -= 1
+            self._cond.notify()
+        if raw is not None:
+            raw.close()
+
+    def close_idle(self):
+        """Close every idle connection (busy ones close when released)."""
+        with self._cond:
+            idle, self._idle = self._idle, []
+            self._open -= len(idle)
+            self._cond.notify_all()
+        for raw in idle:
+            raw.close()
+
+    def drain(self, timeout=None):
+        """
+        Stop handing out connections, wait for every lease to come back and
+        close them all. Call resume() afterwards (also after a PoolTimeout).
+        """
+        if getattr(self._local, "lease", None) is not None:
+            raise RuntimeError("Cannot drain the pool while this thread holds a connection")
+        timeout = self.timeout if timeout is None else timeout
+        with self._cond:
+            self._draining = True
+            deadline = time.monotonic() + timeout
+            while self._open > len(self._idle):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolTimeout(f"{self._open - len(self._idle)} connections still in use after {timeout}s")
+                self._cond.wait(remaining)
+        self.close_idle()
+
+    def resume(self):
+        with self._cond:
+            self._draining = False
+            self._cond.notify_all()
+
+    def stats(self):
+        with self._cond:
+            return {"open": self._open, "idle": len(self._idle),
+                    "max_connections": self.max_connections, "draining": self._draining}
+
+
+_pool = None
+_read_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(DB_PATH)
+    return _pool
+
+
+def get_read_pool():
+    global _read_pool
+    if _read_pool is None:
+        with _pool_lock:
+            if _read_pool is None:
+                _read_pool = ConnectionPool(DB_PATH, readonly=True)
+    return _read_pool
+
+
+def configure_pool(max_connections=None, max_idle=None, timeout=None, profile=None):
+    """Change pool limits or profile; applies to connections opened from now on."""
+    for pool in (get_pool(), get_read_pool()):
+        if profile is not None:
+            # Idle connections carry the old PRAGMAs; let them be reopened
+            pool.profile = profile
+            pool.close_idle()
+        with pool._cond:
+            if max_connections is not None:
+                pool.max_connections = max_connections
+            if max_idle is not None:
+                pool.max_idle = max_idle
+            if timeout is not None:
+                pool.timeout = timeout
+            pool._cond.notify_all()
+
 
 def get_connection():
-    print("Using database at:", DB_PATH)
-    return sqlite3.connect(DB_PATH, timeout=10)
+    return get_pool().acquire()
+
+
+def get_read_connection():
+    """Read-only pooled connection for reports, dashboards and exports."""
+    return get_read_pool().acquire()
+
+
+@contextmanager
+def read_snapshot():
+    """
+    with read_snapshot() as conn: ...
+    Every read on this thread inside the block (including model calls) sees
+    the same committed state, without ever blocking the writer.
+    """
+    conn = get_read_connection()
+    started = not conn.in_transaction
+    try:
+        if started:
+            conn.execute("BEGIN")
+        yield conn
+    finally:
+        if started and conn.in_transaction:
+            conn.rollback()
+        conn.close()
+
+
+@contextmanager
+def connection():
+    """
+    with connection() as conn: ...
+    Commits on success, rolls back on error, always returns the connection.
+    Nested inside another scope on this thread, it only rolls back to its
+    own SAVEPOINT (see PooledConnection.__enter__).
+    """
+    with get_connection() as conn:
+        yield conn
+
+
+def close_all_connections():
+    for pool in (_pool, _read_pool):
+        if pool is not None:
+            pool.close_idle()
+
+
+# ----------------- Taking the database offline ----------------- #
+_online = threading.Event()
+_online.set()
+
+
+def wait_online(timeout=None):
+    """Block while the database file is being swapped; False on timeout."""
+    return _online.wait(timeout)
+
 
+@contextmanager
+def database_offline(timeout=None):
+    """
+    with database_offline(): <replace the DB file>
+    New connections wait, pooled ones are drained and closed, so the file
+    can be swapped under a running app. Connections reopen on resume.
+    The caller must not hold a pooled connection.
+    """
+    _online.clear()
+    pools = [get_pool(), get_read_pool()]
+    try:
+        for pool in pools:
+            pool.drain(timeout)
+        yield
+    finally:
+        for pool in pools:
+            pool.resume()
+        _online.set()
@@ -1,51 +1,32 @@
 import sqlite3
-import os, sys
+import threading
 from datetime import datetime
+from db.database import DB_PATH, get_connection
+from db.timestamps import to_epoch
 
-def get_db_path():
-    """Return correct DB path for dev vs PyInstaller build."""
-    if getattr(sys, 'frozen', False):
-        # Running from PyInstaller bundle → put DB next to the executable
-        base_dir = os.path.dirname(sys.executable)
-    else:
-        # Running normally (dev mode) → put DB next to this file
-        base_dir = os.path.dirname(__file__)
-    return os.path.join(base_dir, "inventory.db")
+# ----------------- Versioned migrations ----------------- #
+# Each entry runs once, in order; PRAGMA user_version records the last one
+# applied. Never edit or reorder a shipped migration - append a new one.
 
-DB_PATH = get_db_path()
-
-MIGRATIONS = {
+LEGACY_COLUMNS = {
     "products": {
-        "cost_price": "REAL DEFAULT 0",
+        "cost_price": "REAL NOT NULL DEFAULT 0",
         "supplier_name": "TEXT DEFAULT 'Unknown'",
-        "last_updated": "TEXT DEFAULT NULL"
+        "last_updated": "REAL DEFAULT 0"
     },
     "sales": {
         "product_name": "TEXT",
-        "profit": "REAL DEFAULT 0",
-        "transaction_id": "INTEGER"
+        "quantity_sold": "INTEGER NOT NULL DEFAULT 0",
+        "total_price": "REAL NOT NULL DEFAULT 0",
+        "profit": "REAL NOT NULL DEFAULT 0",
+        "timestamp": "TEXT",
+        "transaction_id": "INTEGER",
+        "last_updated": "REAL DEFAULT 0"
     }
 }
 
-def log_migration(cursor, message):
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS migration_log (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            timestamp TEXT NOT NULL,
-            message TEXT NOT NULL
-        )
-    """)
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    cursor.execute(
-        "INSERT INTO migration_log (timestamp, message) VALUES (?, ?)",
-        (timestamp, message)
-    )
 
-def run_migrations():
-    conn = sqlite3.connect(DB_PATH, timeout=10)
-    cursor = conn.cursor()
-
-    # --- Base table creation ---
+def _create_base_tables(cursor):
     cursor.execute("""
         CREATE TABLE IF NOT EXISTS users (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -60,31 +41,46 @@ def run_migrations():
             name TEXT NOT NULL,
             category TEXT,
             quantity INTEGER NOT NULL,
-            price REAL NOT NULL
+            price REAL NOT NULL,
+            cost_price REAL NOT NULL DEFAULT 0,
+            supplier_name TEXT DEFAULT 'Unknown',
+            last_updated REAL DEFAULT 0
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS transactions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp TEXT NOT NULL,
+            grand_total REAL NOT NULL
         )
     """)
     cursor.execute("""
         CREATE TABLE IF NOT EXISTS sales (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
-            product_id INTEGER,
-            quantity INTEGER NOT NULL,
-            total REAL NOT NULL,
-            date TEXT NOT NULL,
-            FOREIGN KEY(product_id) REFERENCES products(id)
+            product_id INTEGER NOT NULL,
+            product_name TEXT,
+            quantity_sold INTEGER NOT NULL,
+            total_price REAL NOT NULL,
+            profit REAL NOT NULL DEFAULT 0,
+            timestamp TEXT NOT NULL,
+            transaction_id INTEGER,
+            last_updated REAL DEFAULT 0,
+            FOREIGN KEY (product_id) REFERENCES products(id),
+            FOREIGN KEY (transaction_id) REFERENCES transactions(id)
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS migration_log (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp TEXT NOT NULL,
+            message TEXT NOT NULL
         )
     """)
-    conn.commit()
 
-    # --- Ensure default admin user exists ---
-    cursor.execute("SELECT * FROM users WHERE username=?", ("admin",))
-    if not cursor.fetchone():
-        cursor.execute("INSERT INTO users (username, password, role) VALUES (?, ?, ?)",
-                       ("admin", "admin123", "admin"))
-        print("✅ Default admin user created: username=admin, password=admin123")
-    conn.commit()
 
-    # --- Run migrations on other tables ---
-    for table, columns in MIGRATIONS.items():
+def _add_legacy_columns(cursor):
+    """DBs created by older builds may miss columns; probe once and add them."""
+    for table, columns in LEGACY_COLUMNS.items():
         cursor.execute(f"PRAGMA table_info({table})")
         existing_columns = [col[1] for col in cursor.fetchall()]
 
@@ -93,26 +89,366 @@ def run_migrations():
                 cursor.execute(f"ALTER TABLE {table} ADD COLUMN {col_name} {col_type}")
                 log_migration(cursor, f"Added column '{col_name}' ({col_type}) to table '{table}'")
 
-    # Optional: update last_updated for all products
-    now = datetime.now().isoformat()
+
+def _create_default_admin(cursor):
+    cursor.execute("SELECT 1 FROM users WHERE username=?", ("admin",))
+    if not cursor.fetchone():
+        cursor.execute("INSERT INTO users (username, password, role) VALUES (?, ?, ?)",
+                       ("admin", "admin123", "admin"))
+        print("✅ Default admin user created: username=admin, password=admin123")
+
+
+# Secondary indexes for the model queries (see benchmarks/bench_indexes.py)
+INDEXES = {
+    # finalize_transaction / get_transaction_details: WHERE transaction_id = ?
+    "idx_sales_transaction": "sales(transaction_id, total_price)",
+    # get_sales_summary_per_product / get_best_selling_product: GROUP BY product_id
+    "idx_sales_product": "sales(product_id, quantity_sold, total_price)",
+    # Sale.get_all: ORDER BY timestamp DESC
+    "idx_sales_timestamp": "sales(timestamp)",
+    # get_all_with_category: WHERE products.category = ?
+    "idx_products_category": "products(category)",
+    # get_low_stock: WHERE quantity < ? (covering: name comes from the index)
+    "idx_products_quantity": "products(quantity, name)",
+}
+
+
+def _create_indexes(cursor):
+    for name, target in INDEXES.items():
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {target}")
+    # Give the planner real statistics so it picks the new indexes
+    cursor.execute("ANALYZE")
+
+
+def _add_sales_epoch(cursor):
+    """
+    sales.timestamp was written in several text formats; add an integer
+    epoch column (indexed) so date filters become index range scans.
+    """
+    cursor.execute("PRAGMA table_info(sales)")
+    if "ts_epoch" not in [col[1] for col in cursor.fetchall()]:
+        cursor.execute("ALTER TABLE sales ADD COLUMN ts_epoch INTEGER")
+
+    cursor.execute("SELECT id, timestamp FROM sales WHERE ts_epoch IS NULL")
+    rows = cursor.fetchall()
+    cursor.executemany("UPDATE sales SET ts_epoch = ? WHERE id = ?",
+                       [(to_epoch(ts), sale_id) for sale_id, ts in rows])
+    unparsed = sum(1 for _, ts in rows if to_epoch(ts) is None)
+    if unparsed:
+        log_migration(cursor, f"{unparsed} sales have unreadable timestamps; ts_epoch left NULL")
+
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_sales_ts_epoch ON sales(ts_epoch)")
+    # Sorting/filtering now uses ts_epoch; the text index only costs writes
+    cursor.execute("DROP INDEX IF EXISTS idx_sales_timestamp")
+
+    # Safety net for writers that don't fill ts_epoch themselves: naive
+    # ISO/"YYYY-MM-DD HH:MM:SS" text is local time, same as to_epoch()
+    fill_epoch = """
+        UPDATE sales
+        SET ts_epoch = CAST(strftime('%s', NEW.timestamp, 'utc') AS INTEGER)
+        WHERE id = NEW.id;
+    """
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS sales_ts_epoch_insert
+        AFTER INSERT ON sales
+        WHEN NEW.ts_epoch IS NULL
+        BEGIN {fill_epoch} END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS sales_ts_epoch_update
+        AFTER UPDATE OF timestamp ON sales
+        WHEN NEW.timestamp IS NOT OLD.timestamp AND NEW.ts_epoch IS OLD.ts_epoch
+        BEGIN {fill_epoch} END
+    """)
+
+
+# Tables whose row changes are journaled for point-in-time recovery
+JOURNAL_TABLES = ("products", "sales", "transactions")
+
+# Columns derived from others by triggers (sales_ts_epoch_*); an UPDATE that
+# only fills them is not a change of its own for the journal or the outbox
+DERIVED_COLUMNS = {"sales": ("ts_epoch",)}
+
+
+def _table_columns(cursor, table):
+    cursor.execute(f"PRAGMA table_info({table})")
+    return [col[1] for col in cursor.fetchall()]
+
+
+def _changed(columns, ignore=()):
+    """SQL condition for an UPDATE trigger: some column outside `ignore` changed."""
+    return "(" + " OR ".join(f"NEW.{c} IS NOT OLD.{c}" for c in columns if c not in ignore) + ")"
+
+
+def create_journal_triggers(cursor):
+    """
+    (Re)create the triggers that copy every row change into change_log.
+    Column lists come from the live schema, so a migration that adds a
+    journaled column must call this again.
+    """
+    for table in JOURNAL_TABLES:
+        columns = _table_columns(cursor, table)
+        derived = DERIVED_COLUMNS.get(table, ())
+        now = "(julianday('now') - 2440587.5) * 86400.0"
+        for op, event, ref in (("I", "INSERT", "NEW"), ("U", "UPDATE", "NEW"), ("D", "DELETE", "OLD")):
+            name = f"journal_{table}_{event.lower()}"
+            data = "NULL" if op == "D" else "json_object(" + ", ".join(f"'{c}', {ref}.{c}" for c in columns) + ")"
+            when = f"WHEN {_changed(columns, derived)}" if op == "U" and derived else ""
+            cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+            cursor.execute(f"""
+                CREATE TRIGGER {name} AFTER {event} ON {table}
+                {when}
+                BEGIN
+                    INSERT INTO change_log (ts, tbl, op, row_id, data)
+                    VALUES ({now}, '{table}', '{op}', {ref}.id, {data});
+                END
+            """)
+
+
+def _create_change_log(cursor):
+    """Row-level change log; utils/change_journal.py ships it into journal segments."""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS change_log (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            ts REAL NOT NULL,
+            tbl TEXT NOT NULL,
+            op TEXT NOT NULL,
+            row_id INTEGER NOT NULL,
+            data TEXT
+        )
+    """)
+    create_journal_triggers(cursor)
+
+
+# Tables whose local changes are pushed to Firebase through sync_outbox
+OUTBOX_TABLES = ("products", "sales", "transactions")
+
+
+def create_outbox_triggers(cursor):
+    """
+    (Re)create the triggers that queue locally changed rows in sync_outbox.
+    Rows carrying last_updated are skipped when that column changes: only
+    remote applies and push stamps write it, local edits never do. Updates
+    that only fill derived columns are skipped too. Deletes are not queued -
+    archiving deletes hot sales that must stay in the cloud, and the full
+    push never removed remote rows either.
+    Stamps are compared as numbers: a TEXT-affinity column stores them as
+    text, which never IS-equals the REAL a sync write compares against.
+    """
+    for table in OUTBOX_TABLES:
+        columns = _table_columns(cursor, table)
+        stamped = "last_updated" in columns
+        local_change = _changed(columns, DERIVED_COLUMNS.get(table, ()) + ("last_updated",))
+        conditions = {
+            "INSERT": "WHEN COALESCE(CAST(NEW.last_updated AS REAL), 0) = 0" if stamped else "",
+            "UPDATE": (f"WHEN CAST(NEW.last_updated AS REAL) IS CAST(OLD.last_updated AS REAL) "
+                       f"AND {local_change}") if stamped
+                      else f"WHEN {local_change}",
+        }
+        for event, when in conditions.items():
+            name = f"outbox_{table}_{event.lower()}"
+            cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+            cursor.execute(f"""
+                CREATE TRIGGER {name} AFTER {event} ON {table}
+                {when}
+                BEGIN
+                    INSERT INTO sync_outbox (tbl, row_id) VALUES ('{table}', NEW.id)
+                    ON CONFLICT (tbl, row_id) DO UPDATE SET version = version + 1;
+                END
+            """)
+
+
+def _create_sync_outbox(cursor):
+    """
+    One outbox entry per changed row (tbl, row_id); every further change
+    bumps its version, so the sync worker only acknowledges the version it
+    actually pushed.
+
+    Every existing row is queued once, deliberately: before the outbox each
+    launch pushed the whole database, and nothing records which rows were
+    edited since that last full push (local edits never touch last_updated).
+    The first drain therefore pushes everything one final time, in batches;
+    after that only changed rows are sent.
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS sync_outbox (
+            tbl TEXT NOT NULL,
+            row_id INTEGER NOT NULL,
+            version INTEGER NOT NULL DEFAULT 1,
+            PRIMARY KEY (tbl, row_id)
+        ) WITHOUT ROWID
+    """)
+    create_outbox_triggers(cursor)
+    for table in OUTBOX_TABLES:
+        # One last full push (see docstring) so pre-outbox edits are not lost
+        cursor.execute(f"INSERT OR IGNORE INTO sync_outbox (tbl, row_id) SELECT '{table}', id FROM {table}")
+
+
+def _skip_derived_updates(cursor):
+    """The ts_epoch fill UPDATE journaled and queued every sale a second time."""
+    create_journal_triggers(cursor)
+    create_outbox_triggers(cursor)
+
+
+def _stamp_to_epoch(value):
+    """A stored last_updated (REAL, numeric text or ISO text) as float epoch seconds."""
     try:
-        cursor.execute("UPDATE products SET last_updated = ?", (now,))
-        log_migration(cursor, "Updated 'last_updated' for all products.")
-    except sqlite3.OperationalError:
-        # Skip if last_updated doesn’t exist yet
-        pass
+        return float(value)
+    except (TypeError, ValueError):
+        return float(to_epoch(value) or 0)
 
-    conn.commit()
-    log_migration(cursor, "Database migration completed successfully.")
-    conn.commit()
-    conn.close()
 
-    print("✅ Migration completed. All required tables/columns now exist.")
+def _real_last_updated(cursor):
+    """
+    Databases from before LEGACY_COLUMNS declare last_updated TEXT, and
+    _add_legacy_columns only adds missing columns. TEXT affinity stores
+    every stamp as text, which never compares equal to the REAL stamps sync
+    writes. Rebuild the column as REAL DEFAULT 0 and convert the values.
+    """
+    for table in ("products", "sales"):
+        cursor.execute(f"PRAGMA table_info({table})")
+        declared = {col[1]: col[2].upper() for col in cursor.fetchall()}
+        if declared.get("last_updated", "REAL") == "REAL":
+            continue
+        # The journal/outbox triggers name the column; they are re-created below
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='trigger' AND tbl_name=? "
+                       "AND (name LIKE 'journal_%' OR name LIKE 'outbox_%')", (table,))
+        for (name,) in cursor.fetchall():
+            cursor.execute(f"DROP TRIGGER {name}")
 
+        cursor.execute(f"SELECT id, last_updated FROM {table}")
+        stamps = [(_stamp_to_epoch(value), row_id) for row_id, value in cursor.fetchall()]
+        cursor.execute(f"ALTER TABLE {table} RENAME COLUMN last_updated TO last_updated_text")
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN last_updated REAL DEFAULT 0")
+        cursor.executemany(f"UPDATE {table} SET last_updated = ? WHERE id = ?", stamps)
+        try:
+            cursor.execute(f"ALTER TABLE {table} DROP COLUMN last_updated_text")
+        except sqlite3.OperationalError:
+            # SQLite < 3.35 can't drop columns; the old one just stays unused
+            cursor.execute(f"UPDATE {table} SET last_updated_text = NULL")
+        log_migration(cursor, f"Rebuilt {table}.last_updated as REAL ({len(stamps)} rows converted)")
 
+    create_journal_triggers(cursor)
+    create_outbox_triggers(cursor)
 
-if __name__ == "__main__":
-    run_migrations()
 
+MIGRATIONS = [
+    (1, "Create base tables", _create_base_tables),
+    (2, "Add columns missing from older databases", _add_legacy_columns),
+    (3, "Create default admin user", _create_default_admin),
+    (4, "Add indexes for sales/products hot queries", _create_indexes),
+    (5, "Add indexed integer sales.ts_epoch", _add_sales_epoch),
+    (6, "Add change_log journal triggers", _create_change_log),
+    (7, "Add sync_outbox for incremental Firebase push", _create_sync_outbox),
+    (8, "Skip ts_epoch-only updates in journal/outbox triggers", _skip_derived_updates),
+    (9, "Store last_updated with REAL affinity", _real_last_updated),
+    (10, "Compare last_updated numerically in outbox triggers", create_outbox_triggers),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def log_migration(cursor, message):
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    cursor.execute(
+        "INSERT INTO migration_log (timestamp, message) VALUES (?, ?)",
+        (timestamp, message)
+    )
+
+
+def get_schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def run_migrations():
+    """
+    Apply every migration newer than PRAGMA user_version in one transaction.
+    On an up-to-date database this is a single PRAGMA read.
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+    try:
+        if get_schema_version(conn) >= SCHEMA_VERSION:
+            return
+
+        cursor.execute("BEGIN IMMEDIATE")
+        # Re-read under the write lock: another thread may have migrated already
+        current = get_schema_version(conn)
+        applied = []
+        for version, description, migrate in MIGRATIONS:
+            if version <= current:
+                continue
+            migrate(cursor)
+            log_migration(cursor, f"Migration {version}: {description}")
+            applied.append(version)
+
+        if applied:
+            cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            log_migration(cursor, f"Database migrated from version {current} to {SCHEMA_VERSION}.")
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+    invalidate_schema()
+    if applied:
+        print(f"✅ Migration completed. Schema is now at version {SCHEMA_VERSION}.")
 
 
+# ----------------- Cached schema capabilities ----------------- #
+class SchemaCapabilities:
+    """
+    Snapshot of which tables/columns exist, read once after migrations.
+    Hot paths ask this instead of running PRAGMA table_info themselves.
+    """
+
+    def __init__(self, version, columns):
+        self.version = version
+        self.columns = columns  # {table: set(column names)}
+
+    @property
+    def is_current(self):
+        return self.version >= SCHEMA_VERSION
+
+    def has_table(self, table):
+        return table in self.columns
+
+    def has_column(self, table, column):
+        return column in self.columns.get(table, ())
+
+
+_schema = None
+_schema_lock = threading.Lock()
+
+
+def get_schema():
+    global _schema
+    if _schema is None:
+        with _schema_lock:
+            if _schema is None:
+                conn = get_connection()
+                try:
+                    version = get_schema_version(conn)
+                    tables = [row[0] for row in conn.execute(
+                        "SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%'"
+                    )]
+                    columns = {
+                        table: {col[1] for col in conn.execute(f"PRAGMA table_info({table})")}
+                        for table in tables
+                    }
+                finally:
+                    conn.close()
+                _schema = SchemaCapabilities(version, columns)
+    return _schema
+
+
+def invalidate_schema():
+    """Forget the cached schema (after migrating or swapping the DB file)."""
+    global _schema
+    _schema = None
+
+
+if __name__ == "__main__":
+    run_migrations()
@@ -0,0 +1,254 @@
+import atexit
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+from utils.app_config import get_config
+
+# ----------------- Query instrumentation ----------------- #
+# Connections opened by db.database use InstrumentedConnection, whose
+# cursors time every statement (execute + fetch) and file the sample under
+# the normalized SQL text. Statements slower than SLOW_QUERY_MS get their
+# EXPLAIN QUERY PLAN printed once.
+
+SLOW_QUERY_MS = get_config("slow_query_ms", 100)
+SAMPLES_PER_STATEMENT = 1024   # recent latencies kept per statement for percentiles
+
+_WS = re.compile(r"\s+")
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\bIN\s*\((?:\s*\?\s*,)*\s*\?\s*\)", re.IGNORECASE)
+_EXPLAINABLE = ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE", "REPLACE")
+
+
+def normalize_sql(sql):
+    """Collapse whitespace and literals so equal statements share one key."""
+    text = _WS.sub(" ", sql).strip()
+    text = _STRING.sub("?", text)
+    text = _NUMBER.sub("?", text)
+    return _IN_LIST.sub("IN (...)", text)
+
+
+class StatementStats:
+    __slots__ = ("sql", "count", "total_ms", "max_ms", "rows", "errors", "samples", "plan")
+
+    def __init__(self, sql):
+        self.sql = sql
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.rows = 0
+        self.errors = 0
+        self.samples = deque(maxlen=SAMPLES_PER_STATEMENT)
+        self.plan = None
+
+    def percentile(self, pct):
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+        return ordered[index]
+
+    def as_dict(self):
+        return {
+            "sql": self.sql,
+            "count": self.count,
+            "total_ms": round(self.total_ms, 3),
+            "mean_ms": round(self.total_ms / self.count, 3) if self.count else 0.0,
+            "p50_ms": round(self.percentile(50), 3),
+            "p95_ms": round(self.percentile(95), 3),
+            "p99_ms": round(self.percentile(99), 3),
+            "max_ms": round(self.max_ms, 3),
+            "rows": self.rows,
+            "errors": self.errors,
+            "plan": self.plan,
+        }
+
+
+class QueryStats:
+    def __init__(self, slow_query_ms=SLOW_QUERY_MS):
+        self.slow_query_ms = slow_query_ms
+        self.enabled = True
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def record(self, key, elapsed_ms, rows, error=False):
+        with self._lock:
+            entry = self._stats.get(key)
+            if entry is None:
+                entry = self._stats[key] = StatementStats(key)
+            entry.count += 1
+            entry.total_ms += elapsed_ms
+            entry.max_ms = max(entry.max_ms, elapsed_ms)
+            entry.rows += max(rows, 0)
+            entry.errors += 1 if error else 0
+            entry.samples.append(elapsed_ms)
+            wants_plan = (elapsed_ms >= self.slow_query_ms and entry.plan is None
+                          and key.split(" ", 1)[0].upper() in _EXPLAINABLE)
+            if wants_plan:
+                entry.plan = []  # claim it so the plan is only fetched once
+        return wants_plan
+
+    def set_plan(self, key, plan):
+        with self._lock:
+            if key in self._stats:
+                self._stats[key].plan = plan
+
+    def snapshot(self, sort_by="total_ms"):
+        with self._lock:
+            rows = [entry.as_dict() for entry in self._stats.values()]
+        return sorted(rows, key=lambda r: r[sort_by], reverse=True)
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+    def dump_json(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({
+                "generated_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+                "slow_query_ms": self.slow_query_ms,
+                "statements": self.snapshot(),
+            }, f, indent=2)
+        return path
+
+
+query_stats = QueryStats()
+query_stats.enabled = get_config("query_stats", True)
+
+# Optional: write the stats to this JSON file when the app exits
+QUERY_STATS_FILE = get_config("query_stats_file")
+if QUERY_STATS_FILE:
+    atexit.register(lambda: query_stats.dump_json(QUERY_STATS_FILE))
+
+
+def _explain(conn, key, sql, params):
+    try:
+        # Plain sqlite3.Cursor so the EXPLAIN itself is not instrumented
+        rows = sqlite3.Cursor(conn).execute("EXPLAIN QUERY PLAN " + sql, params).fetchall()
+        plan = [row[-1] for row in rows]
+    except sqlite3.Error as e:
+        plan = [f"(plan unavailable: {e})"]
+    query_stats.set_plan(key, plan)
+    print(f"🐢 Slow query (≥{query_stats.slow_query_ms} ms): {key}")
+    for step in plan:
+        print(f"    {step}")
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """
+    Times each statement from execute() until its rows are fetched (or the
+    next execute/close), so large result sets count their fetch cost too.
+    """
+
+    _pending = None
+
+    def _finish(self, error=False):
+        pending, self._pending = self._pending, None
+        if pending is None:
+            return
+        key, sql, params, elapsed, rows = pending
+        if query_stats.record(key, elapsed * 1000.0, rows, error) and params is not None:
+            _explain(self.connection, key, sql, params)
+
+    def _timed(self, fn, *args):
+        start = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            if self._pending is not None:
+                self._pending[3] += time.perf_counter() - start
+
+    def execute(self, sql, params=()):
+        self._finish()
+        if not query_stats.enabled:
+            return super().execute(sql, params)
+        self._pending = [normalize_sql(sql), sql, params, 0.0, 0]
+        try:
+            self._timed(super().execute, sql, params)
+        except Exception:
+            self._finish(error=True)
+            raise
+        if self.description is None:
+            # No result set: DML/DDL is complete
+            self._pending[4] = self.rowcount
+            self._finish()
+        return self
+
+    def executemany(self, sql, seq_of_params):
+        self._finish()
+        if not query_stats.enabled:
+            return super().executemany(sql, seq_of_params)
+        self._pending = [normalize_sql(sql), sql, None, 0.0, 0]
+        try:
+            self._timed(super().executemany, sql, seq_of_params)
+        except Exception:
+            self._finish(error=True)
+            raise
+        self._pending[4] = self.rowcount
+        self._finish()
+        return self
+
+    def fetchone(self):
+        row = self._timed(super().fetchone)
+        if self._pending is not None:
+            if row is None:
+                self._finish()
+            else:
+                self._pending[4] += 1
+        return row
+
+    def fetchmany(self, size=None):
+        rows = self._timed(super().fetchmany, self.arraysize if size is None else size)
+        if self._pending is not None:
+            self._pending[4] += len(rows)
+            if not rows:
+                self._finish()
+        return rows
+
+    def fetchall(self):
+        rows = self._timed(super().fetchall)
+        if self._pending is not None:
+            self._pending[4] += len(rows)
+            self._finish()
+        return rows
+
+    # "for row in cursor" steps through rows here, not in fetch*()
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        try:
+            row = self._timed(super().__next__)
+        except StopIteration:
+            self._finish()
+            raise
+        if self._pending is not None:
+            self._pending[4] += 1
+        return row
+
+    def close(self):
+        self._finish()
+        super().close()
+
+    def __del__(self):
+        try:
+            self._finish()
+        except Exception:
+            pass
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """sqlite3.connect(..., factory=InstrumentedConnection); conn.execute() is covered too."""
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    # The C-level shortcuts bypass cursor(); route them through it
+    def execute(self, sql, params=()):
+        return self.cursor().execute(sql, params)
+
+    def executemany(self, sql, seq_of_params):
+        return self.cursor().executemany(sql, seq_of_params)
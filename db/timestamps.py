@@ -0,0 +1,48 @@
+from datetime import date, datetime
+
+# Every format sales.timestamp has been written in over the app's history
+SALE_TIMESTAMP_FORMATS = (
+    "%Y-%m-%d %H:%M:%S",
+    "%Y-%m-%d",
+    "%Y-%m-%dT%H:%M:%S.%f",
+    "%d/%m/%Y",
+    "%Y/%m/%d",
+    "%m/%d/%Y",
+)
+
+
+def to_epoch(value):
+    """
+    Convert a sale timestamp (datetime, date, epoch number or any of the
+    stored text formats) to integer Unix seconds, or None if unparseable.
+    Naive values are local time, like everything datetime.now() wrote;
+    values with a UTC offset are honoured.
+    """
+    if value is None or value == "":
+        return None
+    if isinstance(value, datetime):
+        return int(value.timestamp())
+    if isinstance(value, date):
+        return int(datetime(value.year, value.month, value.day).timestamp())
+    if isinstance(value, (int, float)):
+        return int(value)
+
+    text = str(value).strip()
+    try:
+        return int(datetime.fromisoformat(text.replace("Z", "+00:00")).timestamp())
+    except ValueError:
+        pass
+    for fmt in SALE_TIMESTAMP_FORMATS:
+        try:
+            return int(datetime.strptime(text, fmt).timestamp())
+        except ValueError:
+            continue
+    return None
+
+
+def from_epoch(value):
+    """Integer Unix seconds back to a local naive datetime (None stays None)."""
+    if value is None:
+        return None
+    return datetime.fromtimestamp(value)
+
@@ -0,0 +1,231 @@
+import atexit
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+
+import db.database as database
+from utils.app_config import get_config
+
+# ----------------- Single-writer queue ----------------- #
+# Every mutation is a job: a function taking the writer's connection. One
+# thread owns the only write connection and commits queued jobs in batches,
+# so the Tk thread and the Firebase stream threads never race for the lock.
+
+WRITER_BATCH_SIZE = get_config("writer_batch_size", 500)
+# How long the writer lingers for more jobs before committing a batch.
+# 0 = commit as soon as the queue is empty (bursts still group naturally).
+WRITER_BATCH_LATENCY_MS = get_config("writer_batch_latency_ms", 0)
+
+_STOP = object()
+
+
+class _Job:
+    __slots__ = ("fn", "future")
+
+    def __init__(self, fn):
+        self.fn = fn
+        self.future = Future()
+
+
+class WriteQueue:
+    """
+    Owns the write connection and applies jobs in batched transactions.
+    Each job runs inside its own SAVEPOINT, so a failing job only undoes
+    itself; its future gets the exception, the rest of the batch commits.
+    Futures resolve after COMMIT, so callers can read their writes back.
+    """
+
+    def __init__(self, path, batch_size=WRITER_BATCH_SIZE, batch_latency_ms=WRITER_BATCH_LATENCY_MS):
+        self.path = path
+        self.batch_size = max(1, int(batch_size))
+        self.batch_latency = max(0.0, float(batch_latency_ms) / 1000.0)
+        self._queue = queue.Queue()
+        self._conn = None
+        self._stopping = False
+        self._submit_lock = threading.Lock()   # nothing is queued behind _STOP
+        self._thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+        self._thread.start()
+
+    # ----- public API -----
+    def submit(self, fn):
+        """Queue fn(conn); returns a Future with fn's return value."""
+        if threading.current_thread() is self._thread:
+            # Nested write from inside a job: run it in the current transaction,
+            # in its own SAVEPOINT like a queued job, so a failure only undoes itself
+            future = Future()
+            future.set_running_or_notify_cancel()
+            conn = self._conn
+            conn.execute("SAVEPOINT nested_write_job")
+            try:
+                value = fn(conn)
+            except BaseException as e:
+                conn.execute("ROLLBACK TO nested_write_job")
+                conn.execute("RELEASE nested_write_job")
+                future.set_exception(e)
+            else:
+                conn.execute("RELEASE nested_write_job")
+                future.set_result(value)
+            return future
+        job = _Job(fn)
+        with self._submit_lock:
+            if self._stopping or not self._thread.is_alive():
+                raise RuntimeError("Database writer is stopped")
+            self._queue.put(job)
+        return job.future
+
+    def execute(self, sql, params=()):
+        """Queue one statement; the Future resolves to cursor.lastrowid."""
+        return self.submit(lambda conn: conn.execute(sql, params).lastrowid)
+
+    def executemany(self, sql, rows):
+        """Queue executemany; the Future resolves to cursor.rowcount."""
+        rows = list(rows)
+        return self.submit(lambda conn: conn.executemany(sql, rows).rowcount)
+
+    def flush(self, timeout=None):
+        """Block until everything queued so far is committed."""
+        self.submit(lambda conn: None).result(timeout)
+
+    def stop(self, timeout=None):
+        """Commit what is queued, refuse new jobs and end the writer thread."""
+        with self._submit_lock:
+            if not self._stopping:
+                self._stopping = True
+                self._queue.put(_STOP)
+        if self._thread.is_alive() and threading.current_thread() is not self._thread:
+            self._thread.join(timeout)
+
+    def pending(self):
+        return self._queue.qsize()
+
+    # ----- writer thread -----
+    def _connect(self):
+        return database.open_connection(self.path, isolation_level=None)
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            job = self._queue.get()
+            if job is _STOP:
+                break
+            batch = [job]
+            deadline = time.monotonic() + self.batch_latency
+            while len(batch) < self.batch_size:
+                try:
+                    if self.batch_latency:
+                        nxt = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                    else:
+                        nxt = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if nxt is _STOP:
+                    stopping = True
+                    break
+                batch.append(nxt)
+            self._commit_batch(batch)
+
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+        # Nothing should be left, but a Future nobody resolves hangs its caller forever
+        while True:
+            try:
+                job = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if job is not _STOP and job.future.set_running_or_notify_cancel():
+                job.future.set_exception(RuntimeError("Database writer is stopped"))
+
+    def _commit_batch(self, batch):
+        outcomes = []
+        try:
+            if self._conn is None:
+                self._conn = self._connect()
+            conn = self._conn
+            conn.execute("BEGIN IMMEDIATE")
+            for job in batch:
+                if not job.future.set_running_or_notify_cancel():
+                    outcomes.append(None)
+                    continue
+                conn.execute("SAVEPOINT write_job")
+                try:
+                    value = job.fn(conn)
+                except BaseException as e:
+                    conn.execute("ROLLBACK TO write_job")
+                    conn.execute("RELEASE write_job")
+                    outcomes.append((False, e))
+                else:
+                    conn.execute("RELEASE write_job")
+                    outcomes.append((True, value))
+            conn.execute("COMMIT")
+        except BaseException as e:
+            print(f"⚠️ Database writer batch failed: {e}")
+            try:
+                if self._conn is not None and self._conn.in_transaction:
+                    self._conn.rollback()
+            except sqlite3.Error:
+                self._conn = None
+            for job in batch:
+                if not job.future.done():
+                    if job.future.running():
+                        job.future.set_exception(e)
+                    elif job.future.set_running_or_notify_cancel():
+                        job.future.set_exception(e)
+            return
+
+        for job, outcome in zip(batch, outcomes):
+            if outcome is None:
+                continue
+            ok, value = outcome
+            if ok:
+                job.future.set_result(value)
+            else:
+                job.future.set_exception(value)
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_writer():
+    global _writer
+    if _writer is None:
+        # Don't open a write connection while the DB file is being swapped
+        if not database.wait_online(database.POOL_TIMEOUT):
+            raise database.PoolTimeout("Database is offline (restore in progress)")
+        with _writer_lock:
+            if _writer is None:
+                _writer = WriteQueue(database.DB_PATH)
+    return _writer
+
+
+def submit_write(fn):
+    return get_writer().submit(fn)
+
+
+def run_write(fn):
+    """Queue fn(conn) and wait for it to commit; returns fn's result."""
+    return get_writer().submit(fn).result()
+
+
+def execute_write(sql, params=()):
+    return get_writer().execute(sql, params)
+
+
+def flush_writes(timeout=None):
+    if _writer is not None:
+        _writer.flush(timeout)
+
+
+def stop_writer(timeout=None):
+    """Commit what is queued and close the write connection."""
+    global _writer
+    with _writer_lock:
+        writer, _writer = _writer, None
+    if writer is not None:
+        writer.stop(timeout)
+
+
+atexit.register(stop_writer)
@@ -1,8 +1,8 @@
 from db.database import get_connection
-from firebase_config import fire_db
+from utils.remote_db import get_remote_db
 
 def download_products(cursor):
-    products = fire_db.child("products").get().val()
+    products = get_remote_db().child("products").get().val()
     count = 0
 
     if isinstance(products, dict):
@@ -17,7 +17,7 @@ def download_products(cursor):
 
 
 def download_sales(cursor):
-    sales = fire_db.child("sales").get().val()
+    sales = get_remote_db().child("sales").get().val()
     count = 0
 
     if isinstance(sales, dict):
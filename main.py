@@ -3,10 +3,14 @@ from PIL import Image
 from ui.dashboard import Dashboard
 from ui.login import LoginWindow
 from ui.splash_screen import SplashScreen
+from ui.upload_progress import UploadProgressWindow
 from db.migrations import run_migrations
-from utils.backup import auto_backup
-from cloud_backup import upload_backup, download_backup
-from sync_products import ensure_last_updated_columns, sync_to_firebase, sync_from_firebase, start_listeners, stop_listeners
+from db.archive import archive_sales
+from utils.backup import auto_backup, flush_backups
+from utils.change_journal import start_journal_shipper, stop_journal_shipper
+from cloud_backup import download_backup, has_pending_upload, start_background_upload
+from sync_products import (ensure_last_updated_columns, sync_to_firebase, sync_from_firebase, start_listeners,
+                           stop_listeners, start_sync_worker, stop_sync_worker)
 from utils.path_helper import resource_path
 
 
@@ -20,9 +24,18 @@ def get_version():
 
 
 
+def save_local_backups():
+    stop_sync_worker()       # push the last local changes (the rest waits in the outbox)
+    stop_journal_shipper()   # journal the last changes
+    flush_backups()          # write out the pending local backup, if any
+
+
 def open_dashboard(username, role, login_window):
     
     # Called after successful login
+    # Closing an earlier dashboard stopped these (save_local_backups); no-ops if running
+    start_journal_shipper()
+    start_sync_worker()
     dashboard = Dashboard(login_window.master, username, role, APP_VERSION)
     
     def _destroy_login():
@@ -33,8 +46,8 @@ def open_dashboard(username, role, login_window):
     # Attach cloud backup on dashboard exit too
     def on_dashboard_exit():
         print("💾 Saving backup before exit (dashboard)...")
-        upload_backup()
-        dashboard.destroy()
+        dashboard.withdraw()   # close right away; the upload finishes behind a small progress window
+        UploadProgressWindow(login_window.master, on_done=dashboard.destroy, before_upload=save_local_backups)
 
     dashboard.protocol("WM_DELETE_WINDOW", on_dashboard_exit)
 
@@ -42,14 +55,20 @@ if __name__ == "__main__":
     APP_VERSION = get_version()
     # -------- Database + Sync -------- #
     run_migrations()
+    archive_sales()     # move closed years out of the hot DB (no-op most days)
 
     print("🔄 Checking for cloud backup...")
-    download_backup()   # restore latest cloud copy first
+    download_backup(force=False)   # restore the cloud copy first, only if it is newer than ours
     auto_backup()       # then make sure a local backup copy exists
+    start_journal_shipper()   # change_log -> journal segments for point-in-time restore
     ensure_last_updated_columns()
-    sync_to_firebase()    # push local changes up first (optional)
+    sync_to_firebase()    # push rows changed locally since the last sync (outbox)
     sync_from_firebase()  # pull remote (merges with ts resolution)
     start_listeners()     # keep real-time listeners running
+    start_sync_worker()   # keep pushing local changes while the app runs
+    if has_pending_upload():
+        print("☁️ Continuing the cloud upload left unfinished last time...")
+        start_background_upload()
 
     # -------- UI Setup -------- #
     ctk.set_appearance_mode("System")
@@ -72,9 +91,12 @@ if __name__ == "__main__":
     # Attach backup to login exit
     def on_exit():
         print("💾 Saving backup before exit (login)...")
-        upload_backup()
-        stop_listeners()
-        root.destroy()
+        login_window.withdraw()
+
+        def done():
+            stop_listeners()
+            root.destroy()
+        UploadProgressWindow(root, on_done=done, before_upload=save_local_backups)
 
     login_window.protocol("WM_DELETE_WINDOW", on_exit)
     login_window.mainloop()
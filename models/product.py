@@ -1,5 +1,6 @@
-from db.database import get_connection
-from utils.backup import auto_backup
+from db.database import get_read_connection
+from db.writer import execute_write
+from utils.backup import request_backup
 import time
 
 
@@ -13,22 +14,17 @@ class Product:
         self.cost_price = cost_price
 
     def save(self):
-        conn = get_connection()
-        cursor = conn.cursor()
-
-        cursor.execute('''
+        self.id = execute_write('''
             INSERT INTO products (name, category, quantity, price, cost_price)
             VALUES (?, ?, ?, ?, ?)
-        ''', (self.name, self.category, self.quantity, self.price, self.cost_price))
+        ''', (self.name, self.category, self.quantity, self.price, self.cost_price)).result()
 
-        conn.commit()
-        conn.close()
-        auto_backup()  # Backup after adding
+        request_backup()  # Backup after adding
         
 
     @staticmethod
     def get_all():
-        conn = get_connection()
+        conn = get_read_connection()
         cursor = conn.cursor()
         cursor.execute("""
             SELECT id, name, category, quantity, price, cost_price
@@ -41,7 +37,7 @@ class Product:
 
     @staticmethod
     def get_by_id(product_id):
-        conn = get_connection()
+        conn = get_read_connection()
         cursor = conn.cursor()
         cursor.execute("""
             SELECT id, name, category, quantity, price, cost_price
@@ -56,20 +52,16 @@ class Product:
     
     @staticmethod
     def update_quantity(product_id, new_quantity):
-        conn = get_connection()
-        cursor = conn.cursor()
-        cursor.execute('''
+        execute_write('''
             UPDATE products
             SET quantity = ?
             WHERE id = ?
-        ''', (new_quantity, product_id))
-        conn.commit()
-        conn.close()
-        auto_backup()
+        ''', (new_quantity, product_id)).result()
+        request_backup()
 
     @staticmethod
     def get_all_categories():
-        conn = get_connection()
+        conn = get_read_connection()
         cursor = conn.cursor()
         cursor.execute("SELECT DISTINCT category FROM products ORDER BY category ASC")
         rows = cursor.fetchall()
@@ -96,32 +88,26 @@ class Product:
         Handles 'No Category' as empty/NULL in DB.
         Ignores case differences and trims spaces.
         """
-        conn = get_connection()
-        cursor = conn.cursor()
-
         # Handle the "No Category" pseudo-category in UI
         if old_category.strip().lower() == "no category":
-            cursor.execute("""
+            execute_write("""
                 UPDATE products
                 SET category = ?
                 WHERE category IS NULL
                 OR TRIM(category) = ''
-            """, (new_category.strip(),))
+            """, (new_category.strip(),)).result()
         else:
-            cursor.execute("""
+            execute_write("""
                 UPDATE products
                 SET category = ?
                 WHERE LOWER(TRIM(category)) = LOWER(?)
-            """, (new_category.strip(), old_category.strip()))
-
-        conn.commit()
-        conn.close()
+            """, (new_category.strip(), old_category.strip())).result()
 
 
 
     @staticmethod
     def get_low_stock(threshold=5):
-        conn = get_connection()
+        conn = get_read_connection()
         cursor = conn.cursor()
         cursor.execute("SELECT name, quantity FROM products WHERE quantity < ?", (threshold,))
         items = cursor.fetchall()
@@ -131,53 +117,37 @@ class Product:
     
     @staticmethod
     def update_product(product_id, name, category, quantity, price, cost_price):
-        conn = get_connection()
-        cursor = conn.cursor()
-        cursor.execute('''
+        execute_write('''
             UPDATE products
             SET name = ?, category = ?, quantity = ?, price = ?, cost_price = ?
             WHERE id = ?
-        ''', (name, category, quantity, price, cost_price, product_id))
-        conn.commit()
-        conn.close()
-        auto_backup()
+        ''', (name, category, quantity, price, cost_price, product_id)).result()
+        request_backup()
 
     @staticmethod
     def restock_product(product_id, added_quantity):
-        conn = get_connection()
-        cursor = conn.cursor()
-        cursor.execute('''
+        execute_write('''
             UPDATE products
             SET quantity = quantity + ?
             WHERE id = ?
-        ''', (added_quantity, product_id))
-        conn.commit()
-        conn.close()
-        auto_backup()
+        ''', (added_quantity, product_id)).result()
+        request_backup()
 
 
     @staticmethod
     def delete(product_id):
-        conn = get_connection()
-        cursor = conn.cursor()
-        cursor.execute('DELETE FROM products WHERE id = ?', (product_id,))
-        conn.commit()
-        conn.close()
-        auto_backup()
+        execute_write('DELETE FROM products WHERE id = ?', (product_id,)).result()
+        request_backup()
 
     @staticmethod
     def clear_all():
-        conn = get_connection()
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM products")
-        conn.commit()
-        conn.close()
-        auto_backup()
+        execute_write("DELETE FROM products").result()
+        request_backup()
         
         
     @staticmethod
     def get_all_migration_logs():
-        conn = get_connection()
+        conn = get_read_connection()
         cursor = conn.cursor()
         cursor.execute("SELECT * FROM migration_log ORDER BY id DESC")
         rows = cursor.fetchall()
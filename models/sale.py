@@ -1,7 +1,40 @@
 import time
 from datetime import datetime
-from db.database import get_connection
-from utils.backup import auto_backup
+from db.archive import clear_archives, product_totals_sources, sales_source
+from db.database import get_read_connection
+from db.timestamps import from_epoch, to_epoch
+from db.writer import execute_write, run_write
+from utils.backup import request_backup
+
+def _date_range(column, start=None, end=None):
+    """WHERE clause for an indexed epoch range: start inclusive, end exclusive."""
+    clauses, params = [], []
+    if start is not None:
+        clauses.append(f"{column} >= ?")
+        params.append(to_epoch(start))
+    if end is not None:
+        clauses.append(f"{column} < ?")
+        params.append(to_epoch(end))
+    return ("WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+
+def _product_totals(conn, start=None, end=None):
+    """
+    Table expression of (product_id, quantity, revenue, profit, sales_count)
+    rows for [start, end). Without a range, archived years contribute their
+    precomputed per-product totals instead of every sale they hold.
+    """
+    if start is None and end is None:
+        arms = ["SELECT product_id, quantity_sold AS quantity, total_price AS revenue, profit, 1 AS sales_count "
+                "FROM main.sales"]
+        arms += [f"SELECT product_id, quantity, revenue, profit, sales_count FROM {table}"
+                 for table in product_totals_sources(conn)]
+        return "(" + " UNION ALL ".join(arms) + ")", []
+
+    where, params = _date_range("ts_epoch", start, end)
+    return (f"(SELECT product_id, quantity_sold AS quantity, total_price AS revenue, profit, 1 AS sales_count "
+            f"FROM {sales_source(conn, start, end)} {where})"), params
+
 
 class Sale:
     def __init__(self, product_id, quantity_sold):
@@ -11,46 +44,46 @@ class Sale:
 
 
     def save(self):
-        conn = get_connection()
-        cursor = conn.cursor()
-
-        cursor.execute("SELECT quantity, price, cost_price, name FROM products WHERE id = ?", (self.product_id,))
-        product = cursor.fetchone()
-
-        if not product:
-            print("Product not found!")
-            conn.close()
-            return None  # return nothing if failed
-
-        current_quantity, price_per_unit, cost_price, product_name = product
-
-        if self.quantity_sold > current_quantity:
-            print("Not enough stock!")
-            conn.close()
+        def record_sale(conn):
+            cursor = conn.cursor()
+            cursor.execute("SELECT quantity, price, cost_price, name FROM products WHERE id = ?", (self.product_id,))
+            product = cursor.fetchone()
+
+            if not product:
+                print("Product not found!")
+                return None  # return nothing if failed
+
+            current_quantity, price_per_unit, cost_price, product_name = product
+
+            if self.quantity_sold > current_quantity:
+                print("Not enough stock!")
+                return None
+
+            total_price = price_per_unit * self.quantity_sold
+            profit_per_unit = price_per_unit - cost_price
+            total_profit = profit_per_unit * self.quantity_sold
+            
+
+            cursor.execute('''
+                INSERT INTO sales (product_id, product_name, quantity_sold, total_price, profit, timestamp, ts_epoch)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', (self.product_id, product_name, self.quantity_sold, total_price, total_profit, self.timestamp,
+                  to_epoch(self.timestamp)))
+
+            sale_id = cursor.lastrowid  # ✅ capture the ID
+
+            new_quantity = current_quantity - self.quantity_sold
+            cursor.execute('''
+                UPDATE products
+                SET quantity = ?
+                WHERE id = ?
+            ''', (new_quantity, self.product_id))
+            return sale_id
+
+        sale_id = run_write(record_sale)
+        if sale_id is None:
             return None
-
-        total_price = price_per_unit * self.quantity_sold
-        profit_per_unit = price_per_unit - cost_price
-        total_profit = profit_per_unit * self.quantity_sold
-        
-
-        cursor.execute('''
-            INSERT INTO sales (product_id, product_name, quantity_sold, total_price, profit, timestamp)
-            VALUES (?, ?, ?, ?, ?, ?)
-        ''', (self.product_id, product_name, self.quantity_sold, total_price, total_profit, self.timestamp))
-
-        sale_id = cursor.lastrowid  # ✅ capture the ID
-
-        new_quantity = current_quantity - self.quantity_sold
-        cursor.execute('''
-            UPDATE products
-            SET quantity = ?
-            WHERE id = ?
-        ''', (new_quantity, self.product_id))
-
-        conn.commit()
-        conn.close()
-        auto_backup()
+        request_backup()
 
         return sale_id  # ✅ return new sale id
 
@@ -58,53 +91,57 @@ class Sale:
         
     @staticmethod
     def add(product_id, quantity_sold, total_price=None, profit=None, transaction_id=None):
-        conn = get_connection()
-        cursor = conn.cursor()
+        now = datetime.now()
+        timestamp = now.isoformat()
 
-        timestamp = datetime.now().isoformat()
+        def insert_sale(conn):
+            cursor = conn.cursor()
 
-        # Get product details
-        cursor.execute("SELECT name, price, cost_price FROM products WHERE id = ?", (product_id,))
-        product = cursor.fetchone()
-        if not product:
-            conn.close()
-            raise ValueError("Invalid product_id")
+            # Get product details
+            cursor.execute("SELECT name, price, cost_price FROM products WHERE id = ?", (product_id,))
+            product = cursor.fetchone()
+            if not product:
+                raise ValueError("Invalid product_id")
 
-        product_name, selling_price, cost_price = product
+            product_name, selling_price, cost_price = product
 
-        # Auto calculate total price if not provided
-        if total_price is None:
-            total_price = selling_price * quantity_sold
+            # Auto calculate total price if not provided
+            line_total = total_price
+            if line_total is None:
+                line_total = selling_price * quantity_sold
 
-        # Auto calculate profit if not provided
-        if profit is None:
-            profit = (selling_price - cost_price) * quantity_sold
+            # Auto calculate profit if not provided
+            line_profit = profit
+            if line_profit is None:
+                line_profit = (selling_price - cost_price) * quantity_sold
 
-        cursor.execute("""
-            INSERT INTO sales (product_id, product_name, quantity_sold, total_price, profit, timestamp, transaction_id)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        """, (product_id, product_name, quantity_sold, total_price, profit, timestamp, transaction_id))
+            cursor.execute("""
+                INSERT INTO sales (product_id, product_name, quantity_sold, total_price, profit, timestamp, ts_epoch, transaction_id)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, (product_id, product_name, quantity_sold, line_total, line_profit, timestamp, to_epoch(now),
+                  transaction_id))
+            return cursor.lastrowid
 
-        conn.commit()
-        sale_id = cursor.lastrowid
-        conn.close()
+        sale_id = run_write(insert_sale)
 
-        auto_backup()
+        request_backup()
         return sale_id
 
 
     @staticmethod
-    def get_all():
-        conn = get_connection()
+    def get_all(start=None, end=None):
+        conn = get_read_connection()
         cursor = conn.cursor()
 
-        cursor.execute('''
+        where, params = _date_range("sales.ts_epoch", start, end)
+        cursor.execute(f'''
             SELECT sales.id, products.name, sales.quantity_sold, sales.total_price, 
                 sales.profit, sales.timestamp
-            FROM sales
+            FROM {sales_source(conn, start, end)} AS sales
             JOIN products ON sales.product_id = products.id
-            ORDER BY sales.timestamp DESC
-        ''')
+            {where}
+            ORDER BY sales.ts_epoch DESC
+        ''', params)
         results = cursor.fetchall()
 
         conn.close()
@@ -112,12 +149,12 @@ class Sale:
     
     @staticmethod
     def get_by_id(sale_id):
-        conn = get_connection()
+        conn = get_read_connection()
         cursor = conn.cursor()
-        cursor.execute("""
+        cursor.execute(f"""
             SELECT sales.id, products.name, products.category, 
                    sales.quantity_sold, sales.total_price, sales.profit, sales.timestamp
-            FROM sales
+            FROM {sales_source(conn)} AS sales
             JOIN products ON sales.product_id = products.id
             WHERE sales.id = ?
         """, (sale_id,))
@@ -128,86 +165,114 @@ class Sale:
 
         
     @staticmethod
-    def get_best_selling_product():
-        conn = get_connection()
+    def get_best_selling_product(start=None, end=None):
+        conn = get_read_connection()
         cursor = conn.cursor()
         
-        cursor.execute("""
+        totals, params = _product_totals(conn, start, end)
+        cursor.execute(f"""
             SELECT s.product_id, p.name, 
-                SUM(s.quantity_sold) AS total_qty, 
-                SUM(s.total_price) AS revenue
-            FROM sales s
+                SUM(s.quantity) AS total_qty, 
+                SUM(s.revenue) AS revenue
+            FROM {totals} s
             JOIN products p ON s.product_id = p.id
             GROUP BY s.product_id
             ORDER BY total_qty DESC
             LIMIT 1
-        """)
+        """, params)
         
         result = cursor.fetchone()
         conn.close()
         return result  # (product_id, product_name, total_qty, revenue)
     
     @staticmethod
-    def get_total_profit():
-        conn = get_connection()
+    def get_total_profit(start=None, end=None):
+        conn = get_read_connection()
         cursor = conn.cursor()
-        cursor.execute("SELECT SUM(profit) FROM sales")
+        totals, params = _product_totals(conn, start, end)
+        cursor.execute(f"SELECT SUM(profit) FROM {totals}", params)
         total_profit = cursor.fetchone()[0] or 0
         conn.close()
         return total_profit
 
+    @staticmethod
+    def get_totals(start=None, end=None):
+        """(number of sales, revenue) without fetching the rows."""
+        conn = get_read_connection()
+        totals, params = _product_totals(conn, start, end)
+        count, revenue = conn.execute(
+            f"SELECT COALESCE(SUM(sales_count), 0), COALESCE(SUM(revenue), 0) FROM {totals}", params
+        ).fetchone()
+        conn.close()
+        return count, revenue
+
 
 
     
     @staticmethod
-    def get_sales_summary_per_product():
-        conn = get_connection()
+    def get_sales_summary_per_product(start=None, end=None):
+        conn = get_read_connection()
         cursor = conn.cursor()
-        cursor.execute("""
-            SELECT p.name, SUM(s.quantity_sold) AS total_quantity
-            FROM sales s
+        totals, params = _product_totals(conn, start, end)
+        cursor.execute(f"""
+            SELECT p.name, SUM(s.quantity) AS total_quantity
+            FROM {totals} s
             JOIN products p ON s.product_id = p.id
             GROUP BY p.id
             ORDER BY total_quantity DESC
-        """)
+        """, params)
         result = cursor.fetchall()
         conn.close()
         return result
     
     
     @staticmethod
-    def get_all_with_category(category=None):
-        conn = get_connection()
+    def get_all_with_category(category=None, start=None, end=None):
+        """
+        Rows of (id, product, category, quantity, total, date) where date is a
+        datetime built from sales.ts_epoch (no string parsing needed).
+        start/end are datetimes/dates; start inclusive, end exclusive. Sales
+        whose timestamp never parsed (ts_epoch NULL) are always included, as
+        the old in-Python filter did. Categories match ignoring case and
+        surrounding spaces.
+        """
+        conn = get_read_connection()
         cursor = conn.cursor()
 
-        if category and category != "All":
-            cursor.execute("""
-                SELECT sales.id, products.name, products.category, sales.quantity_sold, 
-                       sales.total_price, sales.timestamp
-                FROM sales
-                JOIN products ON sales.product_id = products.id
-                WHERE products.category = ?
-            """, (category,))
-        else:
-            cursor.execute("""
-                SELECT sales.id, products.name, products.category, sales.quantity_sold, 
-                       sales.total_price, sales.timestamp
-                FROM sales
-                JOIN products ON sales.product_id = products.id
-            """)
-
-        rows = cursor.fetchall()
+        clauses = []
+        date_range, params = _date_range("sales.ts_epoch", start, end)
+        if date_range:
+            clauses.append(f"(sales.ts_epoch IS NULL OR ({date_range[len('WHERE '):]}))")
+        if category and category not in ("All", "All Categories"):
+            if category == "No Category":
+                clauses.append("(products.category IS NULL OR TRIM(products.category) = '')")
+            else:
+                clauses.append("LOWER(TRIM(products.category)) = LOWER(TRIM(?))")
+                params.append(category)
+        where = "WHERE " + " AND ".join(clauses) if clauses else ""
+
+        cursor.execute(f"""
+            SELECT sales.id, products.name, products.category, sales.quantity_sold, 
+                   sales.total_price, sales.ts_epoch, sales.timestamp
+            FROM {sales_source(conn, start, end)} AS sales
+            JOIN products ON sales.product_id = products.id
+            {where}
+            ORDER BY sales.ts_epoch DESC
+        """, params)
+
+        rows = [
+            (sale_id, name, category_name, quantity, total,
+             from_epoch(ts_epoch) if ts_epoch is not None else timestamp)
+            for sale_id, name, category_name, quantity, total, ts_epoch, timestamp in cursor.fetchall()
+        ]
         conn.close()
         return rows
 
     
     @staticmethod
     def clear_all():
-        conn = get_connection()
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM sales")
-        conn.commit()
-        conn.close()
-        auto_backup()
+        execute_write("DELETE FROM sales").result()
+        clear_archives()
+        request_backup()
         
 
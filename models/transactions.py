@@ -1,54 +1,163 @@
 from datetime import datetime
-from db.database import get_connection
-from utils.backup import auto_backup
+from db.database import get_read_connection
+from db.archive import sales_source
+from db.timestamps import to_epoch
+from db.writer import execute_write, run_write
+from utils.backup import request_backup
 from models.sale import Sale   # so we can call sales.add()
 
 def create_transaction():
     """
     Create a new empty transaction and return its ID.
     """
-    conn = get_connection()
-    cursor = conn.cursor()
-
     timestamp = datetime.now().isoformat()
-    cursor.execute("""
+    transaction_id = execute_write("""
         INSERT INTO transactions (timestamp, grand_total)
         VALUES (?, 0)
-    """, (timestamp,))
-
-    transaction_id = cursor.lastrowid
-    conn.commit()
-    conn.close()
+    """, (timestamp,)).result()
 
     return transaction_id
 
 
-def finalize_transaction(transaction_id):
+def _cart_line(item):
+    """Accept RecordSaleWindow cart dicts ({'product': Product, ...}) or {'product_id': ...}."""
+    product = item.get("product")
+    product_id = item.get("product_id", getattr(product, "id", None))
+    quantity = int(item.get("quantity", 0))
+    if product_id is None:
+        raise ValueError("Cart line has no product.")
+    if quantity <= 0:
+        raise ValueError("Quantity must be a positive integer.")
+    return int(product_id), quantity, item.get("price"), item.get("total")
+
+
+def checkout(cart):
     """
-    Finalize a transaction by summing all sales linked to it.
-    Updates grand_total in transactions table.
+    Record a whole cart as one transaction, atomically.
+    Stock is taken with conditional UPDATEs (quantity >= wanted), all sales are
+    inserted with one executemany and the grand total is written in the same
+    writer job (one SQLite transaction), followed by a single backup.
+    Raises ValueError (nothing is written) if a product is missing or short.
+    Returns dict like get_transaction_details().
     """
-    conn = get_connection()
-    cursor = conn.cursor()
+    lines = [_cart_line(item) for item in cart]
+    if not lines:
+        raise ValueError("Cart is empty. Please add products before saving.")
+
+    # Same product may appear on several lines; reserve stock per product
+    wanted = {}
+    for product_id, quantity, _, _ in lines:
+        wanted[product_id] = wanted.get(product_id, 0) + quantity
+
+    now = datetime.now()
+    timestamp = now.isoformat()
+    ts_epoch = to_epoch(now)
+
+    def record_cart(conn):
+        cursor = conn.cursor()
+        cursor.execute("""
+            INSERT INTO transactions (timestamp, grand_total)
+            VALUES (?, 0)
+        """, (timestamp,))
+        transaction_id = cursor.lastrowid
+
+        placeholders = ",".join("?" * len(wanted))
+        cursor.execute(f"""
+            SELECT id, name, price, cost_price, quantity
+            FROM products
+            WHERE id IN ({placeholders})
+        """, tuple(wanted))
+        products = {row[0]: row[1:] for row in cursor.fetchall()}
+
+        missing = [pid for pid in wanted if pid not in products]
+        if missing:
+            raise ValueError(f"Invalid product_id: {missing[0]}")
+
+        cursor.executemany("""
+            UPDATE products
+            SET quantity = quantity - ?
+            WHERE id = ? AND quantity >= ?
+        """, [(qty, pid, qty) for pid, qty in wanted.items()])
+        updated = cursor.rowcount
+        if updated != len(wanted):
+            # A conditional UPDATE matched nothing → not enough stock
+            for pid, qty in wanted.items():
+                name, _, _, left = products[pid]
+                if left < qty:
+                    raise ValueError(f"Not enough stock for {name}. Available: {left}")
+            raise ValueError("Stock changed while saving the sale. Please try again.")
+
+        sales_rows = []
+        grand_total = 0.0
+        for product_id, quantity, price, total in lines:
+            name, db_price, cost_price, _ = products[product_id]
+            unit_price = float(price) if price is not None else db_price
+            line_total = float(total) if total is not None else unit_price * quantity
+            profit = (unit_price - (cost_price or 0)) * quantity
+            grand_total += line_total
+            sales_rows.append((product_id, name, quantity, line_total, profit, timestamp, transaction_id))
+
+        cursor.executemany("""
+            INSERT INTO sales (product_id, product_name, quantity_sold, total_price, profit, timestamp, transaction_id, ts_epoch)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, [row + (ts_epoch,) for row in sales_rows])
+
+        cursor.execute("""
+            UPDATE transactions
+            SET grand_total = ?
+            WHERE id = ?
+        """, (grand_total, transaction_id))
+        return transaction_id, grand_total, sales_rows
+
+    # The writer runs the job in its own transaction (rolled back on ValueError)
+    transaction_id, grand_total, sales_rows = run_write(record_cart)
+
+    request_backup()
 
-    # Sum sales total for this transaction
-    cursor.execute("""
-        SELECT COALESCE(SUM(total_price), 0)
-        FROM sales
-        WHERE transaction_id = ?
-    """, (transaction_id,))
-    grand_total = cursor.fetchone()[0]
+    return {
+        "id": transaction_id,
+        "timestamp": timestamp,
+        "grand_total": grand_total,
+        "sales": [
+            {
+                "product_id": row[0],
+                "product_name": row[1],
+                "quantity_sold": row[2],
+                "total_price": row[3],
+                "profit": row[4],
+                "timestamp": row[5],
+            }
+            for row in sales_rows
+        ]
+    }
 
-    # Update transaction record
-    cursor.execute("""
-        UPDATE transactions
-        SET grand_total = ?
-        WHERE id = ?
-    """, (grand_total, transaction_id))
 
-    conn.commit()
-    conn.close()
-    auto_backup()
+def finalize_transaction(transaction_id):
+    """
+    Finalize a transaction by summing all sales linked to it.
+    Updates grand_total in transactions table.
+    """
+    def update_total(conn):
+        cursor = conn.cursor()
+
+        # Sum sales total for this transaction
+        cursor.execute("""
+            SELECT COALESCE(SUM(total_price), 0)
+            FROM sales
+            WHERE transaction_id = ?
+        """, (transaction_id,))
+        grand_total = cursor.fetchone()[0]
+
+        # Update transaction record
+        cursor.execute("""
+            UPDATE transactions
+            SET grand_total = ?
+            WHERE id = ?
+        """, (grand_total, transaction_id))
+        return grand_total
+
+    grand_total = run_write(update_total)
+    request_backup()
 
     return grand_total
 
@@ -58,7 +167,7 @@ def get_transaction_details(transaction_id):
     Get transaction summary + all related sales.
     Returns dict: { 'id': ..., 'timestamp': ..., 'grand_total': ..., 'sales': [...] }
     """
-    conn = get_connection()
+    conn = get_read_connection()
     cursor = conn.cursor()
 
     # Fetch transaction
@@ -73,10 +182,12 @@ def get_transaction_details(transaction_id):
         conn.close()
         return None
 
-    # Fetch related sales
-    cursor.execute("""
+    # Fetch related sales (from the archive year too, once the transaction is archived)
+    ts_epoch = to_epoch(transaction[1])
+    source = sales_source(conn, ts_epoch, ts_epoch + 86400) if ts_epoch is not None else "sales"
+    cursor.execute(f"""
         SELECT id, product_id, product_name, quantity_sold, total_price, profit, timestamp
-        FROM sales
+        FROM {source} AS sales
         WHERE transaction_id = ?
     """, (transaction_id,))
     sales_rows = cursor.fetchall()
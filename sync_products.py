@@ -1,12 +1,21 @@
 # sync_products.py
+import json
+import sqlite3
 import threading
 import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from datetime import datetime
+from functools import partial
 from typing import Any, Dict, Optional
 
 
-from db.database import get_connection
-from firebase_config import fire_db
+from db.database import get_read_connection
+from db.migrations import get_schema, run_migrations
+from db.archive import archived_before
+from db.timestamps import to_epoch
+from db.writer import execute_write, flush_writes, submit_write
+from utils.app_config import get_config
+from utils.remote_db import get_remote_db
 
 # Stream objects (pyrebase returns a Stream object)
 _product_stream = None
@@ -40,29 +49,123 @@ def ts_to_epoch(ts: Optional[Any]) -> float:
 
 
 def ensure_last_updated_columns():
-    """Add last_updated columns to products & sales if missing (migration)."""
-    conn = get_connection()
-    cursor = conn.cursor()
+    """
+    last_updated on products & sales comes from the versioned migrations;
+    check the cached schema and only migrate if it is behind.
+    """
+    schema = get_schema()
+    if not (schema.has_column("products", "last_updated") and schema.has_column("sales", "last_updated")):
+        run_migrations()
 
-    # products
-    cursor.execute("PRAGMA table_info(products)")
-    cols = [c[1] for c in cursor.fetchall()]
-    if 'last_updated' not in cols:
-        cursor.execute("ALTER TABLE products ADD COLUMN last_updated REAL DEFAULT 0")
-        print("⚙️ Added 'last_updated' column to products (migration)")
-
-    # sales
-    cursor.execute("PRAGMA table_info(sales)")
-    cols = [c[1] for c in cursor.fetchall()]
-    if 'last_updated' not in cols:
-        cursor.execute("ALTER TABLE sales ADD COLUMN last_updated REAL DEFAULT 0")
-        print("⚙️ Added 'last_updated' column to sales (migration)")
-
-    conn.commit()
-    conn.close()
+
+# ----------------- Local apply from remote ----------------- #
+# Remote rows are staged in a TEMP table with executemany and merged with
+# ONE upsert per table inside a single writer job (one transaction); the
+# ON CONFLICT ... WHERE clause keeps a local row unless the remote copy
+# is newer. A missing local row counts as last_updated 0, so remote rows
+# without a timestamp are never applied.
+PRODUCT_COLUMNS = ("id", "name", "category", "quantity", "price", "cost_price", "last_updated")
+SALE_COLUMNS = ("id", "product_id", "product_name", "quantity_sold", "total_price", "profit",
+                "timestamp", "ts_epoch", "transaction_id", "last_updated")
+
+
+def _ts(column: str) -> str:
+    # Compare stamps as numbers: a legacy TEXT-affinity column (and a staging
+    # table copied from it) stores them as text, which sorts above any REAL
+    return f"COALESCE(CAST({column} AS REAL), 0)"
+
+
+def _local_ts(table: str) -> str:
+    return _ts(f"{table}.last_updated")
+
+
+def _merge_rows(table: str, columns, rows):
+    """Queue one writer job that merges rows into table; its Future yields the number applied."""
+    names = ", ".join(columns)
+    staging = f"remote_{table}"
+    merge = f"""
+        INSERT INTO {table} ({names})
+        SELECT {names} FROM temp.{staging} WHERE {_ts("last_updated")} > 0
+        ON CONFLICT(id) DO UPDATE SET {", ".join(f"{c}=excluded.{c}" for c in columns if c != "id")}
+        WHERE {_ts("excluded.last_updated")} > {_local_ts(table)}
+    """
+
+    def apply(conn):
+        conn.execute(f"CREATE TEMP TABLE IF NOT EXISTS {staging} AS SELECT {names} FROM {table} WHERE 0")
+        conn.execute(f"DELETE FROM temp.{staging}")
+        conn.executemany(f"INSERT INTO temp.{staging} ({names}) VALUES ({', '.join('?' * len(columns))})", rows)
+        applied = conn.execute(merge).rowcount
+        conn.execute(f"DELETE FROM temp.{staging}")
+        return applied
+
+    return submit_write(apply)
+
+
+def _records(data):
+    """(key, dict) pairs of a snapshot; RTDB returns 0..n keyed nodes as lists."""
+    if isinstance(data, dict):
+        items = data.items()
+    elif isinstance(data, list):
+        items = enumerate(data)
+    else:
+        return
+    for key, record in items:
+        if isinstance(record, dict):
+            if "id" not in record:
+                record["id"] = key
+            yield record
+
+
+def _product_row(p: Dict[str, Any]):
+    return (
+        int(p['id']),
+        p.get('name'),
+        p.get('category'),
+        p.get('quantity') if p.get('quantity') is not None else 0,
+        p.get('price') if p.get('price') is not None else 0.0,
+        p.get('cost_price') if p.get('cost_price') is not None else 0.0,
+        ts_to_epoch(p.get('last_updated')),
+    )
+
+
+def _sale_row(s: Dict[str, Any], cutoff: Optional[float]):
+    sale_epoch = to_epoch(s.get('timestamp'))
+    # Sales from archived years are closed; don't pull them back into the hot DB
+    if cutoff is not None and sale_epoch is not None and sale_epoch < cutoff:
+        return None
+    return (
+        int(s['id']),
+        s.get('product_id'),
+        s.get('product_name'),
+        s.get('quantity_sold') if s.get('quantity_sold') is not None else 0,
+        s.get('total_price') if s.get('total_price') is not None else 0.0,
+        s.get('profit') if s.get('profit') is not None else 0.0,
+        s.get('timestamp'),
+        sale_epoch,
+        s.get('transaction_id'),
+        ts_to_epoch(s.get('last_updated')),
+    )
+
+
+def apply_remote_products(data):
+    """Merge a products snapshot (dict/list as read from Firebase); returns a Future of rows applied."""
+    return _merge_rows("products", PRODUCT_COLUMNS, [_product_row(p) for p in _records(data)])
+
+
+def apply_remote_sales(data):
+    cutoff = archived_before()
+    rows = [row for row in (_sale_row(s, cutoff) for s in _records(data)) if row is not None]
+    return _merge_rows("sales", SALE_COLUMNS, rows)
+
+
+def _report(future, what: str):
+    def done(f):
+        if not f.exception() and f.result():
+            print(f"⬇️ Applied remote {what} -> local")
+    future.add_done_callback(done)
+    return future
 
 
-# ----------------- Local upsert from remote ----------------- #
 def upsert_local_product(p: Dict[str, Any]):
     """
     Insert or update the local product ONLY if remote last_updated is newer.
@@ -70,169 +173,144 @@ def upsert_local_product(p: Dict[str, Any]):
     """
     if not p or 'id' not in p:
         return
-
-    pid = int(p['id'])
-    remote_ts = ts_to_epoch(p.get('last_updated'))
-
-    conn = get_connection()
-    cursor = conn.cursor()
-
-    cursor.execute("SELECT last_updated FROM products WHERE id=?", (pid,))
-    row = cursor.fetchone()
-    local_ts = row[0] if row else 0.0
-
-    # If remote is newer, overwrite local
-    if remote_ts > ts_to_epoch(local_ts):
-        cursor.execute("""
-            INSERT INTO products (id, name, category, quantity, price, cost_price, last_updated)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-            ON CONFLICT(id) DO UPDATE SET
-                name=excluded.name,
-                category=excluded.category,
-                quantity=excluded.quantity,
-                price=excluded.price,
-                cost_price=excluded.cost_price,
-                last_updated=excluded.last_updated
-        """, (
-            pid,
-            p.get('name'),
-            p.get('category'),
-            p.get('quantity') if p.get('quantity') is not None else 0,
-            p.get('price') if p.get('price') is not None else 0.0,
-            p.get('cost_price') if p.get('cost_price') is not None else 0.0,
-            remote_ts
-        ))
-        print(f"⬇️ Applied remote product {pid} -> local (remote_ts={remote_ts}, local_ts={local_ts})")
-
-    conn.commit()
-    conn.close()
+    # Queued on the single writer; returns a Future
+    return _report(apply_remote_products({p['id']: p}), f"product {p['id']}")
 
 
 def upsert_local_sale(s: Dict[str, Any]):
     if not s or 'id' not in s:
         return
-    sid = int(s['id'])
-    remote_ts = ts_to_epoch(s.get('last_updated'))
+    return _report(apply_remote_sales({s['id']: s}), f"sale {s['id']}")
 
-    conn = get_connection()
-    cursor = conn.cursor()
 
-    cursor.execute("SELECT last_updated FROM sales WHERE id=?", (sid,))
-    row = cursor.fetchone()
-    local_ts = row[0] if row else 0.0
-
-    if remote_ts > ts_to_epoch(local_ts):
-        cursor.execute("""
-            INSERT INTO sales (id, product_id, product_name, quantity_sold, total_price, profit, timestamp, transaction_id, last_updated)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ON CONFLICT(id) DO UPDATE SET
-                product_id=excluded.product_id,
-                product_name=excluded.product_name,
-                quantity_sold=excluded.quantity_sold,
-                total_price=excluded.total_price,
-                profit=excluded.profit,
-                timestamp=excluded.timestamp,
-                transaction_id=excluded.transaction_id,
-                last_updated=excluded.last_updated
-        """, (
-            sid,
-            s.get('product_id'),
-            s.get('product_name'),
-            s.get('quantity_sold') if s.get('quantity_sold') is not None else 0,
-            s.get('total_price') if s.get('total_price') is not None else 0.0,
-            s.get('profit') if s.get('profit') is not None else 0.0,
-            s.get('timestamp'),
-            s.get('transaction_id'),
-            remote_ts
-        ))
-        print(f"⬇️ Applied remote sale {sid} -> local (remote_ts={remote_ts}, local_ts={local_ts})")
-
-    conn.commit()
-    conn.close()
+# ----------------- Field-level patches ----------------- #
+# A stream event below a row ('/14/quantity', or a patch of '/14') only
+# carries the changed fields. Fields that come with their last_updated are
+# applied to the local row in place, guarded by it. Anything else - fields
+# without a stamp, a stamp on its own, a row missing locally - refetches the
+# whole remote row and merges it like any other, so a field is never
+# applied under a stamp it did not arrive with.
+def _apply_fields(table: str, columns, row_id: int, fields: Dict[str, Any]):
+    """
+    Queue the update of one local row; the Future yields None if the row
+    is missing locally, else the number of rows changed (0 = local is newer).
+    """
+    values = dict(fields)
+    values["last_updated"] = ts_to_epoch(values["last_updated"])
+    if "timestamp" in values and "ts_epoch" in columns:
+        values["ts_epoch"] = to_epoch(values["timestamp"])
+
+    def apply(conn):
+        if conn.execute(f"SELECT 1 FROM {table} WHERE id=?", (row_id,)).fetchone() is None:
+            return None
+        return conn.execute(
+            f"UPDATE {table} SET {', '.join(f'{c}=?' for c in values)} WHERE id=? AND ? > {_local_ts(table)}",
+            (*values.values(), row_id, values["last_updated"])
+        ).rowcount
+
+    return submit_write(apply)
+
+
+def _refetch_row(table: str, row_id: int):
+    full = get_remote_db().child(table).child(str(row_id)).get().val()
+    if isinstance(full, dict):
+        full.setdefault("id", row_id)
+        _UPSERTS[table](full)
+
+
+def _is_newer(table: str, row_id: int, stamp) -> bool:
+    conn = get_read_connection()
+    try:
+        row = conn.execute(f"SELECT {_local_ts(table)} FROM {table} WHERE id=?", (row_id,)).fetchone()
+    finally:
+        conn.close()
+    return row is None or ts_to_epoch(stamp) > row[0]
+
+
+def _apply_patch(table: str, row_id, fields: Dict[str, Any]):
+    columns = PRODUCT_COLUMNS if table == "products" else SALE_COLUMNS
+    row_id = int(row_id)
+    fields = {k: v for k, v in fields.items() if k in columns and k != "id" and v is not None}
+    if not fields:
+        return
+    if "last_updated" not in fields:
+        # Which write these belong to is unknown; the remote row knows
+        _refetch_row(table, row_id)
+        return
+    if len(fields) == 1:
+        # The stamp of fields that arrived separately: only worth a round trip if newer
+        if _is_newer(table, row_id, fields["last_updated"]):
+            _refetch_row(table, row_id)
+        return
+
+    applied = _apply_fields(table, columns, row_id, fields).result()
+    if applied is None:
+        # Not here yet: only now is the whole object worth a round trip
+        _refetch_row(table, row_id)
+    elif applied:
+        print(f"⬇️ Patched local {table} row {row_id} from remote")
 
 
 # ----------------- Firebase stream handlers ----------------- #
+def _message_parts(message):
+    try:
+        return message.get("event"), message.get("path"), message.get("data")
+    except Exception:
+        # pyrebase may return other shaped objects; be defensive
+        return getattr(message, "event", None), getattr(message, "path", None), getattr(message, "data", None)
+
+
+def _apply_stream_message(table: str, event, path, data):
+    """
+    put '/'            whole tree -> set-based merge
+    patch '/'          {'14': {...}} replaces rows, {'14/quantity': v} sets fields
+    put '/14'          whole row replaced/created
+    patch '/14'        {'quantity': v, 'last_updated': t} -> field update
+    put '/14/quantity' one field -> field update
+    """
+    if event not in ("put", "patch"):
+        return
+    parts = [p for p in (path or "/").split("/") if p]
+    if not parts:
+        if event == "put":
+            _SNAPSHOTS[table](data)
+            return
+        rows, fields = {}, {}
+        for key, value in (data or {}).items():
+            sub = [p for p in str(key).split("/") if p]
+            if len(sub) == 1:
+                rows[sub[0]] = value
+            elif len(sub) == 2:
+                fields.setdefault(sub[0], {})[sub[1]] = value
+        if rows:
+            _SNAPSHOTS[table](rows)
+        for row_id, changed in fields.items():
+            _apply_patch(table, row_id, changed)
+    elif len(parts) == 1:
+        row_id = parts[0]
+        if event == "put":
+            if isinstance(data, dict):
+                data.setdefault("id", row_id)
+                _UPSERTS[table](data)
+        elif isinstance(data, dict):
+            _apply_patch(table, row_id, data)
+    elif len(parts) == 2:
+        _apply_patch(table, parts[0], {parts[1]: data})
+
+
 def _products_stream_handler(message):
     """
     message: dict with keys 'event' (put/patch), 'path', 'data'
     """
-    try:
-        event = message.get("event")
-        path = message.get("path")
-        data = message.get("data")
-    except Exception:
-        # pyrebase may return other shaped objects; be defensive
-        event = getattr(message, "event", None)
-        path = getattr(message, "path", None)
-        data = getattr(message, "data", None)
-
-    # print("STREAM products:", event, path)
-    if event in ("put", "patch"):
-        # Full snapshot
-        if path == "/" and isinstance(data, dict):
-            for pid, pdata in data.items():
-                if pdata:
-                    # pdata could be raw values or product dict
-                    if isinstance(pdata, dict):
-                        upsert_local_product(pdata)
-        else:
-            # path to a single child like '/14' or '/14/quantity'
-            if path.startswith("/"):
-                parts = path.strip("/").split("/")
-                if len(parts) == 1:
-                    # whole child replaced/created
-                    pid = parts[0]
-                    pdata = data
-                    if isinstance(pdata, dict):
-                        # ensure id exists
-                        if "id" not in pdata:
-                            pdata["id"] = pid
-                        upsert_local_product(pdata)
-                else:
-                    # partial field updated; fetch full object from Firebase to be safe
-                    pid = parts[0]
-                    full = fire_db.child("products").child(pid).get().val()
-                    if full:
-                        if "id" not in full:
-                            full["id"] = pid
-                        upsert_local_product(full)
+    _apply_stream_message("products", *_message_parts(message))
 
 
 def _sales_stream_handler(message):
-    try:
-        event = message.get("event")
-        path = message.get("path")
-        data = message.get("data")
-    except Exception:
-        event = getattr(message, "event", None)
-        path = getattr(message, "path", None)
-        data = getattr(message, "data", None)
-
-    if event in ("put", "patch"):
-        if path == "/" and isinstance(data, dict):
-            for sid, sdata in data.items():
-                if sdata:
-                    if isinstance(sdata, dict):
-                        if "id" not in sdata:
-                            sdata["id"] = sid
-                        upsert_local_sale(sdata)
-        else:
-            if path.startswith("/"):
-                parts = path.strip("/").split("/")
-                if len(parts) == 1:
-                    sid = parts[0]
-                    sdata = data
-                    if isinstance(sdata, dict):
-                        if "id" not in sdata:
-                            sdata["id"] = sid
-                        upsert_local_sale(sdata)
-                else:
-                    sid = parts[0]
-                    full = fire_db.child("sales").child(sid).get().val()
-                    if full:
-                        if "id" not in full:
-                            full["id"] = sid
-                        upsert_local_sale(full)
+    _apply_stream_message("sales", *_message_parts(message))
+
+
+_SNAPSHOTS = {"products": apply_remote_products, "sales": apply_remote_sales}
+_UPSERTS = {"products": upsert_local_product, "sales": upsert_local_sale}
 
 
 # ----------------- Public: start/stop listeners ----------------- #
@@ -247,14 +325,14 @@ def start_listeners():
     def run_products_stream():
         global _product_stream
         try:
-            _product_stream = fire_db.child("products").stream(_products_stream_handler, None)
+            _product_stream = get_remote_db().child("products").stream(_products_stream_handler, None)
         except Exception as e:
             print("⚠️ products stream error:", e)
 
     def run_sales_stream():
         global _sales_stream
         try:
-            _sales_stream = fire_db.child("sales").stream(_sales_stream_handler, None)
+            _sales_stream = get_remote_db().child("sales").stream(_sales_stream_handler, None)
         except Exception as e:
             print("⚠️ sales stream error:", e)
 
@@ -283,143 +361,258 @@ def stop_listeners():
     print("⛔ Firebase listeners stopped.")
 
 
-# ----------------- Selective push helpers ----------------- #
-def push_product_to_firebase(product_id: int):
+# ----------------- Push (local -> Firebase) ----------------- #
+PRODUCT_FIELDS = ("id", "name", "category", "quantity", "price", "cost_price")
+SALE_FIELDS = ("id", "product_id", "product_name", "quantity_sold", "total_price", "profit",
+               "timestamp", "transaction_id")
+
+SYNC_PUSH_BATCH = get_config("sync_push_batch", 500)     # rows per multi-path update()
+SYNC_PUSH_WORKERS = get_config("sync_push_workers", 4)   # update() requests in flight
+
+
+TRANSACTION_FIELDS = ("id", "timestamp", "grand_total")
+
+# Columns pushed per table; only products/sales carry last_updated locally
+SYNC_FIELDS = {"products": PRODUCT_FIELDS, "sales": SALE_FIELDS, "transactions": TRANSACTION_FIELDS}
+STAMPED_TABLES = ("products", "sales")
+
+SYNC_INTERVAL_S = get_config("sync_interval_s", 10)      # outbox drain period while the app runs
+
+
+def _push_rows(table: str, fields, ids) -> int:
     """
-    Reads product from local DB and pushes it to Firebase with last_updated now.
+    Read the rows and stamp their last_updated in ONE writer job, then send
+    them as ONE multi-path update(). Read and stamp share a transaction, so
+    a local edit can't land in between and be masked by the stamp; edits
+    after it are queued in the outbox as usual. Returns rows pushed.
     """
-    ensure_last_updated_columns()
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT id, name, category, quantity, price, cost_price, last_updated FROM products WHERE id=?", (product_id,))
-    row = cursor.fetchone()
-    if not row:
+    new_ts = time.time()
+    id_list = json.dumps(list(ids))
+
+    def read_and_stamp(conn):
+        rows = conn.execute(
+            f"SELECT {', '.join(fields)} FROM {table} WHERE id IN (SELECT value FROM json_each(?))", (id_list,)
+        ).fetchall()
+        if rows and table in STAMPED_TABLES:
+            conn.execute(f"UPDATE {table} SET last_updated=? WHERE id IN (SELECT value FROM json_each(?))",
+                         (new_ts, id_list))
+        return rows
+
+    rows = submit_write(read_and_stamp).result()
+    if rows:
+        payload = {str(row[0]): {**dict(zip(fields, row)), "last_updated": new_ts} for row in rows}
+        get_remote_db().child(table).update(payload)
+    return len(rows)
+
+
+def _run_bounded(jobs, workers: int, name: str) -> int:
+    """Run each job (a callable returning a count) with at most `workers` in flight; returns the total."""
+    total = 0
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix=name) as pool:
+        in_flight = set()
+        for job in jobs:
+            if len(in_flight) >= workers:
+                # Bounded: don't read ahead of what the network can take
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                total += sum(f.result() for f in done)
+            in_flight.add(pool.submit(job))
+        total += sum(f.result() for f in in_flight)
+    return total
+
+
+def _iter_batches(table: str, batch_size: int):
+    """Keyset-paginated id batches: each is one short read, never the whole table at once."""
+    last_id = 0
+    while True:
+        conn = get_read_connection()
+        try:
+            ids = [row[0] for row in conn.execute(
+                f"SELECT id FROM {table} WHERE id > ? ORDER BY id LIMIT ?", (last_id, batch_size)
+            )]
+        finally:
+            conn.close()
+        if not ids:
+            return
+        yield ids
+        last_id = ids[-1]
+
+
+def push_table(table: str, fields, batch_size: Optional[int] = None, workers: Optional[int] = None) -> int:
+    """Push every row of table in batches, at most `workers` requests in flight. Returns rows pushed."""
+    batch_size = batch_size or SYNC_PUSH_BATCH
+    workers = max(1, workers or SYNC_PUSH_WORKERS)
+    jobs = (partial(_push_rows, table, fields, ids) for ids in _iter_batches(table, batch_size))
+    pushed = _run_bounded(jobs, workers, f"push-{table}")
+    flush_writes()
+    return pushed
+
+
+# ----------------- Outbox (changed rows only) ----------------- #
+# Triggers (migration 7) queue the key of every locally changed row in
+# sync_outbox. drain_outbox() pushes those rows and deletes an entry only
+# once the remote accepted it and only if the row did not change again
+# meanwhile (same version) - anything left over goes out on the next drain.
+_drain_lock = threading.Lock()
+
+
+def _iter_outbox(table: str, batch_size: int):
+    last_id = 0
+    while True:
+        conn = get_read_connection()
+        try:
+            entries = conn.execute(
+                "SELECT row_id, version FROM sync_outbox WHERE tbl=? AND row_id > ? ORDER BY row_id LIMIT ?",
+                (table, last_id, batch_size)
+            ).fetchall()
+        finally:
+            conn.close()
+        if not entries:
+            return
+        yield entries
+        last_id = entries[-1][0]
+
+
+def _push_outbox_batch(table: str, entries) -> int:
+    pushed = _push_rows(table, SYNC_FIELDS[table], [row_id for row_id, _ in entries])
+
+    # Rows gone locally (archived/deleted) are acknowledged without a push
+    def acknowledge(conn):
+        conn.executemany("DELETE FROM sync_outbox WHERE tbl=? AND row_id=? AND version=?",
+                         [(table, row_id, version) for row_id, version in entries])
+    submit_write(acknowledge)
+    return pushed
+
+
+def outbox_size() -> int:
+    conn = get_read_connection()
+    try:
+        return conn.execute("SELECT COUNT(*) FROM sync_outbox").fetchone()[0]
+    except sqlite3.OperationalError:
+        return 0   # pre-migration DB
+    finally:
         conn.close()
-        return False
 
-    pid, name, category, quantity, price, cost_price, local_ts = row
-    local_ts = float(local_ts) if local_ts else time.time()
-    # update local last_updated to now and push
-    new_ts = time.time()
-    cursor.execute("UPDATE products SET last_updated=? WHERE id=?", (new_ts, pid))
-    conn.commit()
-    conn.close()
 
-    product = {
-        "id": pid,
-        "name": name,
-        "category": category,
-        "quantity": quantity,
-        "price": price,
-        "cost_price": cost_price,
-        "last_updated": new_ts
-    }
-    fire_db.child("products").child(str(pid)).set(product)
-    print(f"⬆️ Pushed product {pid} -> Firebase (ts={new_ts})")
-    return True
+def _describe(pushed: Dict[str, int]) -> str:
+    return ", ".join(f"{count} {table}" for table, count in pushed.items() if count) or "nothing"
+
+
+def drain_outbox(batch_size: Optional[int] = None, workers: Optional[int] = None) -> Dict[str, int]:
+    """Push every row queued in sync_outbox; returns rows pushed per table."""
+    batch_size = batch_size or SYNC_PUSH_BATCH
+    workers = max(1, workers or SYNC_PUSH_WORKERS)
+    pushed = {}
+    with _drain_lock:
+        for table in SYNC_FIELDS:
+            jobs = (partial(_push_outbox_batch, table, entries) for entries in _iter_outbox(table, batch_size))
+            pushed[table] = _run_bounded(jobs, workers, f"outbox-{table}")
+        flush_writes()
+    return pushed
+
+
+class SyncWorker:
+    def __init__(self, interval_s=SYNC_INTERVAL_S):
+        self.interval_s = interval_s
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="sync-worker", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval_s):
+            try:
+                pushed = drain_outbox()
+                if any(pushed.values()):
+                    print(f"⬆️ Pushed {_describe(pushed)} to Firebase")
+            except Exception as e:
+                print(f"⚠️ Outbox sync failed (will retry): {e}")
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        self._thread.join(timeout)
+
+
+_sync_worker = None
+
+
+def start_sync_worker():
+    global _sync_worker
+    if _sync_worker is None:
+        _sync_worker = SyncWorker()
+    return _sync_worker
+
+
+def stop_sync_worker():
+    """Stop the background worker and push whatever is still queued."""
+    global _sync_worker
+    worker, _sync_worker = _sync_worker, None
+    if worker is not None:
+        worker.stop()
+        try:
+            drain_outbox()
+        except Exception as e:
+            print(f"⚠️ Final outbox sync failed; {outbox_size()} rows wait for the next launch: {e}")
+
+
+def _push_one(table: str, fields, row_id: int) -> bool:
+    return _push_rows(table, fields, [row_id]) > 0
+
+
+def push_product_to_firebase(product_id: int):
+    """Push one product to Firebase with last_updated now."""
+    if _push_one("products", PRODUCT_FIELDS, product_id):
+        print(f"⬆️ Pushed product {product_id} -> Firebase")
+        return True
+    return False
 
 
 def push_sale_to_firebase(sale_id: int):
-    ensure_last_updated_columns()
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT id, product_id, product_name, quantity_sold, total_price, profit, timestamp, transaction_id, last_updated FROM sales WHERE id=?", (sale_id,))
-    row = cursor.fetchone()
-    if not row:
-        conn.close()
-        return False
-    sid, product_id, product_name, quantity_sold, total_price, profit, timestamp, transaction_id, local_ts = row
-    new_ts = time.time()
-    cursor.execute("UPDATE sales SET last_updated=? WHERE id=?", (new_ts, sid))
-    conn.commit()
-    conn.close()
+    if _push_one("sales", SALE_FIELDS, sale_id):
+        print(f"⬆️ Pushed sale {sale_id} -> Firebase")
+        return True
+    return False
+
 
-    sale = {
-        "id": sid,
-        "product_id": product_id,
-        "product_name": product_name,
-        "quantity_sold": quantity_sold,
-        "total_price": total_price,
-        "profit": profit,
-        "timestamp": timestamp,
-        "transaction_id": transaction_id,
-        "last_updated": new_ts
-    }
-    fire_db.child("sales").child(str(sid)).set(sale)
-    print(f"⬆️ Pushed sale {sid} -> Firebase (ts={new_ts})")
-    return True
-
-
-# ----------------- Bulk sync (kept for compatibility) ----------------- #
+# ----------------- Bulk sync ----------------- #
 def download_products(cursor):
-    """Bulk download (called at startup as initial sync)."""
-    products = fire_db.child("products").get().val()
-    count = 0
-    if isinstance(products, dict):
-        for _, p in products.items():
-            # ensure last_updated exists (use 0 if missing)
-            if isinstance(p, dict):
-                if "last_updated" not in p:
-                    p["last_updated"] = 0
-                upsert_local_product(p)
-                count += 1
-    return count
+    """Bulk download (called at startup as initial sync); returns (received, applied)."""
+    products = get_remote_db().child("products").get().val()
+    received = sum(1 for _ in _records(products))
+    return received, apply_remote_products(products).result()
 
 
 def download_sales(cursor):
-    sales = fire_db.child("sales").get().val()
-    count = 0
-    if isinstance(sales, dict):
-        for _, s in sales.items():
-            if isinstance(s, dict):
-                if "last_updated" not in s:
-                    s["last_updated"] = 0
-                upsert_local_sale(s)
-                count += 1
-    return count
+    sales = get_remote_db().child("sales").get().val()
+    received = sum(1 for _ in _records(sales))
+    return received, apply_remote_sales(sales).result()
 
 
 def sync_from_firebase():
-    conn = get_connection()
+    conn = get_read_connection()
     cursor = conn.cursor()
     ensure_last_updated_columns()
-    products_synced = download_products(cursor)
-    sales_synced = download_sales(cursor)
-    conn.commit()
+    products_received, products_applied = download_products(cursor)
+    sales_received, sales_applied = download_sales(cursor)
     conn.close()
-    print(f"✅ Sync complete: {products_synced} products, {sales_synced} sales downloaded from Firebase.")
+    print(f"✅ Sync complete: {products_received} products, {sales_received} sales downloaded from Firebase "
+          f"({products_applied} products, {sales_applied} sales newer than local).")
 
 
+# Full re-push of every row, e.g. to rebuild the remote copy; normal sync only drains the outbox
 def upload_products():
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT id FROM products")
-    rows = cursor.fetchall()
-    count = 0
-    for (pid,) in rows:
-        push_product_to_firebase(pid)
-        count += 1
+    count = push_table("products", PRODUCT_FIELDS)
     print(f"✅ {count} products pushed to Firebase.")
-    conn.close()
 
 
 def upload_sales():
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT id FROM sales")
-    rows = cursor.fetchall()
-    count = 0
-    for (sid,) in rows:
-        push_sale_to_firebase(sid)
-        count += 1
+    count = push_table("sales", SALE_FIELDS)
     print(f"✅ {count} sales pushed to Firebase.")
-    conn.close()
 
 
 def sync_to_firebase():
+    """Push what changed locally since the last successful sync (see drain_outbox)."""
     ensure_last_updated_columns()
-    upload_products()
-    upload_sales()
+    pushed = drain_outbox()
+    print(f"✅ Pushed {_describe(pushed)} to Firebase.")
     
     
 
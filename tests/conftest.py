@@ -0,0 +1,96 @@
+import os
+import shutil
+import sqlite3
+import sys
+from pathlib import Path
+
+import pytest
+
+REPO = str(Path(__file__).resolve().parent.parent)
+sys.path.insert(0, REPO)
+
+import utils.backup as backup
+import utils.backup_store as backup_store
+import utils.change_journal as change_journal
+from db import archive, database, writer
+from db.migrations import create_outbox_triggers, invalidate_schema, run_migrations
+from utils.local_rtdb import LocalRTDB
+from utils.remote_db import set_remote_db
+
+# products.last_updated as databases from before the REAL column declared it
+LEGACY_SCHEMA = """
+    CREATE TABLE products (
+        id INTEGER PRIMARY KEY, name TEXT, category TEXT, quantity INTEGER,
+        price REAL, cost_price REAL, last_updated TEXT
+    );
+    CREATE TABLE sales (
+        id INTEGER PRIMARY KEY, product_id INTEGER, product_name TEXT, quantity_sold INTEGER,
+        total_price REAL, profit REAL, timestamp TEXT, ts_epoch INTEGER,
+        transaction_id INTEGER, last_updated REAL DEFAULT 0
+    );
+    CREATE TABLE transactions (id INTEGER PRIMARY KEY, total REAL);
+    CREATE TABLE sync_outbox (
+        tbl TEXT NOT NULL, row_id INTEGER NOT NULL, version INTEGER NOT NULL DEFAULT 1,
+        PRIMARY KEY (tbl, row_id)
+    ) WITHOUT ROWID;
+"""
+
+
+def _point_at(monkeypatch, path):
+    writer.stop_writer()
+    folder = os.path.dirname(path)
+    monkeypatch.setattr(database, "DB_PATH", path)
+    monkeypatch.setattr(database, "_pool", None)
+    monkeypatch.setattr(database, "_read_pool", None)
+    monkeypatch.setattr(backup, "BACKUP_DIR", os.path.join(folder, "backups"))
+    monkeypatch.setattr(backup_store, "_store", backup_store.BackupStore(os.path.join(folder, "backups", "store")))
+    monkeypatch.setattr(change_journal, "_journal", change_journal.Journal(os.path.join(folder, "backups", "journal")))
+    archive.invalidate_archives()
+    invalidate_schema()
+
+
+@pytest.fixture
+def legacy_db(tmp_path, monkeypatch):
+    """A throwaway DB whose products.last_updated has TEXT affinity; yields a connection to it."""
+    path = str(tmp_path / "inventory.db")
+    conn = sqlite3.connect(path)
+    conn.executescript(LEGACY_SCHEMA)
+    create_outbox_triggers(conn.cursor())
+    conn.commit()
+
+    _point_at(monkeypatch, path)
+    set_remote_db(LocalRTDB(persist=False))
+    yield conn
+    writer.stop_writer()
+    set_remote_db(None)
+    conn.close()
+
+
+
+@pytest.fixture
+def baseline_db(tmp_path, monkeypatch):
+    """A copy of the shipped, never-migrated db/inventory.db (user_version 0); yields its path."""
+    path = str(tmp_path / "inventory.db")
+    shutil.copyfile(os.path.join(REPO, "db", "inventory.db"), path)
+    _point_at(monkeypatch, path)
+    yield path
+    backup.flush_backups()
+    writer.stop_writer()
+    database.close_all_connections()
+    invalidate_schema()
+
+
+@pytest.fixture
+def fresh_db(tmp_path, monkeypatch):
+    """An empty, fully migrated DB with backups and journal next to it; yields its path."""
+    path = str(tmp_path / "inventory.db")
+    _point_at(monkeypatch, path)
+    set_remote_db(LocalRTDB(persist=False))
+    run_migrations()
+    yield path
+    backup.flush_backups()   # a pending backup must land here, not in the real backups/
+    writer.stop_writer()
+    database.close_all_connections()
+    set_remote_db(None)
+    archive.invalidate_archives()
+    invalidate_schema()
@@ -0,0 +1,42 @@
+from datetime import datetime
+
+from db import archive
+from db.database import read_snapshot
+from db.timestamps import to_epoch
+from db.writer import run_write
+from models.sale import Sale
+
+HOT_YEAR = datetime.now().year
+
+
+def _add_sales(years):
+    """One 10.0 sale (profit 1.0) on 1 June of every year."""
+    def insert(conn):
+        conn.execute("INSERT INTO products (id, name, category, quantity, price, cost_price) "
+                     "VALUES (1, 'Pen', 'Office', 100, 10.0, 9.0)")
+        for i, year in enumerate(years, start=1):
+            stamp = datetime(year, 6, 1, 12, 0)
+            conn.execute(
+                "INSERT INTO sales (id, product_id, product_name, quantity_sold, total_price, profit, timestamp, ts_epoch) "
+                "VALUES (?, 1, 'Pen', 1, 10.0, 1.0, ?, ?)",
+                (i, stamp.strftime("%Y-%m-%d %H:%M:%S"), to_epoch(stamp)))
+    run_write(insert)
+
+
+def test_more_archive_years_than_attachable_inside_read_snapshot(fresh_db):
+    years = list(range(HOT_YEAR - 14, HOT_YEAR))
+    assert len(years) > archive.MAX_ATTACHED_ARCHIVES
+    _add_sales(years + [HOT_YEAR])
+    archive.archive_sales(through_year=HOT_YEAR - 1, vacuum=False)
+    assert archive.archive_years() == years
+
+    expected = (len(years) + 1, 10.0 * (len(years) + 1))
+    outside = Sale.get_totals()
+    with read_snapshot():
+        assert Sale.get_totals() == expected
+        assert Sale.get_total_profit() == len(years) + 1
+        assert len(Sale.get_all(datetime(years[0], 1, 1), datetime(HOT_YEAR + 1, 1, 1))) == len(years) + 1
+        assert len(Sale.get_all_with_category(None, datetime(years[0], 1, 1), datetime(HOT_YEAR, 1, 1))) == len(years)
+        # A narrower range after the span: the attached years are locked by this transaction
+        assert len(Sale.get_all(datetime(years[-1], 1, 1), datetime(HOT_YEAR + 1, 1, 1))) == 2
+    assert outside == expected
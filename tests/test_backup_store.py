@@ -0,0 +1,78 @@
+import os
+import random
+
+import pytest
+
+from utils.backup_store import BackupStore, BackupStoreError
+
+
+@pytest.fixture
+def store(tmp_path):
+    return BackupStore(str(tmp_path / "store"))
+
+
+def _write(path, data):
+    with open(path, "wb") as f:
+        f.write(data)
+    return str(path)
+
+
+def _chunk_files(store):
+    return {name for prefix in os.listdir(store.chunk_dir) for name in os.listdir(os.path.join(store.chunk_dir, prefix))}
+
+
+def test_round_trip_restores_identical_bytes(store, tmp_path):
+    data = random.Random(1).randbytes(300 * 4096)
+    manifest = store.put_file(_write(tmp_path / "a.db", data), label="auto")
+
+    restored = store.restore_to(manifest["id"], str(tmp_path / "restored.db"))
+
+    with open(restored, "rb") as f:
+        assert f.read() == data
+    assert store.verify(manifest["id"])
+    assert store.latest()["id"] == manifest["id"]
+
+
+def test_unchanged_chunks_are_stored_once(store, tmp_path):
+    data = bytearray(random.Random(2).randbytes(300 * 4096))
+    first = store.put_file(_write(tmp_path / "a.db", bytes(data)))
+    data[150 * 4096] ^= 0xFF   # one page changes
+    second = store.put_file(_write(tmp_path / "b.db", bytes(data)))
+
+    assert first["new_chunks"] == len(first["chunks"])
+    assert second["new_chunks"] == 1
+    assert len(_chunk_files(store)) == len(first["chunks"]) + 1
+
+
+def test_gc_removes_only_unreferenced_chunks(store, tmp_path):
+    rng = random.Random(3)
+    old = store.put_file(_write(tmp_path / "old.db", rng.randbytes(100 * 4096)))
+    new = store.put_file(_write(tmp_path / "new.db", rng.randbytes(100 * 4096)))
+    assert store.gc() == (0, 0)
+
+    os.remove(store._manifest_path(old["id"]))
+    removed, freed = store.gc()
+
+    assert removed == len({digest for digest, _ in old["chunks"]}) and freed > 0
+    assert _chunk_files(store) == {digest for digest, _ in new["chunks"]}
+    assert store.verify(new["id"])
+
+
+def test_retention_keeps_the_newest_and_collects_the_rest(store, tmp_path):
+    ids = [store.put_file(_write(tmp_path / f"{i}.db", random.Random(i).randbytes(20 * 4096)))["id"]
+           for i in range(4)]
+
+    dropped = store.apply_retention({"last": 2, "hourly": 0, "daily": 0, "weekly": 0, "monthly": 0})
+
+    assert dropped == ids[:2]
+    assert [m["id"] for m in store.list_backups()] == ids[2:]
+    assert _chunk_files(store) == {d for m in store.list_backups() for d, _ in m["chunks"]}
+
+
+def test_corrupt_chunk_is_detected(store, tmp_path):
+    manifest = store.put_file(_write(tmp_path / "a.db", random.Random(4).randbytes(50 * 4096)))
+    digest = manifest["chunks"][0][0]
+    _write(store._chunk_path(digest), b"garbage")
+
+    with pytest.raises(BackupStoreError):
+        store.verify(manifest["id"])
@@ -0,0 +1,46 @@
+import pytest
+
+from db import database
+from db.writer import run_write
+from models.transactions import checkout
+
+
+@pytest.fixture
+def shop(fresh_db):
+    def stock(conn):
+        conn.executemany("INSERT INTO products (id, name, category, quantity, price, cost_price) VALUES (?, ?, 'Office', ?, ?, ?)",
+                         [(1, "Pen", 5, 2.0, 1.0), (2, "Book", 1, 10.0, 6.0)])
+    run_write(stock)
+
+
+def _state():
+    conn = database.get_read_connection()
+    try:
+        return (dict(conn.execute("SELECT id, quantity FROM products")),
+                conn.execute("SELECT COUNT(*) FROM sales").fetchone()[0],
+                conn.execute("SELECT COUNT(*) FROM transactions").fetchone()[0])
+    finally:
+        conn.close()
+
+
+def test_checkout_records_the_whole_cart(shop):
+    result = checkout([{"product_id": 1, "quantity": 2}, {"product_id": 2, "quantity": 1},
+                       {"product_id": 1, "quantity": 1}])
+
+    assert result["grand_total"] == 2 * 2.0 + 10.0 + 2.0
+    assert _state() == ({1: 2, 2: 0}, 3, 1)
+
+
+@pytest.mark.parametrize("cart, error", [
+    ([{"product_id": 1, "quantity": 2}, {"product_id": 2, "quantity": 3}], "Not enough stock for Book"),
+    # The same product on two lines counts against its stock once
+    ([{"product_id": 1, "quantity": 3}, {"product_id": 1, "quantity": 3}], "Not enough stock for Pen"),
+    ([{"product_id": 1, "quantity": 1}, {"product_id": 99, "quantity": 1}], "Invalid product_id: 99"),
+])
+def test_failed_checkout_writes_nothing(shop, cart, error):
+    before = _state()
+
+    with pytest.raises(ValueError, match=error):
+        checkout(cart)
+
+    assert _state() == before == ({1: 5, 2: 1}, 0, 0)
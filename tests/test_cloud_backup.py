@@ -0,0 +1,134 @@
+import os
+import sqlite3
+import threading
+
+import pytest
+
+import cloud_backup
+from db import database
+from db.writer import execute_write
+from utils.remote_db import get_remote_db
+
+
+@pytest.fixture
+def cloud(fresh_db, monkeypatch):
+    """fresh_db with cloud state next to it and small chunks, so a small DB spans many."""
+    monkeypatch.setattr(cloud_backup, "BACKUP_DIR", os.path.join(os.path.dirname(fresh_db), "backups"))
+    monkeypatch.setattr(cloud_backup, "CLOUD_CHUNK_BYTES", 4096)
+    monkeypatch.setattr(cloud_backup, "CLOUD_UPLOAD_WORKERS", 1)
+    add_products(0, 200)
+    return get_remote_db()
+
+
+def add_products(first, count):
+    for i in range(first, first + count):
+        execute_write("INSERT INTO products (name, category, quantity, price) VALUES (?, 'Office', ?, 1.0)",
+                      (f"Product {i:04d} " + "x" * 200, i)).result()
+
+
+def remote_manifest(remote):
+    return remote.child("backups", "inventory", "manifest").get().val()
+
+
+def remote_chunk_ids(remote):
+    return set(remote.child("backups", "inventory", "chunks").shallow().get().val() or {})
+
+
+def upload(**kwargs):
+    totals = []
+    message = cloud_backup.upload_backup(progress=lambda done, total: totals.append(total), **kwargs)
+    return message, (totals[0] if totals else 0)
+
+
+def product_count(path=None):
+    conn = sqlite3.connect(path or database.DB_PATH)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM products").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_first_upload_is_full_and_the_next_one_a_delta(cloud):
+    message, sent = upload()
+    first = remote_manifest(cloud)
+    assert "full" in message and sent == len(set(first["chunks"]))
+
+    execute_write("UPDATE products SET quantity = 999 WHERE id = 1").result()
+    message, sent = upload()
+    second = remote_manifest(cloud)
+
+    assert "delta" in message
+    assert second["generation"] == first["generation"] + 1
+    assert 0 < sent < len(set(second["chunks"]))
+    assert set(second["chunks"]) <= remote_chunk_ids(cloud)
+
+
+def test_interrupted_upload_resumes_with_the_missing_chunks(cloud):
+    cancel = threading.Event()
+    message = cloud_backup.upload_backup(progress=lambda done, total: cancel.set(), cancel=cancel)
+    assert "paused" in message
+    assert cloud_backup.has_pending_upload()
+    assert remote_manifest(cloud) is None
+    pending = cloud_backup._load_state()
+
+    message, sent = upload()
+
+    manifest = remote_manifest(cloud)
+    assert "✅" in message and not cloud_backup.has_pending_upload()
+    assert manifest["sha256"] == pending["manifest"]["sha256"]
+    assert sent == len(set(manifest["chunks"])) - len(pending["done"])
+
+
+def test_pending_upload_restarts_when_the_database_changed(cloud, tmp_path):
+    cancel = threading.Event()
+    cloud_backup.upload_backup(progress=lambda done, total: cancel.set(), cancel=cancel)
+    stale = cloud_backup._load_state()
+    add_products(200, 5)
+
+    upload()
+
+    manifest = remote_manifest(cloud)
+    assert manifest["sha256"] != stale["manifest"]["sha256"]
+    assert cloud_backup.fetch_backup(str(tmp_path / "cloud.db"))["sha256"] == manifest["sha256"]
+    assert product_count(str(tmp_path / "cloud.db")) == 205
+
+
+def test_gc_keeps_two_generations_and_unknown_chunks(cloud):
+    cloud.child("backups", "inventory", "chunks", "f" * 64).set("another till's upload in flight")
+    generations = []
+    for round_ in range(3):
+        add_products(1000 + 50 * round_, 50)
+        upload()
+        generations.append(set(remote_manifest(cloud)["chunks"]))
+
+    remaining = remote_chunk_ids(cloud)
+    assert remaining == generations[2] | generations[1] | {"f" * 64}
+    assert generations[0] - generations[1] - generations[2], "the test should retire some chunks"
+
+
+def test_download_backup_only_when_newer_unless_forced(cloud):
+    upload()
+    add_products(200, 3)   # local changes the cloud doesn't have
+
+    message = cloud_backup.download_backup(force=False)
+    assert "up to date" in message
+    assert product_count() == 203
+
+    message = cloud_backup.download_backup(force=True)
+    assert "restored" in message
+    assert product_count() == 200
+
+
+def test_download_backup_fetches_another_tills_newer_generation(cloud):
+    upload()
+    mine = cloud_backup.load_last_manifest()
+    add_products(200, 3)
+    os.remove(cloud_backup._last_manifest_path())   # as if another till had uploaded this one
+    upload()
+    cloud_backup._save_last_manifest(mine)
+    execute_write("DELETE FROM products WHERE id > 100").result()
+
+    message = cloud_backup.download_backup(force=False)
+
+    assert "restored" in message
+    assert product_count() == 203
@@ -0,0 +1,50 @@
+import pytest
+
+from db import database
+
+
+def _names(conn):
+    return [row[0] for row in conn.execute("SELECT name FROM products ORDER BY name")]
+
+
+def _committed_names():
+    conn = database.get_read_connection()
+    try:
+        return _names(conn)
+    finally:
+        conn.close()
+
+
+def test_nested_connection_scope_rolls_back_only_itself(fresh_db):
+    with database.connection() as outer:
+        outer.execute("INSERT INTO products (name, quantity, price) VALUES ('Outer', 1, 1.0)")
+        with pytest.raises(ValueError):
+            with database.connection() as inner:
+                inner.execute("INSERT INTO products (name, quantity, price) VALUES ('Inner', 1, 1.0)")
+                raise ValueError("checkout failed")
+        assert _names(outer) == ["Outer"]
+
+    assert _committed_names() == ["Outer"]
+
+
+def test_nested_connection_scope_does_not_commit_the_outer_one(fresh_db):
+    with pytest.raises(ValueError):
+        with database.connection() as outer:
+            outer.execute("INSERT INTO products (name, quantity, price) VALUES ('Outer', 1, 1.0)")
+            with database.connection() as inner:
+                inner.execute("INSERT INTO products (name, quantity, price) VALUES ('Inner', 1, 1.0)")
+            assert _committed_names() == []
+            raise ValueError("outer failed")
+
+    assert _committed_names() == []
+
+
+def test_nested_pooled_connection_shares_the_lease(fresh_db):
+    with database.get_connection() as outer:
+        outer.execute("INSERT INTO products (name, quantity, price) VALUES ('Outer', 1, 1.0)")
+        with pytest.raises(ValueError):
+            with database.get_connection() as inner:
+                assert inner.raw is outer.raw
+                inner.execute("UPDATE products SET quantity = 0")
+                raise ValueError
+        assert outer.execute("SELECT quantity FROM products").fetchone()[0] == 1
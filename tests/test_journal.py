@@ -0,0 +1,52 @@
+import time
+
+import pytest
+
+from db import database
+from db.writer import execute_write
+from utils.backup import auto_backup
+from utils.change_journal import get_journal, ship_changes
+from utils.restore import RestoreError, restore_to_time
+
+
+def _products():
+    conn = database.get_read_connection()
+    try:
+        return dict(conn.execute("SELECT name, quantity FROM products"))
+    finally:
+        conn.close()
+
+
+def _tick():
+    """A moment strictly between the changes before and after it."""
+    time.sleep(0.05)
+    moment = time.time()
+    time.sleep(0.05)
+    return moment
+
+
+def test_restore_to_time_replays_the_journal_up_to_that_moment(fresh_db):
+    execute_write("INSERT INTO products (name, quantity, price) VALUES ('Pen', 10, 1.0)").result()
+    ship_changes()
+    auto_backup()   # the restore point replay starts from
+
+    execute_write("UPDATE products SET quantity = 7 WHERE name = 'Pen'").result()
+    execute_write("INSERT INTO products (name, quantity, price) VALUES ('Book', 3, 9.0)").result()
+    target = _tick()
+    execute_write("UPDATE products SET quantity = 0 WHERE name = 'Pen'").result()
+    execute_write("DELETE FROM products WHERE name = 'Book'").result()
+    execute_write("INSERT INTO products (name, quantity, price) VALUES ('Ink', 1, 4.0)").result()
+    ship_changes()
+    timeline = get_journal().timeline
+
+    message = restore_to_time(target, safety_backup=False)
+
+    assert _products() == {"Pen": 7, "Book": 3}
+    assert "2 journaled changes" in message
+    # Later changes stay on the old timeline; the restored DB continues on a new one
+    assert get_journal().timeline != timeline
+
+
+def test_restore_to_time_before_any_restore_point_is_refused(fresh_db):
+    with pytest.raises(RestoreError, match="No restore point"):
+        restore_to_time(time.time() - 3600)
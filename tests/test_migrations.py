@@ -0,0 +1,61 @@
+import sqlite3
+
+from db.migrations import SCHEMA_VERSION, invalidate_schema, run_migrations
+
+
+def _state(path):
+    conn = sqlite3.connect(path)
+    try:
+        schema = sorted(conn.execute("SELECT type, name, sql FROM sqlite_master WHERE name NOT LIKE 'sqlite_%'"))
+        counts = {name: conn.execute(f"SELECT COUNT(*) FROM {name}").fetchone()[0]
+                  for kind, name, _ in schema if kind == "table"}
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        return schema, counts, version
+    finally:
+        conn.close()
+
+
+def test_migrating_the_baseline_db_keeps_its_data(baseline_db):
+    _, before, version = _state(baseline_db)
+    assert version == 0
+
+    run_migrations()
+
+    _, after, version = _state(baseline_db)
+    assert version == SCHEMA_VERSION
+    assert after["products"] == before["products"]
+    assert after["sales"] == before["sales"]
+    conn = sqlite3.connect(baseline_db)
+    try:
+        columns = {row[1]: row[2] for row in conn.execute("PRAGMA table_info(products)")}
+        assert columns["last_updated"] == "REAL"
+        assert conn.execute("SELECT COUNT(*) FROM sales WHERE ts_epoch IS NULL").fetchone()[0] == 0
+    finally:
+        conn.close()
+
+
+def test_running_migrations_again_changes_nothing(baseline_db):
+    run_migrations()
+    migrated = _state(baseline_db)
+
+    invalidate_schema()
+    run_migrations()
+
+    assert _state(baseline_db) == migrated
+
+
+def test_migrations_can_be_reapplied_over_their_own_results(baseline_db):
+    # A DB restored from a backup whose user_version lags its schema must still migrate
+    run_migrations()
+    _, migrated, _ = _state(baseline_db)
+    conn = sqlite3.connect(baseline_db)
+    conn.execute("PRAGMA user_version = 0")
+    conn.close()
+
+    invalidate_schema()
+    run_migrations()
+
+    _, counts, version = _state(baseline_db)
+    assert version == SCHEMA_VERSION
+    assert {t: counts[t] for t in ("products", "sales", "transactions", "users")} == \
+           {t: migrated[t] for t in ("products", "sales", "transactions", "users")}
@@ -0,0 +1,49 @@
+import sqlite3
+
+import pytest
+
+from db.query_stats import InstrumentedConnection, query_stats
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(":memory:", factory=InstrumentedConnection)
+    conn.execute("CREATE TABLE t (x INTEGER)")
+    conn.executemany("INSERT INTO t VALUES (?)", [(i,) for i in range(100)])
+    query_stats.reset()
+    yield conn
+    conn.close()
+    query_stats.reset()
+
+
+def _entry(sql):
+    return next(e for e in query_stats.snapshot() if e["sql"] == sql)
+
+
+def test_iterating_a_cursor_counts_its_rows(conn):
+    rows = [row for row in conn.execute("SELECT x FROM t")]
+
+    entry = _entry("SELECT x FROM t")
+    assert len(rows) == 100
+    assert entry["count"] == 1 and entry["rows"] == 100
+
+
+def test_partly_iterated_cursor_is_recorded_on_the_next_execute(conn):
+    cursor = conn.cursor()
+    for row in cursor.execute("SELECT x FROM t WHERE x < 50"):
+        if row[0] == 9:
+            break
+    cursor.execute("SELECT COUNT(*) FROM t").fetchone()
+
+    assert _entry("SELECT x FROM t WHERE x < ?")["rows"] == 10
+
+
+def test_iteration_time_is_charged_to_its_own_statement(conn, monkeypatch):
+    monkeypatch.setattr(query_stats, "slow_query_ms", 10 ** 9)
+    conn.create_function("slow", 1, lambda x: sum(range(20000)) and x)
+    cursor = conn.execute("SELECT slow(x) FROM t")
+    for _ in cursor:
+        pass
+    conn.execute("SELECT 1").fetchone()
+
+    assert _entry("SELECT slow(x) FROM t")["total_ms"] > _entry("SELECT ?")["total_ms"]
@@ -0,0 +1,70 @@
+import os
+import sqlite3
+from datetime import datetime
+
+import pytest
+
+from db import database
+from db.archive import archive_sales
+from db.timestamps import to_epoch
+from db.writer import execute_write, run_write
+from models.sale import Sale
+from utils.backup import auto_backup
+import utils.restore as restore
+from utils.restore import RestoreError, restore_database
+
+
+def _product_count():
+    conn = database.get_read_connection()
+    try:
+        return conn.execute("SELECT COUNT(*) FROM products").fetchone()[0]
+    finally:
+        conn.close()
+
+
+@pytest.mark.parametrize("content", [b"", b"not a database at all" * 100, b"SQLite format 3\x00" + b"\xff" * 4080])
+def test_restore_rejects_a_bad_file(fresh_db, tmp_path, content):
+    execute_write("INSERT INTO products (name, quantity, price) VALUES ('Pen', 1, 1.0)").result()
+    bad = tmp_path / "bad.db"
+    bad.write_bytes(content)
+
+    with pytest.raises(RestoreError):
+        restore_database(str(bad))
+
+    assert _product_count() == 1
+    assert not os.path.exists(database.DB_PATH + ".restore")
+
+
+def test_restore_rejects_before_writing_to_the_candidate(fresh_db, tmp_path, monkeypatch):
+    other = tmp_path / "other.db"
+    conn = sqlite3.connect(other)
+    conn.execute("CREATE TABLE change_log (seq INTEGER PRIMARY KEY)")
+    conn.commit()
+    conn.close()
+    cleared = []
+    monkeypatch.setattr(restore, "_clear_change_log", cleared.append)
+
+    with pytest.raises(RestoreError, match="missing tables"):
+        restore_database(str(other))
+    assert cleared == []
+
+
+def test_restore_from_before_an_archive_run_does_not_count_sales_twice(fresh_db):
+    year = datetime.now().year
+
+    def insert(conn):
+        conn.execute("INSERT INTO products (id, name, quantity, price, cost_price) VALUES (1, 'Pen', 9, 10.0, 9.0)")
+        for i, stamp in enumerate((datetime(year - 1, 6, 1), datetime(year, 1, 2)), start=1):
+            conn.execute(
+                "INSERT INTO sales (id, product_id, product_name, quantity_sold, total_price, profit, timestamp, ts_epoch) "
+                "VALUES (?, 1, 'Pen', 1, 10.0, 1.0, ?, ?)",
+                (i, stamp.strftime("%Y-%m-%d %H:%M:%S"), to_epoch(stamp)))
+    run_write(insert)
+    before_archiving = auto_backup()
+    archive_sales(through_year=year - 1, vacuum=False)
+
+    restore_database(before_archiving, safety_backup=False)
+
+    assert Sale.get_totals() == (2, 20.0)
+    assert Sale.get_total_profit() == 2.0
+    assert Sale.get_best_selling_product()[2] == 2
@@ -0,0 +1,41 @@
+from datetime import datetime
+
+import pytest
+
+from db.timestamps import to_epoch
+from db.writer import run_write
+from models.sale import Sale
+
+
+@pytest.fixture
+def sales(fresh_db):
+    def insert(conn):
+        conn.executemany("INSERT INTO products (id, name, category, quantity, price) VALUES (?, ?, ?, 10, 1.0)",
+                         [(1, "Pen", " Office "), (2, "Stapler", "office"), (3, "Bread", "Food"), (4, "Misc", None)])
+        rows = [(1, 1, "2026-03-01 10:00:00"), (2, 2, "2026-03-02 10:00:00"), (3, 3, "2026-03-03 10:00:00"),
+                (4, 4, "2026-03-04 10:00:00"), (5, 1, "sometime last spring")]
+        conn.executemany(
+            "INSERT INTO sales (id, product_id, quantity_sold, total_price, profit, timestamp, ts_epoch) "
+            "VALUES (?, ?, 1, 1.0, 0.0, ?, ?)",
+            [(sale_id, product_id, ts, to_epoch(ts)) for sale_id, product_id, ts in rows])
+    run_write(insert)
+
+
+def _ids(rows):
+    return sorted(row[0] for row in rows)
+
+
+@pytest.mark.parametrize("category", ["Office", "office", " OFFICE "])
+def test_category_matches_ignoring_case_and_spaces(sales, category):
+    assert _ids(Sale.get_all_with_category(category)) == [1, 2, 5]
+
+
+def test_no_category_matches_blank_categories(sales):
+    assert _ids(Sale.get_all_with_category("No Category")) == [4]
+
+
+def test_date_range_keeps_sales_whose_timestamp_did_not_parse(sales):
+    rows = Sale.get_all_with_category(None, datetime(2026, 3, 2), datetime(2026, 3, 4))
+
+    assert _ids(rows) == [2, 3, 5]
+    assert dict((row[0], row[5]) for row in rows)[5] == "sometime last spring"
@@ -0,0 +1,77 @@
+import sync_products
+from db.writer import flush_writes
+
+
+def _outbox(conn):
+    return conn.execute("SELECT tbl, row_id FROM sync_outbox").fetchall()
+
+
+def _product(conn, row_id):
+    return conn.execute("SELECT quantity, last_updated FROM products WHERE id=?", (row_id,)).fetchone()
+
+
+def test_older_remote_snapshot_keeps_text_stamped_rows(legacy_db):
+    legacy_db.execute("INSERT INTO products VALUES (1, 'Pen', 'Office', 5, 1.0, 0.5, '1757850434.56956')")
+    legacy_db.commit()
+    assert legacy_db.execute("SELECT typeof(last_updated) FROM products").fetchone() == ("text",)
+
+    applied = sync_products.apply_remote_products(
+        {"1": {"name": "Pen", "quantity": 99, "price": 1.0, "last_updated": 1757850000.0}}
+    ).result()
+
+    assert applied == 0
+    assert _product(legacy_db, 1)[0] == 5
+    assert _outbox(legacy_db) == []
+
+
+def test_newer_remote_snapshot_applies_once_without_queueing(legacy_db):
+    legacy_db.execute("INSERT INTO products VALUES (1, 'Pen', 'Office', 5, 1.0, 0.5, '1757850434.56956')")
+    legacy_db.commit()
+    snapshot = {"1": {"name": "Pen", "quantity": 7, "price": 1.0, "last_updated": 1757860000.0}}
+
+    assert sync_products.apply_remote_products(snapshot).result() == 1
+    # The same snapshot again (stream replay, next launch) is not newer any more
+    assert sync_products.apply_remote_products(snapshot).result() == 0
+    flush_writes()
+
+    assert _product(legacy_db, 1)[0] == 7
+    assert _outbox(legacy_db) == []
+
+
+def test_unstamped_patch_is_not_applied_under_a_later_stamp(legacy_db):
+    legacy_db.execute("INSERT INTO products VALUES (1, 'Pen', 'Office', 5, 1.0, 0.5, 1000.0)")
+    legacy_db.commit()
+    remote = sync_products.get_remote_db()
+    remote.child("products").child("1").set(
+        {"name": "Pen", "category": "Office", "quantity": 8, "price": 1.0, "last_updated": 1000.0}
+    )
+
+    # Another till wrote a field without bumping last_updated
+    sync_products._apply_stream_message("products", "patch", "/1", {"quantity": 8})
+    flush_writes()
+    assert _product(legacy_db, 1)[0] == 5
+
+    # A local sale since then, and a later remote price change
+    legacy_db.execute("UPDATE products SET quantity = 20 WHERE id = 1")
+    legacy_db.commit()
+    sync_products._apply_stream_message("products", "patch", "/1", {"price": 2.0, "last_updated": 2000.0})
+    flush_writes()
+
+    assert legacy_db.execute("SELECT quantity, price FROM products WHERE id = 1").fetchone() == (20, 2.0)
+    assert _outbox(legacy_db) == [("products", 1)]
+
+
+def test_stamp_arriving_after_its_fields_fetches_the_row(legacy_db):
+    legacy_db.execute("INSERT INTO products VALUES (1, 'Pen', 'Office', 5, 1.0, 0.5, 1000.0)")
+    legacy_db.commit()
+    remote = sync_products.get_remote_db()
+    remote.child("products").child("1").set(
+        {"name": "Pen", "category": "Office", "quantity": 3, "price": 1.0, "last_updated": 1000.0}
+    )
+    sync_products._apply_stream_message("products", "put", "/1/quantity", 3)
+    remote.child("products").child("1").update({"last_updated": 2000.0})
+    sync_products._apply_stream_message("products", "put", "/1/last_updated", 2000.0)
+    flush_writes()
+
+    assert _product(legacy_db, 1) == (3, "2000.0")
+    assert _outbox(legacy_db) == []
@@ -0,0 +1,76 @@
+import threading
+import time
+
+import pytest
+
+from db import database
+from db.writer import WriteQueue
+
+
+@pytest.fixture
+def queue(fresh_db):
+    writer = WriteQueue(database.DB_PATH)
+    yield writer
+    writer.stop(5)
+
+
+def _names():
+    conn = database.get_read_connection()
+    try:
+        return [row[0] for row in conn.execute("SELECT name FROM products ORDER BY name")]
+    finally:
+        conn.close()
+
+
+def _insert(name):
+    return lambda conn: conn.execute("INSERT INTO products (name, quantity, price) VALUES (?, 1, 1.0)", (name,))
+
+
+def test_failing_job_only_undoes_itself(queue):
+    def fail(conn):
+        _insert("Broken")(conn)
+        raise ValueError("bad job")
+
+    ok, bad = queue.submit(_insert("Pen")), queue.submit(fail)
+    queue.flush(5)
+
+    ok.result(5)
+    with pytest.raises(ValueError):
+        bad.result(5)
+    assert _names() == ["Pen"]
+
+
+def test_failing_nested_submit_only_undoes_itself(queue):
+    def outer(conn):
+        _insert("Outer")(conn)
+
+        def nested(conn):
+            _insert("Nested")(conn)
+            raise ValueError("nested job failed")
+
+        with pytest.raises(ValueError):
+            queue.submit(nested).result()
+        _insert("After")(conn)
+
+    queue.submit(outer).result(5)
+    assert _names() == ["After", "Outer"]
+
+
+def test_stop_commits_queued_jobs_and_refuses_new_ones(queue):
+    release = threading.Event()
+    blocker = queue.submit(lambda conn: release.wait(5))
+    queued = [queue.submit(_insert(f"Pen {i}")) for i in range(3)]
+    stopper = threading.Thread(target=queue.stop, args=(5,))
+    stopper.start()
+    while not queue._stopping:
+        time.sleep(0.01)
+
+    with pytest.raises(RuntimeError, match="stopped"):
+        queue.submit(_insert("Late"))
+    release.set()
+    stopper.join(5)
+
+    assert blocker.result(5) is True
+    for future in queued:
+        future.result(5)
+    assert _names() == ["Pen 0", "Pen 1", "Pen 2"]
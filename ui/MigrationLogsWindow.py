@@ -1,5 +1,5 @@
 import customtkinter as ctk
-from db.database import get_connection
+from db.database import get_read_connection
 
 class MigrationLogsWindow:
     def __init__(self, master):
@@ -20,7 +20,7 @@ class MigrationLogsWindow:
         ctk.CTkLabel(scroll_frame, text="Message", width=480, anchor="w", font=ctk.CTkFont(weight="bold")).grid(row=0, column=1, sticky="w", padx=15, pady=5)
 
         # Fetch data
-        conn = get_connection()
+        conn = get_read_connection()
         cursor = conn.cursor()
         cursor.execute("SELECT timestamp, message FROM migration_log ORDER BY timestamp DESC")
         logs = cursor.fetchall()
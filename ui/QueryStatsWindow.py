@@ -0,0 +1,71 @@
+import customtkinter as ctk
+from tkinter import filedialog, messagebox
+from db.query_stats import query_stats
+
+class QueryStatsWindow:
+    def __init__(self, master):
+        self.window = ctk.CTkToplevel(master)
+        self.window.title("Query Performance")
+        self.window.geometry("900x600")
+        self.window.resizable(True, True)
+
+        title_label = ctk.CTkLabel(self.window, text="📊 Query Performance", font=ctk.CTkFont(size=20, weight="bold"))
+        title_label.pack(pady=(10, 0))
+        ctk.CTkLabel(
+            self.window,
+            text=f"Statements since app start, slowest total first. Plans are captured for queries over {query_stats.slow_query_ms} ms."
+        ).pack(pady=(0, 5))
+
+        # Scrollable frame
+        self.scroll_frame = ctk.CTkScrollableFrame(self.window, width=860, height=430)
+        self.scroll_frame.pack(padx=10, pady=10, fill="both", expand=True)
+
+        # Buttons
+        button_frame = ctk.CTkFrame(self.window)
+        button_frame.pack(pady=10)
+        ctk.CTkButton(button_frame, text="🔄 Refresh", command=self.load_stats).pack(side="left", padx=5)
+        ctk.CTkButton(button_frame, text="💾 Export JSON", command=self.export_json).pack(side="left", padx=5)
+        ctk.CTkButton(button_frame, text="🧹 Reset", fg_color="gray", command=self.reset_stats).pack(side="left", padx=5)
+        ctk.CTkButton(button_frame, text="Close", command=self.window.destroy).pack(side="left", padx=5)
+
+        self.load_stats()
+
+    def load_stats(self):
+        for widget in self.scroll_frame.winfo_children():
+            widget.destroy()
+
+        headers = ["Calls", "Total ms", "p50", "p95", "p99", "Rows", "Statement"]
+        widths = [60, 80, 60, 60, 60, 70, 420]
+        for col, (text, width) in enumerate(zip(headers, widths)):
+            ctk.CTkLabel(self.scroll_frame, text=text, width=width, anchor="w",
+                         font=ctk.CTkFont(weight="bold")).grid(row=0, column=col, sticky="w", padx=4, pady=5)
+
+        stats = query_stats.snapshot()
+        if not stats:
+            ctk.CTkLabel(self.scroll_frame, text="No queries recorded yet").grid(row=1, column=0, columnspan=7, pady=10)
+            return
+
+        for i, s in enumerate(stats, start=1):
+            statement = s["sql"]
+            if s["plan"]:
+                statement += "\n  ↳ " + "\n  ↳ ".join(s["plan"])
+            values = [s["count"], f"{s['total_ms']:.1f}", f"{s['p50_ms']:.2f}", f"{s['p95_ms']:.2f}",
+                      f"{s['p99_ms']:.2f}", s["rows"], statement]
+            for col, (value, width) in enumerate(zip(values, widths)):
+                ctk.CTkLabel(self.scroll_frame, text=str(value), width=width, anchor="w", justify="left",
+                             wraplength=width if col == 6 else 0).grid(row=i, column=col, sticky="w", padx=4, pady=3)
+
+    def export_json(self):
+        file_path = filedialog.asksaveasfilename(defaultextension=".json", filetypes=[("JSON Files", "*.json")],
+                                                 title="Export Query Stats")
+        if not file_path:
+            return
+        try:
+            query_stats.dump_json(file_path)
+            messagebox.showinfo("Export", f"✅ Query stats saved to:\n{file_path}")
+        except Exception as e:
+            messagebox.showerror("Error", str(e))
+
+    def reset_stats(self):
+        query_stats.reset()
+        self.load_stats()
@@ -0,0 +1,96 @@
+import customtkinter as ctk
+from tkinter import messagebox
+from utils.backup_store import get_backup_store
+from utils.restore import RestoreError, restore_database, restore_to_time
+
+class RestorePointsWindow:
+    def __init__(self, master):
+        self.window = ctk.CTkToplevel(master)
+        self.window.title("Restore Points")
+        self.window.geometry("720x600")
+        self.window.resizable(True, True)
+
+        title_label = ctk.CTkLabel(self.window, text="🕘 Restore Points", font=ctk.CTkFont(size=20, weight="bold"))
+        title_label.pack(pady=(10, 0))
+        self.summary_label = ctk.CTkLabel(self.window, text="")
+        self.summary_label.pack(pady=(0, 5))
+
+        # Scrollable frame
+        self.scroll_frame = ctk.CTkScrollableFrame(self.window, width=680, height=430)
+        self.scroll_frame.pack(padx=10, pady=10, fill="both", expand=True)
+
+        button_frame = ctk.CTkFrame(self.window)
+        button_frame.pack(pady=10)
+        self.time_entry = ctk.CTkEntry(button_frame, placeholder_text="YYYY-MM-DD HH:MM:SS", width=180)
+        self.time_entry.pack(side="left", padx=5)
+        ctk.CTkButton(button_frame, text="⏪ Restore to Time", command=self.restore_time).pack(side="left", padx=5)
+        ctk.CTkButton(button_frame, text="🔄 Refresh", command=self.load_points).pack(side="left", padx=5)
+        ctk.CTkButton(button_frame, text="Close", command=self.window.destroy).pack(side="left", padx=5)
+
+        self.load_points()
+
+    def load_points(self):
+        for widget in self.scroll_frame.winfo_children():
+            widget.destroy()
+
+        store = get_backup_store()
+        stats = store.stats()
+        self.summary_label.configure(
+            text=f"{stats['backups']} restore points, {stats['stored_bytes'] / 1024 / 1024:.1f} MB on disk "
+                 f"({stats['dedup_ratio']}x deduplicated)"
+        )
+
+        headers = ["Created", "Size", "New data", "Type", ""]
+        widths = [180, 100, 100, 110, 120]
+        for col, (text, width) in enumerate(zip(headers, widths)):
+            ctk.CTkLabel(self.scroll_frame, text=text, width=width, anchor="w",
+                         font=ctk.CTkFont(weight="bold")).grid(row=0, column=col, sticky="w", padx=4, pady=5)
+
+        points = list(reversed(store.list_backups()))
+        if not points:
+            ctk.CTkLabel(self.scroll_frame, text="No restore points yet").grid(row=1, column=0, columnspan=5, pady=10)
+            return
+
+        for i, m in enumerate(points, start=1):
+            values = [m["created_at"], f"{m['size'] / 1024 / 1024:.1f} MB",
+                      f"{m['new_bytes'] / 1024:.0f} KB", m.get("label") or ""]
+            for col, (value, width) in enumerate(zip(values, widths)):
+                ctk.CTkLabel(self.scroll_frame, text=str(value), width=width, anchor="w").grid(
+                    row=i, column=col, sticky="w", padx=4, pady=3)
+            ctk.CTkButton(self.scroll_frame, text="Restore", width=100,
+                          command=lambda backup_id=m["id"], created=m["created_at"]: self.restore(backup_id, created)
+                          ).grid(row=i, column=4, padx=4, pady=3)
+
+    def restore(self, backup_id, created_at):
+        confirm = messagebox.askyesno(
+            "Confirm Restore",
+            f"⚠️ Replace the current database with the restore point from {created_at}?\n\n"
+            "The current data is saved as a new restore point first."
+        )
+        if not confirm:
+            return
+        try:
+            msg = restore_database(backup_id)
+            messagebox.showinfo("Success", msg)
+        except RestoreError as e:
+            messagebox.showerror("Error", f"❌ Restore failed:\n{e}\n\nYour current database was not changed.")
+        self.load_points()
+
+    def restore_time(self):
+        target = self.time_entry.get().strip()
+        if not target:
+            messagebox.showwarning("Restore to Time", "Enter the date and time to restore to.")
+            return
+        confirm = messagebox.askyesno(
+            "Confirm Restore",
+            f"⚠️ Rebuild the database as it was at {target}?\n\n"
+            "The current data is saved as a new restore point first."
+        )
+        if not confirm:
+            return
+        try:
+            msg = restore_to_time(target)
+            messagebox.showinfo("Success", msg)
+        except RestoreError as e:
+            messagebox.showerror("Error", f"❌ Restore failed:\n{e}\n\nYour current database was not changed.")
+        self.load_points()
@@ -12,6 +12,7 @@ from ui.manage_staff import ManageStaffWindow
 from ui.about import AboutWindow
 from models.product import Product
 from models.sale import Sale
+from db.database import read_snapshot
 from matplotlib import pyplot as plt
 from PIL import Image
 from utils.path_helper import resource_path
@@ -183,18 +184,20 @@ class Dashboard(ctk.CTkToplevel):
 
     # ----- OVERVIEW METRICS -----
     def update_overview(self):
-        products = Product.get_all()
-        sales = Sale.get_all()
+        # One read-only snapshot for all cards: consistent numbers, never blocks checkout
+        with read_snapshot():
+            products = Product.get_all()
+            sales_count, total_revenue = Sale.get_totals()
+            best_seller_data = Sale.get_best_selling_product()
+            total_profit = Sale.get_total_profit()
 
         self.animate_card_value(self.total_products_card, f"🧮 Products\n{len(products)}")
-        self.animate_card_value(self.total_sales_card, f"💰 Sales\n{len(sales)}")
-        total_revenue = sum(s[3] for s in sales)
+        self.animate_card_value(self.total_sales_card, f"💰 Sales\n{sales_count}")
         self.animate_card_value(self.total_revenue_card, f"📈 Revenue\n₦{total_revenue:,.2f}")
         
         # Highlight low stock products
-        self.highlight_low_stock()
+        self.highlight_low_stock(products)
 
-        best_seller_data = Sale.get_best_selling_product()
         if best_seller_data:
             _, product_name, qty_sold, revenue = best_seller_data
             self.animate_card_value(self.best_seller_card,
@@ -202,7 +205,6 @@ class Dashboard(ctk.CTkToplevel):
         else:
             self.animate_card_value(self.best_seller_card, "🏆 Best Seller: N/A")
 
-        total_profit = Sale.get_total_profit()
         self.animate_card_value(self.profit_card, f"💰 Total Profit\n₦{total_profit:,.2f}")
     
         # --- ANIMATED CARD UPDATE ---
@@ -241,9 +243,11 @@ class Dashboard(ctk.CTkToplevel):
 
         animate()
 
-    def highlight_low_stock(self):
+    def highlight_low_stock(self, products=None):
         LOW_STOCK_THRESHOLD = 5
-        low_stock = any(p.quantity < LOW_STOCK_THRESHOLD for p in Product.get_all())
+        if products is None:
+            products = Product.get_all()
+        low_stock = any(p.quantity < LOW_STOCK_THRESHOLD for p in products)
         if low_stock:
             self.total_products_card.configure(fg_color="#FF4500")
         else:
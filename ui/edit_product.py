@@ -125,7 +125,7 @@ class EditProductWindow(ctk.CTkToplevel):
             Product.update_product(self.product_id, name, category, quantity_val, price_val, cost_price_val)
 
             # --- Firebase update ---
-            from firebase_config import fire_db
+            from utils.remote_db import get_remote_db
             import time
             product = {
                 "id": self.product_id,
@@ -136,7 +136,7 @@ class EditProductWindow(ctk.CTkToplevel):
                 "cost_price": cost_price_val,
                 "last_updated": int(time.time())   # ⬅️ ADD TIMESTAMP
             }
-            fire_db.child("products").child(str(self.product_id)).set(product)
+            get_remote_db().child("products").child(str(self.product_id)).set(product)
             print(f"✅ Synced update for product {self.product_id} to Firebase")
 
             messagebox.showinfo("Success", "✅ Product updated successfully.")
@@ -164,7 +164,7 @@ class EditProductWindow(ctk.CTkToplevel):
             row = cursor.fetchone()
             conn.close()
             if row:
-                from firebase_config import fire_db
+                from utils.remote_db import get_remote_db
                 import time
                 product = {
                     "id": row[0],
@@ -175,7 +175,7 @@ class EditProductWindow(ctk.CTkToplevel):
                     "cost_price": row[5],
                     "last_updated": int(time.time())  # ⬅️ ADD TIMESTAMP
                 }
-                fire_db.child("products").child(str(row[0])).set(product)
+                get_remote_db().child("products").child(str(row[0])).set(product)
                 print(f"✅ Synced restock for product {row[0]} to Firebase")
 
             messagebox.showinfo("Success", f"✅ Restocked {amount_val} units.")
@@ -192,8 +192,8 @@ class EditProductWindow(ctk.CTkToplevel):
 
             # --- Firebase delete ---
             try:
-                from firebase_config import fire_db
-                fire_db.child("products").child(str(self.product_id)).remove()
+                from utils.remote_db import get_remote_db
+                get_remote_db().child("products").child(str(self.product_id)).remove()
                 print(f"🗑 Product {self.product_id} removed from Firebase")
             except Exception as e:
                 print("⚠️ Firebase delete error:", e)
@@ -1,6 +1,6 @@
 import customtkinter as ctk
 from tkinter import messagebox
-from firebase_config import fire_db
+from utils.remote_db import get_remote_db
 
 class EditUserRoleWindow(ctk.CTkToplevel):
     def __init__(self, master=None):
@@ -30,7 +30,7 @@ class EditUserRoleWindow(ctk.CTkToplevel):
 
     def load_users(self):
         try:
-            users = fire_db.child("users").get()
+            users = get_remote_db().child("users").get()
             if users.each():
                 for u in users.each():
                     uid = u.key()
@@ -68,7 +68,7 @@ class EditUserRoleWindow(ctk.CTkToplevel):
         new_role = self.role_var.get().lower()
 
         try:
-            fire_db.child("users").child(uid).update({"role": new_role})
+            get_remote_db().child("users").child(uid).update({"role": new_role})
             messagebox.showinfo("Success", f"{selected_user} is now {new_role}")
 
             # 🔥 Refresh manage staff window if it exists
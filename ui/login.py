@@ -1,6 +1,7 @@
 import customtkinter as ctk
 from tkinter import messagebox
-from firebase_config import auth, fire_db  # <-- import Firebase auth
+from firebase_config import auth  # <-- import Firebase auth
+from utils.remote_db import get_remote_db
 from db.database import get_connection  # keep this for fallback/local users
 from ui.admin_passw_change import ChangeAdminPasswordWindow
 from ui.dashboard import Dashboard
@@ -45,14 +46,14 @@ class LoginWindow(ctk.CTkToplevel):
             uid = firebase_user["localId"]
 
             # Fetch role from Firebase DB
-            role = fire_db.child("users").child(uid).child("role").get().val()
+            role = get_remote_db().child("users").child(uid).child("role").get().val()
             
             role = (role or "staff").lower()
             if role not in ["admin", "staff"]:
                 role = "staff"
 
             # --- Ensure Firebase user has email + username stored ---
-            fire_db.child("users").child(uid).update({
+            get_remote_db().child("users").child(uid).update({
                 "email": username,
                 "username": username.split("@")[0],  # or ask full name later
                 "role": role
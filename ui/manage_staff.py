@@ -2,7 +2,8 @@ import customtkinter as ctk
 import tkinter as tk
 from tkinter import messagebox, simpledialog
 from db.database import get_connection
-from firebase_config import fire_db, auth, admin_auth, ADMIN_ENABLED
+from firebase_config import auth, admin_auth, ADMIN_ENABLED
+from utils.remote_db import get_remote_db
 
 
 
@@ -70,7 +71,7 @@ class ManageStaffWindow(ctk.CTkToplevel):
         self.staff_listbox.delete(0, "end")  # clear first
 
         try:
-            users = fire_db.child("users").get()
+            users = get_remote_db().child("users").get()
             if users.each():
                 for u in users.each():
                     data = u.val()
@@ -165,7 +166,7 @@ class ManageStaffWindow(ctk.CTkToplevel):
 
             try:
                 # 1. Find UID in Firebase by email
-                users = fire_db.child("users").get()
+                users = get_remote_db().child("users").get()
                 uid_to_delete = None
                 if users.each():
                     for u in users.each():
@@ -175,7 +176,7 @@ class ManageStaffWindow(ctk.CTkToplevel):
 
                 if uid_to_delete:
                     # Remove from Firebase Realtime DB
-                    fire_db.child("users").child(uid_to_delete).remove()
+                    get_remote_db().child("users").child(uid_to_delete).remove()
 
                 # 2. Remove from local SQLite
                 conn = get_connection()
@@ -216,7 +217,7 @@ class ManageStaffWindow(ctk.CTkToplevel):
             return
 
         try:
-            users = fire_db.child("users").get()
+            users = get_remote_db().child("users").get()
             if not users.each():
                 messagebox.showerror("Error", "No users in Firebase.")
                 return
@@ -227,7 +228,7 @@ class ManageStaffWindow(ctk.CTkToplevel):
                 data = u.val()
                 if data.get("email", "").lower() == email:
                     # ✅ Update Firebase
-                    fire_db.child("users").child(uid).update({"role": new_role})
+                    get_remote_db().child("users").child(uid).update({"role": new_role})
 
                     # ✅ Update local SQLite
                     conn = get_connection()
@@ -256,7 +257,7 @@ class ManageStaffWindow(ctk.CTkToplevel):
             uid = user["localId"]
 
             # Add full user profile immediately
-            fire_db.child("users").child(uid).set({
+            get_remote_db().child("users").child(uid).set({
                 "email": email,
                 "username": email.split("@")[0],  # or custom field
                 "role": role
@@ -202,44 +202,25 @@ class RecordSaleWindow:
             if not self.cart:
                 raise ValueError("Cart is empty. Please add products before saving.")
 
-            from models.transactions import create_transaction, finalize_transaction
-            from models.sale import Sale
-            from models.product import Product
+            from models.transactions import checkout
 
-            transaction_id = create_transaction()
             sale_records = []
-
             for item in self.cart:
                 product = item["product"]
-                qty = item["quantity"]
-                price = item["price"]
-                total = item["total"]
-
-                if qty > product.quantity:
+                if item["quantity"] > product.quantity:
                     raise ValueError(f"Not enough stock for {product.name}. Available: {product.quantity}")
 
-                profit = (price - (product.cost_price or 0)) * qty
-
-                sale_id = Sale.add(
-                    product_id=product.id,
-                    quantity_sold=qty,
-                    total_price=total,
-                    profit=profit,
-                    transaction_id=transaction_id
-                )
-
-                Product.update_quantity(product.id, product.quantity - qty)
-
                 sale_records.append({
                     "product": product.name,
-                    "quantity": qty,
-                    "price": price,
-                    "total": total
+                    "quantity": item["quantity"],
+                    "price": item["price"],
+                    "total": item["total"]
                 })
 
-            grand_total = finalize_transaction(transaction_id)
-            from models.transactions import get_transaction_details
-            transaction = get_transaction_details(transaction_id)
+            # One atomic DB transaction (stock, sales, grand total) + one backup
+            transaction = checkout(self.cart)
+            transaction_id = transaction["id"]
+            grand_total = transaction["grand_total"]
 
             ReceiptWindow(
                 self.window,
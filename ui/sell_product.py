@@ -1,7 +1,7 @@
 import customtkinter as ctk
 from tkinter import messagebox
 from models.product import Product
-from models.sale import Sale
+from models.transactions import checkout
 
 class SellProductWindow:
     def __init__(self, master, theme="System"):
@@ -61,13 +61,9 @@ class SellProductWindow:
             if qty > product.quantity:
                 raise ValueError("Not enough stock available.")
 
-            # Update product quantity
-            new_qty = product.quantity - qty
-            Product.update_quantity(product.id, new_qty)
-
-            # Record the sale
+            # Take stock and record the sale in one transaction
             total = product.price * qty
-            Sale.add(product.id, qty, total)
+            checkout([{"product": product, "quantity": qty, "price": product.price, "total": total}])
 
             messagebox.showinfo("Success", f"Sold {qty} units of {product.name} for ₦{total:.2f}")
             self.window.destroy()
@@ -1,5 +1,6 @@
 import customtkinter as ctk
 from ui.MigrationLogsWindow import MigrationLogsWindow
+from ui.QueryStatsWindow import QueryStatsWindow
 from tkinter import messagebox as mb, filedialog
 from models.product import Product
 from models.sale import Sale
@@ -7,9 +8,10 @@ from db.database import DB_PATH, get_connection
 from ui.admin_passw_change import ChangeAdminPasswordWindow
 from ui.edit_user_role import EditUserRoleWindow
 from cloud_backup import download_backup, upload_backup
-import shutil
+from utils.backup import backup_status, snapshot_database
+from utils.restore import RestoreError, restore_database
+from ui.RestorePointsWindow import RestorePointsWindow
 import os
-import zipfile
 from PIL import Image
 
 
@@ -19,7 +21,7 @@ class SettingsWindow:
     def __init__(self, master, theme="System"):
         self.window = ctk.CTkToplevel(master)
         self.window.title("⚙ Settings")
-        self.window.geometry("720x550")
+        self.window.geometry("720x690")
         self.window.resizable(False, False)
 
         # Ensure backup directory exists
@@ -67,6 +69,14 @@ class SettingsWindow:
             command=lambda: MigrationLogsWindow(self.window)
         )
         view_logs_btn.pack(pady=5)
+
+        # Query performance stats
+        query_stats_btn = ctk.CTkButton(
+            self.window,
+            text="📊 Query Performance",
+            command=lambda: QueryStatsWindow(self.window)
+        )
+        query_stats_btn.pack(pady=5)
         
         # Backup to Cloud
         cloud_backup_btn = ctk.CTkButton(
@@ -94,6 +104,11 @@ class SettingsWindow:
         )
         backup_btn.pack(pady=10)
 
+        # Background backup scheduler status
+        self.backup_status_label = ctk.CTkLabel(self.window, text="", font=("Arial", 12))
+        self.backup_status_label.pack(pady=(0, 5))
+        self.refresh_backup_status()
+
         # Restore DB
         restore_btn = ctk.CTkButton(
             self.window,
@@ -105,6 +120,14 @@ class SettingsWindow:
         )
         restore_btn.pack(pady=10)
 
+        # Restore points kept by the automatic backups
+        restore_points_btn = ctk.CTkButton(
+            self.window,
+            text="🕘 Restore Points",
+            command=lambda: RestorePointsWindow(self.window)
+        )
+        restore_points_btn.pack(pady=5)
+
         # Clear all data
         clear_btn = ctk.CTkButton(
             self.window,
@@ -117,6 +140,22 @@ class SettingsWindow:
         clear_btn.pack(pady=10)
         
         
+    def refresh_backup_status(self):
+        if not self.window.winfo_exists():
+            return
+        status = backup_status()
+        if status is None:
+            text = "💾 Auto backup: no changes this session"
+        elif status["dirty"]:
+            text = (f"💾 Auto backup pending: {status['pending_writes']} writes, "
+                    f"lag {status['lag_s']:.0f}s (every {status['interval_s']:.0f}s / {status['max_writes']} writes)")
+        else:
+            text = f"💾 Auto backup up to date (last: {status['last_backup_at'] or 'startup'})"
+        if status and status["last_error"]:
+            text += f"\n⚠️ Last backup failed: {status['last_error']}"
+        self.backup_status_label.configure(text=text)
+        self.window.after(2000, self.refresh_backup_status)
+
     def change_theme(self, new_theme):
         ctk.set_appearance_mode(new_theme)
         
@@ -140,7 +179,7 @@ class SettingsWindow:
                 title="Save Database Backup"
             )
             if file_path:
-                shutil.copy(DB_PATH, file_path)
+                snapshot_database(file_path)
                 mb.showinfo("Success", f"✅ Backup saved to:\n{file_path}")
         except Exception as e:
             mb.showerror("Error", str(e))
@@ -173,22 +212,11 @@ class SettingsWindow:
             if not confirm:
                 return
 
-            # Handle .zip backup
-            if file_path.endswith(".zip"):
-                with zipfile.ZipFile(file_path, "r") as zipf:
-                    if "inventory.db" not in zipf.namelist():
-                        mb.showerror("Error", "❌ This backup does not contain inventory.db")
-                        return
-
-                    extracted_db = zipf.extract("inventory.db", path=BACKUP_DIR)
-                    shutil.copy(extracted_db, DB_PATH)
-                    os.remove(extracted_db)
-            else:
-                # Handle raw .db backup
-                shutil.copy(file_path, DB_PATH)
-
-            mb.showinfo("Success", "✅ Database restored successfully.\nRestart the app to apply changes.")
+            msg = restore_database(file_path)
+            mb.showinfo("Success", msg)
 
+        except RestoreError as e:
+            mb.showerror("Error", f"❌ Restore failed:\n{str(e)}\n\nYour current database was not changed.")
         except Exception as e:
             mb.showerror("Error", f"❌ Restore failed:\n{str(e)}")
 
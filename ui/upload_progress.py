@@ -0,0 +1,74 @@
+import time
+import customtkinter as ctk
+from cloud_backup import start_background_upload
+from utils.app_config import get_config
+
+# Seconds the exit upload may take before the window closes anyway;
+# unsent chunks resume on the next launch
+EXIT_UPLOAD_DEADLINE_S = get_config("exit_upload_deadline_s", 30)
+# Extra time for chunks already in flight when the deadline hits
+EXIT_UPLOAD_GRACE_S = 5
+
+
+class UploadProgressWindow(ctk.CTkToplevel):
+    def __init__(self, parent, on_done, before_upload=None, deadline_s=EXIT_UPLOAD_DEADLINE_S):
+        super().__init__(parent)
+        self.title("Saving backup...")
+        self.geometry("360x150")
+        self.resizable(False, False)
+        self.protocol("WM_DELETE_WINDOW", self.stop_now)
+
+        # Center window
+        self.update_idletasks()
+        x = (self.winfo_screenwidth() - 360) // 2
+        y = (self.winfo_screenheight() - 150) // 2
+        self.geometry(f"+{x}+{y}")
+
+        self.status_label = ctk.CTkLabel(self, text="💾 Saving backup...", font=ctk.CTkFont(size=14))
+        self.status_label.pack(pady=(20, 10))
+        self.progress = ctk.CTkProgressBar(self, width=280)
+        self.progress.set(0)
+        self.progress.pack(pady=5)
+        self.time_label = ctk.CTkLabel(self, text="", font=ctk.CTkFont(size=12))
+        self.time_label.pack(pady=5)
+
+        self.on_done = on_done
+        self.deadline = time.monotonic() + deadline_s
+        self.cancelled_at = None
+        self.upload = start_background_upload(before_upload)
+        self.after(200, self.poll)
+
+    def stop_now(self):
+        """Closing this window skips the rest of the upload (it resumes next launch)."""
+        self.deadline = time.monotonic()
+
+    def poll(self):
+        upload = self.upload
+        now = time.monotonic()
+        if upload.finished:
+            print(upload.message or "☁️ Exit upload finished.")
+            self.finish()
+            return
+
+        if upload.phase == "uploading" and upload.total:
+            self.progress.set(upload.done / upload.total)
+            self.status_label.configure(text=f"☁️ Uploading backup... {upload.done}/{upload.total} chunks")
+        elif upload.phase == "uploading":
+            self.status_label.configure(text="☁️ Preparing upload...")
+
+        if self.cancelled_at is None:
+            if now >= self.deadline:
+                upload.cancel()
+                self.cancelled_at = now
+                self.status_label.configure(text="⏸️ Finishing current chunks...")
+            else:
+                self.time_label.configure(text=f"Closing in {int(self.deadline - now) + 1}s at the latest")
+        elif now - self.cancelled_at >= EXIT_UPLOAD_GRACE_S:
+            print("⏸️ Exit upload still busy; the rest continues on the next launch.")
+            self.finish()
+            return
+        self.after(200, self.poll)
+
+    def finish(self):
+        self.destroy()
+        self.on_done()
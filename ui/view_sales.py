@@ -5,7 +5,7 @@ import os
 import tempfile
 import platform
 import subprocess
-from datetime import datetime
+from datetime import datetime, timedelta
 import pandas as pd
 from fpdf import FPDF
 from models.sale import Sale
@@ -118,76 +118,33 @@ class ViewSalesWindow:
         to_date = self.date_to.get().strip()
         print(f"Applying filters: search='{search_text}', category='{category_filter}', from='{from_date}', to='{to_date}'")
 
-        from_dt = None
-        to_dt = None
+        # Dates are parsed once here; the range itself is an index seek on sales.ts_epoch
+        start = end = None
         if from_date and self.is_valid_date(from_date):
             try:
-                from_dt = datetime.strptime(from_date, "%Y-%m-%d")
-                print(f"Parsed from_date: {from_dt}")
+                start = datetime.strptime(from_date, "%Y-%m-%d")
             except ValueError:
                 print(f"Invalid 'from' date: '{from_date}', ignoring date filter")
-                from_dt = None
         if to_date and self.is_valid_date(to_date):
             try:
-                to_dt = datetime.strptime(to_date, "%Y-%m-%d")
-                to_dt = to_dt.replace(hour=23, minute=59, second=59)
-                print(f"Parsed to_date: {to_dt}")
+                # Inclusive 'to' day = everything before the next midnight
+                end = datetime.strptime(to_date, "%Y-%m-%d") + timedelta(days=1)
             except ValueError:
                 print(f"Invalid 'to' date: '{to_date}', ignoring date filter")
-                to_dt = None
 
-        filtered = []
-        print(f"Total sales data rows: {len(self.sales_data)}")
-        if not self.sales_data:
-            print("No sales data available")
-            messagebox.showinfo("No Results", "No sales data available in the database.")
-            self.display_sales(filtered)
-            self.window.update()
-            return
-
-        for row in self.sales_data:
-            try:
-                sale_id, product_name, category, quantity, total_price, date = row
-                product_name = product_name.strip().lower() if isinstance(product_name, str) and product_name.strip() else ""
-                category = category.strip() if isinstance(category, str) and category.strip() else "No Category"
-                print(f"Processing sale ID {sale_id}: product='{product_name}', category='{category}', date='{date}', type={type(date)}")
+        category = None if category_filter == "All Categories" else category_filter
+        rows = Sale.get_all_with_category(category=category, start=start, end=end)
 
-                # Convert date to datetime if it's a string
-                if isinstance(date, str):
-                    for fmt in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d", "%Y-%m-%dT%H:%M:%S.%f", "%d/%m/%Y", "%Y/%m/%d", "%m/%d/%Y"):
-                        try:
-                            date = datetime.strptime(date, fmt)
-                            print(f"Parsed date for sale ID {sale_id}: {date}")
-                            break
-                        except ValueError:
-                            continue
-                    else:
-                        print(f"Warning: Could not parse date '{date}' for sale ID {sale_id}, including anyway")
-                        date = None
-
-                # Apply filters
-                if search_text and product_name and search_text not in product_name:
-                    print(f"Skipping sale ID {sale_id}: product '{product_name}' does not match search '{search_text}'")
-                    continue
-                if category_filter != "All Categories" and category != category_filter:
-                    print(f"Skipping sale ID {sale_id}: category '{category}' does not match filter '{category_filter}'")
-                    continue
-                if from_dt and date and date < from_dt:
-                    print(f"Skipping sale ID {sale_id}: date {date} is before {from_dt}")
-                    continue
-                if to_dt and date and date > to_dt:
-                    print(f"Skipping sale ID {sale_id}: date {date} is after {to_dt}")
-                    continue
-
-                filtered.append((sale_id, product_name.title() if product_name else "", category, quantity, total_price, date))
-                print(f"Including sale ID {sale_id}")
-            except Exception as e:
-                print(f"Error processing sale ID {sale_id}: {e}")
+        filtered = []
+        for sale_id, product_name, category_name, quantity, total_price, date in rows:
+            product_name = product_name.strip().lower() if isinstance(product_name, str) else ""
+            if search_text and product_name and search_text not in product_name:
                 continue
+            category_name = category_name.strip() if isinstance(category_name, str) and category_name.strip() else "No Category"
+            filtered.append((sale_id, product_name.title(), category_name, quantity, total_price, date))
 
         print(f"Filtered rows: {len(filtered)}")
         if not filtered:
-            print("No sales matched filters. Check data formats and filter values.")
             messagebox.showinfo("No Results", "No sales match the applied filters. Check your filters or database data.")
         self.filtered_data = filtered
         self.display_sales(filtered)
@@ -0,0 +1,39 @@
+import json
+import os
+from utils.path_helper import resource_path
+
+# Optional local settings file, e.g. {"db_profile": "throughput"}
+CONFIG_PATH = resource_path(os.path.join("config", "app_config.json"))
+
+_cache = None
+
+
+def load_config():
+    """Read config/app_config.json once; a missing or broken file means defaults."""
+    global _cache
+    if _cache is None:
+        try:
+            with open(CONFIG_PATH, encoding="utf-8") as f:
+                data = json.load(f)
+            _cache = data if isinstance(data, dict) else {}
+        except (OSError, ValueError):
+            _cache = {}
+    return _cache
+
+
+def get_config(key, default=None):
+    """
+    Look up a setting. INVENTORY_<KEY> in the environment wins over the
+    config file, so a single run can be tuned without editing files.
+    """
+    env_value = os.environ.get(f"INVENTORY_{key.upper()}")
+    if env_value is not None:
+        if isinstance(default, bool):
+            return env_value.strip().lower() in ("1", "true", "yes", "on")
+        if isinstance(default, (int, float)):
+            try:
+                return type(default)(env_value)
+            except ValueError:
+                return default
+        return env_value
+    return load_config().get(key, default)
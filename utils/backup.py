@@ -1,45 +1,305 @@
+import atexit
 import os
+import sqlite3
+import tempfile
+import threading
+import time
 import zipfile
 from datetime import datetime
-from db.database import DB_PATH
+import db.database as database
 from db.migrations import run_migrations 
+from db.writer import flush_writes
+from utils.app_config import get_config
+from utils.backup_store import get_backup_store
+from utils.change_journal import get_journal, journal_position
+from utils.compression import get_codec
 
 BACKUP_DIR = os.path.join(os.path.dirname(__file__), "..", "backups")
-MAX_BACKUPS = 5  # Keep only latest 5 backups
+
+# Scheduler limits: a backup runs once the DB has been dirty this long...
+BACKUP_INTERVAL_S = get_config("backup_interval_s", 300)
+# ...or after this many writes, whichever comes first
+BACKUP_MAX_WRITES = get_config("backup_max_writes", 200)
+
+# Snapshot pacing: copy this many pages per step, then pause so writers keep moving
+BACKUP_PAGES_PER_STEP = get_config("backup_pages_per_step", 256)
+BACKUP_STEP_SLEEP_MS = get_config("backup_step_sleep_ms", 2)
+
+# Held while a snapshot reads the live file; a restore takes it before swapping
+BACKUP_LOCK = threading.RLock()
+
+
+class BackupIntegrityError(sqlite3.DatabaseError):
+    """The snapshot failed PRAGMA quick_check and was discarded."""
+
+
+def snapshot_database(dest_path, src_path=None, pages=None, sleep_ms=None, check=True, info=None):
+    """
+    Copy the live database to dest_path with the sqlite3 backup API.
+    The source keeps one read transaction open for the whole copy, so the
+    snapshot is a single point in time and never restarts, while WAL lets
+    writers keep committing. Pages are copied in steps with a short sleep
+    between them. The result is a self-contained file (rollback journal).
+    If info is a dict it receives the snapshot's point in time: snapshot_ts,
+    journal_seq (last change_log id it contains) and the journal timeline.
+    """
+    src_path = src_path or database.DB_PATH
+    pages = BACKUP_PAGES_PER_STEP if pages is None else pages
+    sleep_s = (BACKUP_STEP_SLEEP_MS if sleep_ms is None else sleep_ms) / 1000.0
+    tmp_path = dest_path + ".part"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    def pace(status, remaining, total):
+        if remaining and sleep_s:
+            time.sleep(sleep_s)
+
+    with BACKUP_LOCK:
+        _copy_snapshot(src_path, tmp_path, pages, pace, check, info)
+    os.replace(tmp_path, dest_path)
+    return dest_path
+
+
+def _copy_snapshot(src_path, tmp_path, pages, pace, check, info=None):
+    if not database.wait_online(database.POOL_TIMEOUT):
+        raise database.PoolTimeout("Database is offline (restore in progress)")
+    src = database.open_connection(src_path, readonly=True, isolation_level=None)
+    dst = sqlite3.connect(tmp_path)
+    try:
+        src.execute("BEGIN")
+        src.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()   # pin the read snapshot
+        if info is not None:
+            info.update(snapshot_ts=time.time(), journal_seq=journal_position(src),
+                        timeline=get_journal().timeline)
+        src.backup(dst, pages=pages, progress=pace)
+        src.execute("ROLLBACK")
+
+        dst.execute("PRAGMA journal_mode = DELETE")   # one file, no -wal to carry around
+        if check:
+            result = [row[0] for row in dst.execute("PRAGMA quick_check")]
+            if result != ["ok"]:
+                raise BackupIntegrityError(f"Snapshot failed quick_check: {'; '.join(result[:5])}")
+    except BaseException:
+        dst.close()
+        src.close()
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    dst.close()
+    src.close()
+
 
 def auto_backup():
-    """Automatically create a timestamped compressed DB backup and remove older ones."""
+    """Snapshot the DB into the deduplicated backup store and expire old restore points."""
     os.makedirs(BACKUP_DIR, exist_ok=True)
 
-    if not os.path.exists(DB_PATH):
-        print(f"[Auto Backup] ⚠️ No database found at {DB_PATH}. Creating a fresh one...")
+    if not os.path.exists(database.DB_PATH):
+        print(f"[Auto Backup] ⚠️ No database found at {database.DB_PATH}. Creating a fresh one...")
         run_migrations()   # create DB schema so we don’t crash
 
-    # Create timestamp
-    timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-    backup_name = f"backup_{timestamp}.zip"
-    backup_path = os.path.join(BACKUP_DIR, backup_name)
+    store = get_backup_store()
+    # Snapshot first, chunk afterwards: the live DB is only read during the copy
+    fd, snapshot_path = tempfile.mkstemp(prefix="snapshot_", suffix=".db", dir=BACKUP_DIR)
+    os.close(fd)
+    try:
+        info = {}
+        snapshot_database(snapshot_path, info=info)
+        manifest = store.put_file(snapshot_path, label="auto", meta=info)
+    finally:
+        if os.path.exists(snapshot_path):
+            os.remove(snapshot_path)
+
+    print(f"[Auto Backup] ✅ Restore point {manifest['id']} saved")
+    store.apply_retention()
+    prune_journal()
+    return manifest["id"]
+
+
+def prune_journal():
+    """Drop journal segments older than the oldest restore point of their timeline."""
+    keep_from = {}
+    for m in get_backup_store().list_backups():
+        if m.get("timeline"):
+            keep_from[m["timeline"]] = min(keep_from.get(m["timeline"], m["journal_seq"]), m["journal_seq"])
+    get_journal().prune(keep_from)
+
+
+def backup_archive(archive_path):
+    """Zip one yearly sales archive. Archives are written once, so this replaces any older copy."""
+    os.makedirs(BACKUP_DIR, exist_ok=True)
+    name = os.path.splitext(os.path.basename(archive_path))[0]
+    backup_path = os.path.join(BACKUP_DIR, f"archive_{name}.zip")
+
+    codec = get_codec()
+    with zipfile.ZipFile(backup_path, "w", codec.zip_method, compresslevel=codec.zip_level) as zipf:
+        zipf.write(archive_path, arcname=os.path.basename(archive_path))
+
+    print(f"[Auto Backup] ✅ Archive backup saved at {backup_path}")
+    return backup_path
+
+
+# ----------------- Background backup scheduler ----------------- #
+class BackupScheduler:
+    """
+    Runs auto_backup() on a background thread. Writes only mark the DB dirty;
+    bursts of writes coalesce into one backup once the DB has been dirty for
+    interval_s seconds or max_writes writes have piled up.
+    """
+
+    def __init__(self, interval_s=BACKUP_INTERVAL_S, max_writes=BACKUP_MAX_WRITES, backup_fn=None):
+        self.interval_s = max(0.0, float(interval_s))
+        self.max_writes = max(1, int(max_writes))
+        self.backup_fn = backup_fn or auto_backup
+        self._cond = threading.Condition()
+        self._backup_lock = threading.Lock()   # one backup at a time (thread or flush)
+        self._dirty_since = None   # monotonic time of the first write not yet backed up
+        self._writes = 0
+        self._stopping = False
+        self.last_backup_at = None   # wall clock
+        self.last_backup_id = None
+        self.last_duration_s = None
+        self.last_lag_s = None       # how stale the DB copy was when that backup ran
+        self.last_error = None
+        self.backups_taken = 0
+        self._thread = threading.Thread(target=self._run, name="backup-scheduler", daemon=True)
+        self._thread.start()
+
+    # ----- public API -----
+    def mark_dirty(self, writes=1):
+        with self._cond:
+            if self._dirty_since is None:
+                self._dirty_since = time.monotonic()
+            self._writes += writes
+            if self._writes >= self.max_writes:
+                self._cond.notify()
+
+    def flush(self):
+        """Back up now if anything changed since the last backup (blocking)."""
+        with self._cond:
+            if self._dirty_since is None:
+                return None
+        return self._backup()
+
+    def stop(self, flush=True, timeout=None):
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+        self._thread.join(timeout)
+        if flush:
+            self.flush()
+
+    def lag(self):
+        """Seconds the newest unsaved write has been waiting for a backup (0 = clean)."""
+        with self._cond:
+            return 0.0 if self._dirty_since is None else time.monotonic() - self._dirty_since
+
+    def status(self):
+        with self._cond:
+            lag = 0.0 if self._dirty_since is None else time.monotonic() - self._dirty_since
+            return {
+                "dirty": self._dirty_since is not None,
+                "pending_writes": self._writes,
+                "lag_s": round(lag, 1),
+                "last_backup_at": self.last_backup_at,
+                "last_backup_id": self.last_backup_id,
+                "last_duration_s": self.last_duration_s,
+                "last_lag_s": self.last_lag_s,
+                "last_error": self.last_error,
+                "backups_taken": self.backups_taken,
+                "interval_s": self.interval_s,
+                "max_writes": self.max_writes,
+            }
+
+    # ----- scheduler thread -----
+    def _due(self):
+        if self._dirty_since is None:
+            return False
+        return (self._writes >= self.max_writes
+                or time.monotonic() - self._dirty_since >= self.interval_s)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._stopping and not self._due():
+                    if self._dirty_since is None:
+                        self._cond.wait()
+                    else:
+                        self._cond.wait(max(0.0, self._dirty_since + self.interval_s - time.monotonic()))
+                if self._stopping:
+                    return
+            self._backup()
+
+    def _backup(self):
+        with self._backup_lock:
+            with self._cond:
+                if self._dirty_since is None:
+                    return None
+                dirty_since, writes = self._dirty_since, self._writes
+                # Writes arriving while we copy mark the DB dirty again
+                self._dirty_since, self._writes = None, 0
+
+            start = time.monotonic()
+            try:
+                # Let queued writes commit so the copy includes them
+                flush_writes()
+                backup_id = self.backup_fn()
+            except Exception as e:
+                print(f"[Auto Backup] ❌ Backup failed: {e}")
+                with self._cond:
+                    self.last_error = str(e)
+                    # Still dirty; retry at the next interval
+                    if self._dirty_since is None or dirty_since < self._dirty_since:
+                        self._dirty_since = dirty_since
+                    self._writes += writes
+                return None
+
+            with self._cond:
+                self.last_backup_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                self.last_backup_id = backup_id
+                self.last_duration_s = round(time.monotonic() - start, 3)
+                self.last_lag_s = round(start - dirty_since, 1)
+                self.last_error = None
+                self.backups_taken += 1
+            print(f"[Auto Backup] ⏱️ Covered {writes} writes, lag {self.last_lag_s}s, took {self.last_duration_s}s")
+            return backup_id
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_backup_scheduler():
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = BackupScheduler()
+    return _scheduler
 
-    # Create zip archive
-    with zipfile.ZipFile(backup_path, "w", zipfile.ZIP_DEFLATED) as zipf:
-        zipf.write(DB_PATH, arcname="inventory.db")  # inside zip always named inventory.db
 
-    print(f"[Auto Backup] ✅ Backup saved at {backup_path}")
+def request_backup(writes=1):
+    """Call after a write instead of auto_backup(): the scheduler coalesces them."""
+    get_backup_scheduler().mark_dirty(writes)
 
-    # Get list of all backups sorted by newest first
-    backups = sorted(
-        [f for f in os.listdir(BACKUP_DIR) if f.startswith("backup_") and f.endswith(".zip")],
-        key=lambda f: os.path.getmtime(os.path.join(BACKUP_DIR, f)),
-        reverse=True
-    )
 
-    # Delete backups beyond the MAX_BACKUPS limit
-    for old_backup in backups[MAX_BACKUPS:]:
-        os.remove(os.path.join(BACKUP_DIR, old_backup))
-        print(f"[Auto Backup] 🗑️ Deleted old backup: {old_backup}")
+def flush_backups():
+    """Take the pending backup now, if any (e.g. before exit or a cloud upload)."""
+    if _scheduler is not None:
+        return _scheduler.flush()
+    return None
 
 
+def backup_status():
+    """Scheduler state for the UI; None until the first write of the session."""
+    return _scheduler.status() if _scheduler is not None else None
 
 
+def stop_backup_scheduler():
+    global _scheduler
+    with _scheduler_lock:
+        scheduler, _scheduler = _scheduler, None
+    if scheduler is not None:
+        scheduler.stop(flush=True)
 
 
+atexit.register(stop_backup_scheduler)
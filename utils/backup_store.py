@@ -0,0 +1,354 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from utils.app_config import get_config
+from utils.compression import benchmark, decode, get_codec, print_benchmark
+
+# ----------------- Deduplicated backup store ----------------- #
+# Each backup is a manifest (JSON list of chunk hashes) plus the chunks it
+# needs. Chunks are stored once under their SHA-256, so a new restore point
+# only costs the chunks that changed since the last one.
+#
+# Chunk boundaries are content-defined, but only ever fall on page
+# boundaries: a page ends a chunk when its hash hits the cut mask. SQLite
+# rewrites pages in place and never shifts bytes across them, so this finds
+# the same cut points byte-level rolling hashes would, at hashlib speed.
+#
+#   backups/store/chunks/ab/ab12...   one compressed chunk per file (codec tag + payload)
+#   backups/store/manifests/<id>.json one file per restore point
+
+STORE_DIR = os.path.join(os.path.dirname(__file__), "..", "backups", "store")
+
+PAGE_SIZE = 4096          # fallback when the file isn't a SQLite database
+CUT_MASK = 0x0F           # cut after ~1 in 16 pages -> ~64 KiB average chunk
+MIN_CHUNK_PAGES = 4
+MAX_CHUNK_PAGES = 64
+
+# Generational retention: newest backup in each of the last N hours/days/...
+DEFAULT_RETENTION = {"last": 10, "hourly": 24, "daily": 14, "weekly": 8, "monthly": 12}
+BACKUP_RETENTION = get_config("backup_retention", DEFAULT_RETENTION)
+
+
+class BackupStoreError(Exception):
+    pass
+
+
+def sqlite_page_size(path):
+    """Page size from the SQLite header (bytes 16-17), PAGE_SIZE for other files."""
+    with open(path, "rb") as f:
+        header = f.read(100)
+    if header[:16] != b"SQLite format 3\x00":
+        return PAGE_SIZE
+    size = int.from_bytes(header[16:18], "big")
+    return 65536 if size == 1 else size
+
+
+def iter_chunks(path, page_size=None):
+    """Yield the content-defined chunks (bytes) of a file."""
+    page_size = page_size or sqlite_page_size(path)
+    with open(path, "rb") as f:
+        pages = []
+        while True:
+            page = f.read(page_size)
+            if not page:
+                break
+            pages.append(page)
+            cut = hashlib.blake2b(page, digest_size=8).digest()[0] & CUT_MASK == 0
+            if (cut and len(pages) >= MIN_CHUNK_PAGES) or len(pages) >= MAX_CHUNK_PAGES:
+                yield b"".join(pages)
+                pages = []
+        if pages:
+            yield b"".join(pages)
+
+
+def _bucket_keys(dt):
+    iso_year, iso_week, _ = dt.isocalendar()
+    return {
+        "hourly": dt.strftime("%Y-%m-%d %H"),
+        "daily": dt.strftime("%Y-%m-%d"),
+        "weekly": f"{iso_year}-W{iso_week:02d}",
+        "monthly": dt.strftime("%Y-%m"),
+    }
+
+
+def select_retained(manifests, policy=None):
+    """
+    Ids of the backups a generational policy keeps: the newest `last`
+    backups, plus the newest backup of each of the most recent N hours,
+    days, ISO weeks and months.
+    """
+    policy = {**DEFAULT_RETENTION, **(policy or {})}
+    newest_first = sorted(manifests, key=lambda m: m["created_ts"], reverse=True)
+    keep = {m["id"] for m in newest_first[:policy["last"]]}
+    for generation in ("hourly", "daily", "weekly", "monthly"):
+        seen = []
+        for m in newest_first:
+            key = _bucket_keys(datetime.fromtimestamp(m["created_ts"]))[generation]
+            if key in seen:
+                continue
+            if len(seen) >= policy[generation]:
+                break
+            seen.append(key)
+            keep.add(m["id"])
+    return keep
+
+
+class BackupStore:
+    def __init__(self, root=STORE_DIR, codec=None):
+        self.root = os.path.abspath(root)
+        self.chunk_dir = os.path.join(self.root, "chunks")
+        self.manifest_dir = os.path.join(self.root, "manifests")
+        self.codec = get_codec(codec)
+        # put() and gc() must not interleave: gc could delete a chunk that a
+        # manifest being written is about to reference
+        self._lock = threading.RLock()
+
+    # ----- chunks -----
+    def _chunk_path(self, digest):
+        return os.path.join(self.chunk_dir, digest[:2], digest)
+
+    def has_chunk(self, digest):
+        return os.path.exists(self._chunk_path(digest))
+
+    def _write_chunk(self, digest, data):
+        path = self._chunk_path(digest)
+        payload = self.codec.encode(data)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{threading.get_ident()}.part"
+        with open(tmp, "wb") as f:
+            f.write(payload)
+        os.replace(tmp, path)
+        return len(payload)
+
+    def read_chunk(self, digest):
+        """Chunk bytes, verified against their hash."""
+        try:
+            with open(self._chunk_path(digest), "rb") as f:
+                payload = f.read()
+        except FileNotFoundError:
+            raise BackupStoreError(f"Missing chunk {digest}")
+        try:
+            data = decode(payload)
+        except Exception as e:
+            raise BackupStoreError(f"Chunk {digest} cannot be decoded: {e}")
+        if hashlib.sha256(data).hexdigest() != digest:
+            raise BackupStoreError(f"Chunk {digest} is corrupt")
+        return data
+
+    # ----- manifests -----
+    def _manifest_path(self, backup_id):
+        return os.path.join(self.manifest_dir, f"{backup_id}.json")
+
+    def list_backups(self):
+        """Manifests, oldest first."""
+        manifests = []
+        try:
+            names = os.listdir(self.manifest_dir)
+        except FileNotFoundError:
+            return manifests
+        for name in names:
+            if name.endswith(".json"):
+                try:
+                    manifests.append(self.get_manifest(name[:-5]))
+                except (OSError, ValueError) as e:
+                    print(f"[Backup Store] ⚠️ Skipping unreadable manifest {name}: {e}")
+        return sorted(manifests, key=lambda m: m["created_ts"])
+
+    def get_manifest(self, backup_id):
+        with open(self._manifest_path(backup_id), encoding="utf-8") as f:
+            return json.load(f)
+
+    def latest(self):
+        backups = self.list_backups()
+        return backups[-1] if backups else None
+
+    # ----- backup / restore -----
+    def put_file(self, path, label=None, meta=None):
+        """Store a file as a new restore point; returns its manifest. meta adds extra manifest fields."""
+        start = time.monotonic()
+        page_size = sqlite_page_size(path)
+        whole = hashlib.sha256()
+        chunks = []
+        new_chunks = new_bytes = 0
+        with self._lock:
+            for data in iter_chunks(path, page_size):
+                whole.update(data)
+                digest = hashlib.sha256(data).hexdigest()
+                if not self.has_chunk(digest):
+                    new_bytes += self._write_chunk(digest, data)
+                    new_chunks += 1
+                chunks.append([digest, len(data)])
+
+            created = time.time()
+            backup_id = datetime.fromtimestamp(created).strftime("%Y%m%d-%H%M%S-%f")
+            manifest = {
+                "id": backup_id,
+                "label": label,
+                "created_at": datetime.fromtimestamp(created).strftime("%Y-%m-%d %H:%M:%S"),
+                "created_ts": created,
+                "size": sum(length for _, length in chunks),
+                "sha256": whole.hexdigest(),
+                "page_size": page_size,
+                "chunks": chunks,
+                "new_chunks": new_chunks,
+                "new_bytes": new_bytes,
+                "codec": self.codec.name,
+                **(meta or {}),
+            }
+            os.makedirs(self.manifest_dir, exist_ok=True)
+            tmp = self._manifest_path(backup_id) + ".part"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(manifest, f)
+            os.replace(tmp, self._manifest_path(backup_id))   # the manifest makes it visible
+
+        print(f"[Backup Store] ✅ {backup_id}: {len(chunks)} chunks, {new_chunks} new "
+              f"({new_bytes / 1024:.0f} KiB written) in {time.monotonic() - start:.2f}s")
+        return manifest
+
+    def iter_restore(self, backup_id):
+        """Yield the chunks of a backup in order, each verified; then check the whole-file hash."""
+        manifest = self.get_manifest(backup_id)
+        whole = hashlib.sha256()
+        for digest, length in manifest["chunks"]:
+            data = self.read_chunk(digest)
+            if len(data) != length:
+                raise BackupStoreError(f"Chunk {digest} has {len(data)} bytes, manifest says {length}")
+            whole.update(data)
+            yield data
+        if whole.hexdigest() != manifest["sha256"]:
+            raise BackupStoreError(f"Backup {backup_id} does not match its checksum")
+
+    def restore_to(self, backup_id, dest_path):
+        """Rebuild a backup into dest_path (written to a .part file, renamed when verified)."""
+        tmp = dest_path + ".part"
+        try:
+            with open(tmp, "wb") as f:
+                for data in self.iter_restore(backup_id):
+                    f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        os.replace(tmp, dest_path)
+        return dest_path
+
+    def verify(self, backup_id):
+        for _ in self.iter_restore(backup_id):
+            pass
+        return True
+
+    # ----- retention -----
+    def apply_retention(self, policy=None):
+        """Drop manifests the generational policy doesn't keep, then collect garbage."""
+        with self._lock:
+            manifests = self.list_backups()
+            keep = select_retained(manifests, policy or BACKUP_RETENTION)
+            dropped = [m["id"] for m in manifests if m["id"] not in keep]
+            for backup_id in dropped:
+                os.remove(self._manifest_path(backup_id))
+            removed, freed = self.gc()
+        if dropped:
+            print(f"[Backup Store] 🗑️ Expired {len(dropped)} restore points, "
+                  f"freed {removed} chunks ({freed / 1024:.0f} KiB)")
+        return dropped
+
+    def gc(self):
+        """Delete chunks no manifest references; returns (chunks removed, bytes freed)."""
+        with self._lock:
+            live = set()
+            for manifest in self.list_backups():
+                live.update(digest for digest, _ in manifest["chunks"])
+            removed = freed = 0
+            if not os.path.isdir(self.chunk_dir):
+                return removed, freed
+            for prefix in os.listdir(self.chunk_dir):
+                folder = os.path.join(self.chunk_dir, prefix)
+                for name in os.listdir(folder):
+                    if name in live:
+                        continue
+                    path = os.path.join(folder, name)
+                    freed += os.path.getsize(path)
+                    os.remove(path)
+                    removed += 1
+            return removed, freed
+
+    def stats(self):
+        manifests = self.list_backups()
+        chunk_count = stored = 0
+        if os.path.isdir(self.chunk_dir):
+            for prefix in os.listdir(self.chunk_dir):
+                folder = os.path.join(self.chunk_dir, prefix)
+                for name in os.listdir(folder):
+                    chunk_count += 1
+                    stored += os.path.getsize(os.path.join(folder, name))
+        logical = sum(m["size"] for m in manifests)
+        return {
+            "backups": len(manifests),
+            "chunks": chunk_count,
+            "stored_bytes": stored,
+            "logical_bytes": logical,
+            "dedup_ratio": round(logical / stored, 1) if stored else 0.0,
+        }
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_backup_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = BackupStore()
+    return _store
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Inspect and maintain the local backup store.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("list")
+    sub.add_parser("stats")
+    sub.add_parser("gc")
+    sub.add_parser("prune")
+    bench = sub.add_parser("benchmark", help="compare compression codecs on the live DB")
+    bench.add_argument("--db", help="database file to sample instead of a live snapshot")
+    bench.add_argument("--codec", action="append", help="codec to test (repeatable; default: all)")
+    verify = sub.add_parser("verify")
+    verify.add_argument("backup_id", nargs="?")
+    restore = sub.add_parser("restore")
+    restore.add_argument("backup_id")
+    restore.add_argument("dest")
+    args = parser.parse_args()
+
+    store = get_backup_store()
+    if args.command == "list":
+        for m in store.list_backups():
+            print(f"{m['id']}  {m['created_at']}  {m['size'] / 1024:>10.0f} KiB  "
+                  f"+{m['new_bytes'] / 1024:.0f} KiB  {m.get('label') or ''}")
+    elif args.command == "benchmark":
+        print_benchmark(benchmark(args.db, args.codec))
+    elif args.command == "stats":
+        print(json.dumps(store.stats(), indent=2))
+    elif args.command == "gc":
+        print("Removed %d chunks, freed %d bytes" % store.gc())
+    elif args.command == "prune":
+        store.apply_retention()
+    elif args.command == "verify":
+        ids = [args.backup_id] if args.backup_id else [m["id"] for m in store.list_backups()]
+        for backup_id in ids:
+            try:
+                store.verify(backup_id)
+                print(f"✅ {backup_id}")
+            except BackupStoreError as e:
+                print(f"❌ {backup_id}: {e}")
+    elif args.command == "restore":
+        store.restore_to(args.backup_id, args.dest)
+        print(f"✅ Restored {args.backup_id} to {args.dest}")
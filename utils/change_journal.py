@@ -0,0 +1,419 @@
+import atexit
+import json
+import os
+import shutil
+import sqlite3
+import struct
+import threading
+import time
+import uuid
+import zlib
+
+from db.database import get_read_connection
+from db.writer import execute_write
+from utils.app_config import get_config
+
+# ----------------- Change journal ----------------- #
+# Triggers (migration 6) copy every row change of products/sales/transactions
+# into change_log inside the writing transaction. The shipper moves those
+# rows into append-only binary segment files outside the DB and deletes
+# them from change_log. A restore takes the nearest snapshot from the backup
+# store and replays the journal on top of it up to any moment.
+#
+#   backups/journal/CURRENT                 id of the active timeline
+#   backups/journal/<timeline>/seg_<first seq>.bin
+#
+# A restore starts a new timeline: seq numbers of the restored DB continue
+# from its own snapshot, so they must never mix with the abandoned history.
+
+JOURNAL_DIR = os.path.join(os.path.dirname(__file__), "..", "backups", "journal")
+JOURNAL_INTERVAL_S = get_config("journal_interval_s", 5)       # how often change_log is shipped
+JOURNAL_SEGMENT_BYTES = get_config("journal_segment_bytes", 4 * 1024 * 1024)
+SHIP_BATCH = 5000
+
+SEGMENT_MAGIC = b"INVJRNL1"
+# record: length | seq, ts, table, op, row_id | payload | crc32
+_LENGTH = struct.Struct("<I")
+_HEADER = struct.Struct("<QdBBq")
+_CRC = struct.Struct("<I")
+
+OP_CODES = {"I": 1, "U": 2, "D": 3, "S": 4}   # S = column names of a table (once per segment)
+OP_NAMES = {code: op for op, code in OP_CODES.items()}
+TABLE_CODES = {"products": 1, "sales": 2, "transactions": 3}
+TABLE_NAMES = {code: table for table, code in TABLE_CODES.items()}
+
+_NONE, _INT, _FLOAT, _TEXT, _BLOB = range(5)
+
+
+class JournalError(Exception):
+    pass
+
+
+# ----- compact value encoding -----
+def encode_values(values):
+    out = [struct.pack("<H", len(values))]
+    for value in values:
+        if value is None:
+            out.append(bytes((_NONE,)))
+        elif isinstance(value, bool) or isinstance(value, int):
+            out.append(struct.pack("<Bq", _INT, int(value)))
+        elif isinstance(value, float):
+            out.append(struct.pack("<Bd", _FLOAT, value))
+        elif isinstance(value, bytes):
+            out.append(struct.pack("<BI", _BLOB, len(value)) + value)
+        else:
+            raw = str(value).encode("utf-8")
+            out.append(struct.pack("<BI", _TEXT, len(raw)) + raw)
+    return b"".join(out)
+
+
+def decode_values(buf):
+    count, = struct.unpack_from("<H", buf, 0)
+    pos, values = 2, []
+    for _ in range(count):
+        tag = buf[pos]
+        pos += 1
+        if tag == _NONE:
+            values.append(None)
+        elif tag == _INT:
+            values.append(struct.unpack_from("<q", buf, pos)[0])
+            pos += 8
+        elif tag == _FLOAT:
+            values.append(struct.unpack_from("<d", buf, pos)[0])
+            pos += 8
+        else:
+            size, = struct.unpack_from("<I", buf, pos)
+            pos += 4
+            raw = bytes(buf[pos:pos + size])
+            pos += size
+            values.append(raw.decode("utf-8") if tag == _TEXT else raw)
+    return values
+
+
+def _pack_record(seq, ts, table, op, row_id, payload):
+    body = _HEADER.pack(seq, ts, TABLE_CODES[table], OP_CODES[op], row_id) + payload
+    return _LENGTH.pack(len(body)) + body + _CRC.pack(zlib.crc32(body))
+
+
+def read_segment(path):
+    """
+    Yield (seq, ts, table, op, row_id, payload) from one segment. Stops at
+    the first torn or corrupt record (a crash mid-append), which is then
+    treated as the end of the segment.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    if not data.startswith(SEGMENT_MAGIC):
+        raise JournalError(f"{path} is not a journal segment")
+    pos = len(SEGMENT_MAGIC)
+    while pos + _LENGTH.size <= len(data):
+        length, = _LENGTH.unpack_from(data, pos)
+        end = pos + _LENGTH.size + length + _CRC.size
+        if length < _HEADER.size or end > len(data):
+            return
+        body = data[pos + _LENGTH.size:end - _CRC.size]
+        if zlib.crc32(body) != _CRC.unpack_from(data, end - _CRC.size)[0]:
+            return
+        seq, ts, table, op, row_id = _HEADER.unpack_from(body, 0)
+        yield seq, ts, TABLE_NAMES[table], OP_NAMES[op], row_id, body[_HEADER.size:]
+        pos = end
+
+
+def _valid_length(path):
+    """Bytes of the segment up to the end of its last intact record."""
+    size = len(SEGMENT_MAGIC)
+    for record in read_segment(path):
+        payload = record[5]
+        size += _LENGTH.size + _HEADER.size + len(payload) + _CRC.size
+    return size
+
+
+# ----- journal directory / timelines -----
+class Journal:
+    def __init__(self, root=JOURNAL_DIR, segment_bytes=JOURNAL_SEGMENT_BYTES):
+        self.root = os.path.abspath(root)
+        self.segment_bytes = segment_bytes
+        self.lock = threading.RLock()   # held for a whole ship or timeline switch
+        self._timeline = None
+        self._file = None
+        self._file_path = None
+        self._schemas = {}              # table -> columns already written to the open segment
+        self.last_seq = None
+
+    # timelines
+    @property
+    def timeline(self):
+        if self._timeline is None:
+            current = os.path.join(self.root, "CURRENT")
+            try:
+                with open(current, encoding="utf-8") as f:
+                    self._timeline = f.read().strip()
+            except FileNotFoundError:
+                self._timeline = ""
+            if not self._timeline:
+                self._write_current(uuid.uuid4().hex[:12])
+        return self._timeline
+
+    def _write_current(self, timeline):
+        os.makedirs(os.path.join(self.root, timeline), exist_ok=True)
+        tmp = os.path.join(self.root, "CURRENT.part")
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(timeline)
+        os.replace(tmp, os.path.join(self.root, "CURRENT"))
+        self._timeline = timeline
+
+    def new_timeline(self):
+        """Start an empty timeline (after a restore); the old one stays for older restore points."""
+        with self.lock:
+            self._close_segment()
+            self.last_seq = 0
+            self._write_current(uuid.uuid4().hex[:12])
+            print(f"[Journal] 🧭 New timeline {self._timeline}")
+            return self._timeline
+
+    def timelines(self):
+        try:
+            return [name for name in os.listdir(self.root) if os.path.isdir(os.path.join(self.root, name))]
+        except FileNotFoundError:
+            return []
+
+    def segments(self, timeline=None):
+        """[(first_seq, path)] of a timeline, in order."""
+        folder = os.path.join(self.root, timeline or self.timeline)
+        try:
+            names = os.listdir(folder)
+        except FileNotFoundError:
+            return []
+        found = []
+        for name in names:
+            if name.startswith("seg_") and name.endswith(".bin"):
+                found.append((int(name[4:-4]), os.path.join(folder, name)))
+        return sorted(found)
+
+    # appending
+    def _close_segment(self):
+        if self._file is not None:
+            self._file.close()
+        self._file = self._file_path = None
+        self._schemas = {}
+
+    def _recover_tail(self):
+        """Find last_seq and cut a torn record off the newest segment."""
+        segments = self.segments()
+        self.last_seq = 0
+        if not segments:
+            return
+        _, path = segments[-1]
+        valid = _valid_length(path)
+        if valid < os.path.getsize(path):
+            with open(path, "r+b") as f:
+                f.truncate(valid)
+            print(f"[Journal] ⚠️ Dropped a torn record at the end of {os.path.basename(path)}")
+        for index in range(len(segments) - 1, -1, -1):
+            records = list(read_segment(segments[index][1]))
+            if records:
+                self.last_seq = records[-1][0]
+                return
+
+    def _open_segment(self, first_seq):
+        self._close_segment()
+        path = os.path.join(self.root, self.timeline, f"seg_{first_seq:016d}.bin")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._file = open(path, "ab")
+        if self._file.tell() == 0:
+            self._file.write(SEGMENT_MAGIC)
+        self._file_path = path
+
+    def append(self, rows):
+        """
+        Append change_log rows (id, ts, tbl, op, row_id, data-json) and fsync.
+        Rows at or below last_seq (already shipped before a crash) are skipped.
+        Returns the highest seq now durable in the journal.
+        """
+        with self.lock:
+            if self.last_seq is None:
+                self._recover_tail()
+            for seq, ts, table, op, row_id, data in rows:
+                if seq <= self.last_seq:
+                    continue
+                if self._file is None or self._file.tell() >= self.segment_bytes:
+                    self._open_segment(seq)
+                if data is None:
+                    payload = b""
+                else:
+                    row = json.loads(data)
+                    columns = list(row)
+                    if self._schemas.get(table) != columns:
+                        # Column names go once per segment, values alone after that
+                        self._file.write(_pack_record(seq, ts, table, "S", 0, encode_values(columns)))
+                        self._schemas[table] = columns
+                    payload = encode_values(list(row.values()))
+                self._file.write(_pack_record(seq, ts, table, op, row_id, payload))
+                self.last_seq = seq
+            if self._file is not None:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+            return self.last_seq
+
+    # reading
+    def iter_changes(self, timeline, after_seq=0, until_ts=None):
+        """Yield (seq, ts, table, op, row_id, {column: value}) in order."""
+        segments = self.segments(timeline)
+        for index, (first_seq, path) in enumerate(segments):
+            next_first = segments[index + 1][0] if index + 1 < len(segments) else None
+            if next_first is not None and next_first <= after_seq + 1:
+                continue   # the whole segment is already in the snapshot
+            schemas = {}
+            for seq, ts, table, op, row_id, payload in read_segment(path):
+                if op == "S":
+                    schemas[table] = decode_values(payload)
+                    continue
+                if seq <= after_seq:
+                    continue
+                if until_ts is not None and ts > until_ts:
+                    return
+                row = dict(zip(schemas[table], decode_values(payload))) if payload else None
+                yield seq, ts, table, op, row_id, row
+
+    def prune(self, keep_from):
+        """
+        Drop journal data no restore point needs. keep_from maps timeline ->
+        lowest snapshot seq still referenced; other timelines (except the
+        current one) are deleted whole.
+        """
+        with self.lock:
+            for timeline in self.timelines():
+                if timeline == self.timeline and timeline not in keep_from:
+                    continue
+                if timeline not in keep_from:
+                    shutil.rmtree(os.path.join(self.root, timeline), ignore_errors=True)
+                    continue
+                segments = self.segments(timeline)
+                for index, (first_seq, path) in enumerate(segments[:-1]):
+                    # Segment i ends right before segment i+1 begins
+                    if segments[index + 1][0] - 1 <= keep_from[timeline] and path != self._file_path:
+                        os.remove(path)
+
+
+_journal = None
+_journal_lock = threading.Lock()
+
+
+def get_journal():
+    global _journal
+    if _journal is None:
+        with _journal_lock:
+            if _journal is None:
+                _journal = Journal()
+    return _journal
+
+
+# ----- shipping change_log -> segments -----
+def ship_changes():
+    """Move committed change_log rows into the journal; returns how many were shipped."""
+    journal = get_journal()
+    shipped = 0
+    with journal.lock:
+        while True:
+            conn = get_read_connection()
+            try:
+                rows = conn.execute(
+                    "SELECT id, ts, tbl, op, row_id, data FROM change_log ORDER BY id LIMIT ?", (SHIP_BATCH,)
+                ).fetchall()
+            except sqlite3.OperationalError:
+                return shipped   # change_log not created yet (pre-migration DB)
+            finally:
+                conn.close()
+            if not rows:
+                return shipped
+            durable = journal.append(rows)
+            # Only after the segment is fsynced may the rows leave the DB
+            execute_write("DELETE FROM change_log WHERE id <= ?", (durable,)).result()
+            shipped += len(rows)
+            if len(rows) < SHIP_BATCH:
+                return shipped
+
+
+class JournalShipper:
+    def __init__(self, interval_s=JOURNAL_INTERVAL_S):
+        self.interval_s = interval_s
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="journal-shipper", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval_s):
+            try:
+                ship_changes()
+            except Exception as e:
+                print(f"[Journal] ⚠️ Shipping failed: {e}")
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        self._thread.join(timeout)
+
+
+_shipper = None
+
+
+def start_journal_shipper():
+    global _shipper
+    if _shipper is None:
+        _shipper = JournalShipper()
+    return _shipper
+
+
+def stop_journal_shipper():
+    """Stop the background shipper and ship whatever is left."""
+    global _shipper
+    shipper, _shipper = _shipper, None
+    if shipper is not None:
+        shipper.stop()
+        try:
+            ship_changes()
+        except Exception as e:
+            print(f"[Journal] ⚠️ Final shipping failed: {e}")
+
+
+atexit.register(stop_journal_shipper)
+
+
+# ----- replay -----
+def replay_into(db_path, timeline, after_seq, until_ts):
+    """
+    Apply journaled changes (after_seq, until_ts] to a database file that
+    is not live (a restored snapshot). Rows are full images, so replay is
+    idempotent. Returns the number of changes applied.
+    """
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    applied = 0
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        for seq, ts, table, op, row_id, row in get_journal().iter_changes(timeline, after_seq, until_ts):
+            if op == "D":
+                conn.execute(f"DELETE FROM {table} WHERE id = ?", (row_id,))
+            else:
+                columns = list(row)
+                conn.execute(
+                    f"INSERT OR REPLACE INTO {table} ({', '.join(columns)}) "
+                    f"VALUES ({', '.join('?' for _ in columns)})",
+                    list(row.values())
+                )
+            applied += 1
+        conn.execute("COMMIT")
+    except BaseException:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+    return applied
+
+
+def journal_position(conn):
+    """Last change_log seq a connection's (snapshot's) data includes."""
+    try:
+        row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'change_log'").fetchone()
+    except sqlite3.OperationalError:
+        return 0
+    return row[0] if row else 0
@@ -0,0 +1,176 @@
+import bz2
+import lzma
+import os
+import tempfile
+import time
+import zipfile
+import zlib
+from utils.app_config import get_config
+
+try:
+    import zstandard
+except ImportError:   # optional: pip install zstandard
+    zstandard = None
+
+# ----------------- Backup compression codecs ----------------- #
+# Every compressed blob the backup code writes (store chunks, cloud uploads)
+# starts with one tag byte naming its encoding, so the codec setting can be
+# changed at any time: old data still decodes, new data uses the new codec.
+# Levels don't need their own tag - any deflate level decodes the same way.
+#
+# Pick with {"backup_codec": "deflate-1"} in config/app_config.json (or
+# INVENTORY_BACKUP_CODEC); `python -m utils.backup_store benchmark` shows
+# what each codec costs on this machine's database.
+
+BACKUP_CODEC = get_config("backup_codec", "deflate-6")
+BENCHMARK_SAMPLE_BYTES = 32 * 1024 * 1024   # enough to be representative, quick on a slow till
+
+
+class Codec:
+    def __init__(self, name, tag, compress, decompress, zip_method=zipfile.ZIP_DEFLATED, zip_level=None,
+                 available=True):
+        self.name = name
+        self.tag = tag
+        self.compress = compress
+        self.decompress = decompress
+        self.zip_method = zip_method   # closest zipfile equivalent, for zipped backups
+        self.zip_level = zip_level
+        self.available = available
+
+    def encode(self, data):
+        """Tagged payload; falls back to "store" when compressing doesn't pay off."""
+        if self.tag != TAG_STORE:
+            packed = self.compress(data)
+            if len(packed) < len(data):
+                return self.tag + packed
+        return TAG_STORE + data
+
+
+TAG_STORE = b"S"
+TAG_DEFLATE = b"Z"
+TAG_BZ2 = b"B"
+TAG_LZMA = b"X"
+TAG_ZSTD = b"D"
+
+
+def _zstd_compress(level):
+    def compress(data):
+        return zstandard.ZstdCompressor(level=level).compress(data)
+    return compress
+
+
+def _zstd_decompress(data):
+    if zstandard is None:
+        raise ValueError("Data is zstd-compressed but the zstandard package is not installed")
+    return zstandard.ZstdDecompressor().decompress(data)
+
+
+def _deflate(level):
+    return Codec(f"deflate-{level}", TAG_DEFLATE, lambda data: zlib.compress(data, level), zlib.decompress,
+                 zipfile.ZIP_DEFLATED, level)
+
+
+def _zstd(level):
+    # zipfile can't write zstd; zipped backups use deflate instead
+    return Codec(f"zstd-{level}", TAG_ZSTD, _zstd_compress(level), _zstd_decompress,
+                 zipfile.ZIP_DEFLATED, 6, available=zstandard is not None)
+
+
+CODECS = {codec.name: codec for codec in (
+    Codec("store", TAG_STORE, bytes, bytes, zipfile.ZIP_STORED),
+    _deflate(1),
+    _deflate(6),
+    _deflate(9),
+    Codec("bz2", TAG_BZ2, lambda data: bz2.compress(data, 9), bz2.decompress, zipfile.ZIP_BZIP2),
+    Codec("lzma", TAG_LZMA, lambda data: lzma.compress(data, preset=6), lzma.decompress, zipfile.ZIP_LZMA),
+    _zstd(3),
+    _zstd(19),
+)}
+
+_DECODERS = {
+    TAG_STORE: bytes,
+    TAG_DEFLATE: zlib.decompress,
+    TAG_BZ2: bz2.decompress,
+    TAG_LZMA: lzma.decompress,
+    TAG_ZSTD: _zstd_decompress,
+}
+
+
+def available_codecs():
+    return [name for name, codec in CODECS.items() if codec.available]
+
+
+def get_codec(name=None):
+    """The configured codec (or name); unknown/unavailable codecs fall back to deflate-6."""
+    name = name or BACKUP_CODEC
+    codec = CODECS.get(name)
+    if codec is None or not codec.available:
+        print(f"[Backup] ⚠️ Compression codec '{name}' is not available, using deflate-6")
+        codec = CODECS["deflate-6"]
+    return codec
+
+
+def decode(payload):
+    """Bytes of a tagged payload written by any codec."""
+    tag, body = payload[:1], payload[1:]
+    decoder = _DECODERS.get(tag)
+    if decoder is None:
+        raise ValueError(f"Unknown compression tag {tag!r}")
+    return decoder(body)
+
+
+# ----------------- Throughput benchmark ----------------- #
+def benchmark(path=None, codecs=None, sample_bytes=BENCHMARK_SAMPLE_BYTES):
+    """
+    Run each codec over the backup chunks of a database (default: a fresh
+    snapshot of the live DB) and return one result dict per codec:
+    ratio, compress MB/s and decompress MB/s.
+    """
+    from utils.backup_store import iter_chunks   # backup_store imports this module
+
+    snapshot = None
+    if path is None:
+        from utils.backup import BACKUP_DIR, snapshot_database
+        os.makedirs(BACKUP_DIR, exist_ok=True)
+        fd, snapshot = tempfile.mkstemp(prefix="bench_", suffix=".db", dir=BACKUP_DIR)
+        os.close(fd)
+        path = snapshot_database(snapshot)
+    try:
+        chunks, total = [], 0
+        for chunk in iter_chunks(path):
+            chunks.append(chunk)
+            total += len(chunk)
+            if total >= sample_bytes:
+                break
+    finally:
+        if snapshot and os.path.exists(snapshot):
+            os.remove(snapshot)
+
+    results = []
+    for name in codecs or available_codecs():
+        codec = get_codec(name)
+        start = time.perf_counter()
+        packed = [codec.encode(chunk) for chunk in chunks]
+        compress_s = time.perf_counter() - start
+        start = time.perf_counter()
+        for payload in packed:
+            decode(payload)
+        decompress_s = time.perf_counter() - start
+        stored = sum(len(payload) for payload in packed)
+        results.append({
+            "codec": codec.name,
+            "input_mb": round(total / 1e6, 2),
+            "ratio": round(total / stored, 2) if stored else 0.0,
+            "compress_mb_s": round(total / 1e6 / compress_s, 1) if compress_s else 0.0,
+            "decompress_mb_s": round(total / 1e6 / decompress_s, 1) if decompress_s else 0.0,
+        })
+    return results
+
+
+def print_benchmark(results):
+    print(f"{'codec':<10} {'ratio':>7} {'compress MB/s':>14} {'decompress MB/s':>16}")
+    for r in results:
+        marker = "  <- current" if r["codec"] == get_codec().name else ""
+        print(f"{r['codec']:<10} {r['ratio']:>7.2f} {r['compress_mb_s']:>14.1f} {r['decompress_mb_s']:>16.1f}{marker}")
+    if results:
+        print(f"(sample: {results[0]['input_mb']} MB of backup chunks)")
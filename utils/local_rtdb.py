@@ -0,0 +1,219 @@
+import copy
+import json
+import os
+import queue
+import threading
+
+# ----------------- Local Realtime Database stand-in ----------------- #
+# Implements the part of pyrebase's Database API the app uses (child, get,
+# set, update, remove, shallow, stream) on a JSON file, so cloud backup and
+# sync can run and be tested without Firebase. Select it with
+# {"cloud_backend": "local"} in config/app_config.json; utils/rtdb_server.py
+# serves the same tree over the RTDB REST/SSE protocol.
+
+
+class LocalResponse:
+    def __init__(self, key, value):
+        self._key = key
+        self._value = value
+
+    def key(self):
+        return self._key
+
+    def val(self):
+        return self._value
+
+    def each(self):
+        """Children as responses (None when the node is empty), like pyrebase."""
+        if not isinstance(self._value, dict):
+            return None
+        return [LocalResponse(k, v) for k, v in self._value.items()]
+
+
+def _split(path):
+    return [part for part in str(path).split("/") if part]
+
+
+def _prune(value):
+    """RTDB drops empty containers and nulls."""
+    if isinstance(value, dict):
+        cleaned = {str(k): _prune(v) for k, v in value.items()}
+        cleaned = {k: v for k, v in cleaned.items() if v is not None}
+        return cleaned or None
+    if isinstance(value, list):
+        return _prune({str(i): v for i, v in enumerate(value)})
+    return value
+
+
+def _arrays(value):
+    """Objects keyed 0..n-1 come back as lists, as RTDB returns them."""
+    if not isinstance(value, dict):
+        return value
+    value = {k: _arrays(v) for k, v in value.items()}
+    if all(k.isdigit() for k in value) and sorted(map(int, value)) == list(range(len(value))):
+        return [value[str(i)] for i in range(len(value))]
+    return value
+
+
+def _relative(keys):
+    return "/" + "/".join(keys)
+
+
+class LocalStream:
+    """Delivers events to a handler on its own thread, like pyrebase's Stream."""
+
+    def __init__(self, db, keys, handler):
+        self.db = db
+        self.keys = keys
+        self.handler = handler
+        self._events = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="local-rtdb-stream", daemon=True)
+        self._thread.start()
+
+    def send(self, event, path, data):
+        self._events.put({"event": event, "path": path, "data": data})
+
+    def _run(self):
+        while True:
+            message = self._events.get()
+            if message is None:
+                return
+            try:
+                self.handler(message)
+            except Exception as e:
+                print(f"⚠️ Stream handler error: {e}")
+
+    def close(self):
+        self.db.unsubscribe(self)
+        self._events.put(None)
+
+
+class LocalRTDB:
+    def __init__(self, path=None, persist=True):
+        self.path = path if persist else None   # None = in memory only
+        self._lock = threading.RLock()
+        self._root = None
+        self._streams = []
+        if path and os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self._root = json.load(f)
+
+    def child(self, *parts):
+        return LocalRef(self, [p for part in parts for p in _split(part)])
+
+    # ----- tree operations (paths are lists of keys) -----
+    def _save(self):
+        if not self.path:
+            return
+        tmp = self.path + ".part"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self._root, f)
+        os.replace(tmp, self.path)
+
+    def read(self, keys):
+        with self._lock:
+            node = self._root
+            for key in keys:
+                if not isinstance(node, dict) or key not in node:
+                    return None
+                node = node[key]
+            return _arrays(copy.deepcopy(node))
+
+    def _write(self, keys, value):
+        value = _prune(copy.deepcopy(value))
+        if not keys:
+            self._root = value
+            return
+        if not isinstance(self._root, dict):
+            self._root = {}
+        parents, node = [], self._root
+        for key in keys[:-1]:
+            if not isinstance(node.get(key), dict):
+                node[key] = {}
+            parents.append((node, key))
+            node = node[key]
+        if value is None:
+            node.pop(keys[-1], None)
+            # Remove parents left empty, as RTDB does
+            while not node and parents:
+                parent, key = parents.pop()
+                parent.pop(key, None)
+                node = parent
+            if not self._root:
+                self._root = None
+        else:
+            node[keys[-1]] = value
+
+    def write(self, keys, value):
+        with self._lock:
+            self._write(keys, value)
+            self._save()
+            self._notify_put(keys, value)
+
+    def update(self, keys, values):
+        """Multi-path update: every key of values is a path relative to keys."""
+        with self._lock:
+            for path, value in values.items():
+                self._write(keys + _split(path), value)
+            self._save()
+            for stream in self._streams:
+                if keys[:len(stream.keys)] == stream.keys:
+                    stream.send("patch", _relative(keys[len(stream.keys):]), copy.deepcopy(values))
+                else:
+                    for path, value in values.items():
+                        self._notify_put(keys + _split(path), value, [stream])
+
+    # ----- streaming -----
+    def subscribe(self, keys, handler):
+        """Stream of put/patch events under keys; starts with the current value at "/"."""
+        with self._lock:
+            stream = LocalStream(self, keys, handler)
+            stream.send("put", "/", self.read(keys))
+            self._streams.append(stream)
+            return stream
+
+    def unsubscribe(self, stream):
+        with self._lock:
+            if stream in self._streams:
+                self._streams.remove(stream)
+
+    def _notify_put(self, keys, value, streams=None):
+        for stream in streams or self._streams:
+            if keys[:len(stream.keys)] == stream.keys:
+                stream.send("put", _relative(keys[len(stream.keys):]), _prune(copy.deepcopy(value)))
+            elif stream.keys[:len(keys)] == keys:
+                # Written above the listener: it sees its whole node replaced
+                stream.send("put", "/", self.read(stream.keys))
+
+
+class LocalRef:
+    def __init__(self, db, keys, shallow=False):
+        self.db = db
+        self.keys = keys
+        self._shallow = shallow
+
+    def child(self, *parts):
+        return LocalRef(self.db, self.keys + [p for part in parts for p in _split(part)])
+
+    def shallow(self):
+        return LocalRef(self.db, self.keys, shallow=True)
+
+    def get(self):
+        value = self.db.read(self.keys)
+        if self._shallow and isinstance(value, dict):
+            value = set(value)
+        return LocalResponse(self.keys[-1] if self.keys else None, value)
+
+    def set(self, value):
+        self.db.write(self.keys, value)
+        return value
+
+    def update(self, values):
+        self.db.update(self.keys, values)
+        return values
+
+    def remove(self):
+        self.db.write(self.keys, None)
+
+    def stream(self, handler, token=None, stream_id=None):
+        return self.db.subscribe(self.keys, handler)
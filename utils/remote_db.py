@@ -0,0 +1,58 @@
+import os
+import threading
+from utils.app_config import get_config
+
+# ----------------- Remote database (sync backend) selection ----------------- #
+# Everything that talks to the Realtime Database goes through get_remote_db().
+# A backend is any object with the subset of pyrebase's Database API the app
+# uses: child(*path) returning a ref with get() (-> .val()/.each()), set(),
+# update() (multi-path), remove(), shallow() and stream(handler).
+#
+#   "firebase" (default)  pyrebase client from firebase_config
+#   "rest"                utils/rtdb_rest.py against rtdb_url (e.g. utils/rtdb_server.py)
+#   "local"               utils/local_rtdb.py, a JSON file in-process
+#
+# pyrebase builds the request path on the Database object itself
+# (db.child("a").child("b").get()), so one object must never be shared
+# between threads: every thread gets its own firebase.database().
+
+CLOUD_BACKEND = get_config("cloud_backend", "firebase")
+RTDB_URL = get_config("rtdb_url", "http://127.0.0.1:8765")
+LOCAL_RTDB_PATH = get_config(
+    "local_rtdb_path", os.path.join(os.path.dirname(__file__), "..", "backups", "local_rtdb.json")
+)
+
+_shared = None
+_shared_lock = threading.Lock()
+_threads = threading.local()
+
+
+def _create_shared():
+    if CLOUD_BACKEND == "rest":
+        from utils.rtdb_rest import RestRTDB
+        return RestRTDB(RTDB_URL)
+    from utils.local_rtdb import LocalRTDB
+    return LocalRTDB(os.path.abspath(LOCAL_RTDB_PATH))
+
+
+def get_remote_db():
+    """The remote database client for the calling thread."""
+    global _shared
+    if CLOUD_BACKEND != "firebase" or _shared is not None:
+        if _shared is None:
+            with _shared_lock:
+                if _shared is None:
+                    _shared = _create_shared()
+        return _shared   # thread-safe: refs are immutable
+
+    db = getattr(_threads, "db", None)
+    if db is None:
+        from firebase_config import firebase
+        db = _threads.db = firebase.database()
+    return db
+
+
+def set_remote_db(db):
+    """Use a thread-safe backend instead of the configured one (tests, benchmarks)."""
+    global _shared
+    _shared = db
@@ -0,0 +1,229 @@
+import os
+import shutil
+import sqlite3
+import zipfile
+from datetime import datetime
+
+import db.database as database
+from db.archive import drop_archived_from_hot
+from db.migrations import SCHEMA_VERSION, invalidate_schema, run_migrations
+from db.writer import stop_writer
+from db.timestamps import to_epoch
+from utils.backup import BACKUP_LOCK, auto_backup, snapshot_database
+from utils.backup_store import BackupStoreError, get_backup_store
+from utils.change_journal import get_journal, replay_into, ship_changes
+
+# ----------------- Restore pipeline ----------------- #
+# 1. stream the backup (zip member, .db file or store restore point) into
+#    one temp file next to the live DB - no extracted copy in backups/
+# 2. verify it (integrity_check, known schema version, core tables) before
+#    anything writes to it, then clear its change_log
+# 3. save the current DB as a "pre-restore" point in the backup store
+# 4. drain the pools + writer, swap the file with os.replace, reopen live
+# 5. start a new journal timeline, drop restored sales that already live in
+#    yearly archives, and take a fresh restore point from it
+#
+# restore_to_time() does the same with the newest restore point before the
+# target time, after replaying the change journal onto it up to that time.
+
+RESTORE_BUFFER = 1024 * 1024
+REQUIRED_TABLES = ("products", "sales", "transactions", "users")
+
+
+class RestoreError(Exception):
+    pass
+
+
+def _stream_to(source, dest_path):
+    """Write the backup's database bytes to dest_path without intermediate copies."""
+    with open(dest_path, "wb") as out:
+        if os.path.isfile(source) and zipfile.is_zipfile(source):
+            with zipfile.ZipFile(source) as zipf:
+                if "inventory.db" not in zipf.namelist():
+                    raise RestoreError("This backup does not contain inventory.db")
+                with zipf.open("inventory.db") as member:
+                    shutil.copyfileobj(member, out, RESTORE_BUFFER)
+        elif os.path.isfile(source):
+            with open(source, "rb") as f:
+                shutil.copyfileobj(f, out, RESTORE_BUFFER)
+        else:
+            # Not a file: a restore point id in the backup store
+            try:
+                for chunk in get_backup_store().iter_restore(source):
+                    out.write(chunk)
+            except FileNotFoundError:
+                raise RestoreError(f"No backup file or restore point named '{source}'")
+            except BackupStoreError as e:
+                raise RestoreError(str(e))
+        out.flush()
+        os.fsync(out.fileno())
+
+
+def verify_database_file(path):
+    """Check a candidate DB before it goes live; returns its schema version."""
+    try:
+        conn = sqlite3.connect(path)
+        try:
+            problems = [row[0] for row in conn.execute("PRAGMA integrity_check")]
+            if problems != ["ok"]:
+                raise RestoreError("Backup failed integrity check: " + "; ".join(problems[:5]))
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+            # Leave no -wal behind: the swapped-in file must be self-contained
+            conn.execute("PRAGMA journal_mode = DELETE")
+        finally:
+            conn.close()
+    except sqlite3.DatabaseError as e:
+        raise RestoreError(f"Backup is not a readable database: {e}")
+
+    if version > SCHEMA_VERSION:
+        raise RestoreError(f"Backup was made by a newer version of the app (schema {version} > {SCHEMA_VERSION})")
+    missing = [t for t in REQUIRED_TABLES if t not in tables]
+    if missing:
+        raise RestoreError(f"Backup is missing tables: {', '.join(missing)}")
+    return version
+
+
+def _swap_in(candidate_path):
+    """Replace the live DB file with candidate_path while nothing has it open."""
+    db_path = database.DB_PATH
+    if os.path.exists(db_path):
+        # Fold the old WAL into the old file so no -wal outlives the swap
+        conn = sqlite3.connect(db_path)
+        try:
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        finally:
+            conn.close()
+    for suffix in ("-wal", "-shm"):
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
+    os.replace(candidate_path, db_path)
+
+
+def _clear_change_log(path):
+    """Changes not yet shipped belong to the old timeline; the restored DB starts a clean log."""
+    conn = sqlite3.connect(path)
+    try:
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'change_log'").fetchone():
+            conn.execute("DELETE FROM change_log")
+            conn.commit()
+    finally:
+        conn.close()
+
+
+def _install(candidate, safety_backup, drain_timeout):
+    """Swap a verified candidate in under the journal lock, then reopen on a new timeline."""
+    journal = get_journal()
+    with journal.lock:   # no shipping while the DB (and its change_log) is being replaced
+        try:
+            ship_changes()   # close the old timeline with everything the live DB did
+        except Exception as e:
+            print(f"[Restore] ⚠️ Could not ship the latest changes: {e}")
+        with BACKUP_LOCK:
+            if safety_backup and os.path.exists(database.DB_PATH):
+                # Snapshot of what we're about to overwrite, as a normal restore point
+                safety_path = database.DB_PATH + ".pre-restore"
+                info = {}
+                try:
+                    snapshot_database(safety_path, info=info)
+                    get_backup_store().put_file(safety_path, label="pre-restore", meta=info)
+                finally:
+                    if os.path.exists(safety_path):
+                        os.remove(safety_path)
+
+            with database.database_offline(drain_timeout):
+                stop_writer()   # commits queued writes, closes the write connection
+                _swap_in(candidate)
+                journal.new_timeline()
+
+    invalidate_schema()
+    run_migrations()   # older backups are brought up to the current schema
+    # The archive files are not part of a restore point: a point taken before
+    # an archive run still has those years' sales in the hot table
+    dropped = drop_archived_from_hot()
+    if dropped:
+        print(f"[Restore] Dropped {dropped} restored sales that already live in yearly archives")
+    try:
+        # Point-in-time restores on the new timeline start from this snapshot
+        auto_backup()
+    except Exception as e:
+        print(f"[Restore] ⚠️ Could not save a restore point after restoring: {e}")
+
+
+def restore_database(source, safety_backup=True, drain_timeout=None):
+    """
+    Restore the live database from a backup zip, a .db file or a backup
+    store restore point id, without restarting the app. Returns a status
+    message; raises RestoreError (the live DB untouched) if the backup is bad.
+    """
+    candidate = database.DB_PATH + ".restore"
+    try:
+        _stream_to(source, candidate)
+        version = verify_database_file(candidate)   # before anything writes to the file
+        _clear_change_log(candidate)
+        _install(candidate, safety_backup, drain_timeout)
+    finally:
+        if os.path.exists(candidate):
+            os.remove(candidate)
+
+    msg = f"✅ Database restored (schema version {version}); the app is using it now."
+    print(msg)
+    return msg
+
+
+def restore_to_time(target, safety_backup=True, drain_timeout=None):
+    """
+    Point-in-time restore: rebuild the database as it was at target (a
+    datetime, epoch or timestamp string) from the newest restore point taken
+    before it plus the change journal. Returns a status message.
+    """
+    if isinstance(target, datetime):
+        target_ts = target.timestamp()
+    elif isinstance(target, (int, float)):
+        target_ts = float(target)
+    else:
+        target_ts = to_epoch(target)
+    if target_ts is None:
+        raise RestoreError(f"Unreadable restore time: {target}")
+    try:
+        ship_changes()   # the journal must hold everything up to now
+    except Exception as e:
+        print(f"[Restore] ⚠️ Could not ship the latest changes: {e}")
+
+    bases = [m for m in get_backup_store().list_backups()
+             if m.get("timeline") and m.get("snapshot_ts", float("inf")) <= target_ts]
+    if not bases:
+        raise RestoreError("No restore point with journal information exists before that time")
+    base = max(bases, key=lambda m: m["snapshot_ts"])
+
+    candidate = database.DB_PATH + ".restore"
+    try:
+        _stream_to(base["id"], candidate)
+        verify_database_file(candidate)   # before anything writes to the file
+        applied = replay_into(candidate, base["timeline"], base["journal_seq"], target_ts)
+        _clear_change_log(candidate)
+        version = verify_database_file(candidate)
+        _install(candidate, safety_backup, drain_timeout)
+    finally:
+        if os.path.exists(candidate):
+            os.remove(candidate)
+
+    when = datetime.fromtimestamp(target_ts).strftime("%Y-%m-%d %H:%M:%S")
+    msg = (f"✅ Database restored to {when} (restore point {base['id']} + {applied} journaled changes, "
+           f"schema version {version}); the app is using it now.")
+    print(msg)
+    return msg
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Restore the database from a backup or to a point in time.")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--source", help="backup zip, .db file or restore point id")
+    group.add_argument("--to-time", help="'YYYY-MM-DD HH:MM:SS' to restore to")
+    args = parser.parse_args()
+    try:
+        restore_to_time(args.to_time) if args.to_time else restore_database(args.source)
+    except RestoreError as e:
+        print(f"❌ {e}")
@@ -0,0 +1,153 @@
+import http.client
+import json
+import socket
+import threading
+import time
+from urllib.parse import quote, urlencode, urlsplit
+from utils.local_rtdb import LocalResponse
+
+# ----------------- RTDB REST client ----------------- #
+# Talks the Realtime Database REST protocol directly (GET/PUT/PATCH/DELETE
+# on <url>/<path>.json, text/event-stream for streaming) with one
+# keep-alive connection per thread. Works against Firebase itself and
+# against the local stand-in in utils/rtdb_server.py.
+
+
+class RestError(Exception):
+    pass
+
+
+class RestRTDB:
+    def __init__(self, url, auth_token=None, timeout=30):
+        parts = urlsplit(url)
+        self.scheme = parts.scheme or "http"
+        self.netloc = parts.netloc
+        self.base_path = parts.path.rstrip("/")
+        self.auth_token = auth_token
+        self.timeout = timeout
+        self._threads = threading.local()
+
+    def child(self, *parts):
+        return RestRef(self, [p for part in parts for p in str(part).split("/") if p])
+
+    # ----- transport -----
+    def _connect(self, timeout=None):
+        cls = http.client.HTTPSConnection if self.scheme == "https" else http.client.HTTPConnection
+        return cls(self.netloc, timeout=timeout or self.timeout)
+
+    def url_for(self, keys, **params):
+        if self.auth_token:
+            params["auth"] = self.auth_token
+        path = f"{self.base_path}/{'/'.join(quote(k, safe='') for k in keys)}.json"
+        return path + ("?" + urlencode(params) if params else "")
+
+    def request(self, method, keys, body=None, **params):
+        payload = None if body is None else json.dumps(body).encode("utf-8")
+        headers = {"Content-Type": "application/json"} if payload is not None else {}
+        for attempt in (1, 2):
+            conn = getattr(self._threads, "conn", None)
+            if conn is None:
+                conn = self._threads.conn = self._connect()
+            try:
+                conn.request(method, self.url_for(keys, **params), body=payload, headers=headers)
+                response = conn.getresponse()
+                data = response.read()
+            except (http.client.HTTPException, OSError):
+                # Stale keep-alive connection: reconnect once
+                conn.close()
+                self._threads.conn = None
+                if attempt == 2:
+                    raise
+                continue
+            if response.status >= 400:
+                raise RestError(f"{method} /{'/'.join(keys)}: HTTP {response.status} {data[:200]!r}")
+            return json.loads(data) if data else None
+
+
+class RestRef:
+    def __init__(self, db, keys, shallow=False):
+        self.db = db
+        self.keys = keys
+        self._shallow = shallow
+
+    def child(self, *parts):
+        return RestRef(self.db, self.keys + [p for part in parts for p in str(part).split("/") if p])
+
+    def shallow(self):
+        return RestRef(self.db, self.keys, shallow=True)
+
+    def get(self):
+        if self._shallow:
+            value = self.db.request("GET", self.keys, shallow="true")
+            value = set(value) if isinstance(value, dict) else value
+        else:
+            value = self.db.request("GET", self.keys)
+        return LocalResponse(self.keys[-1] if self.keys else None, value)
+
+    def set(self, value):
+        return self.db.request("PUT", self.keys, value)
+
+    def update(self, values):
+        return self.db.request("PATCH", self.keys, values)
+
+    def remove(self):
+        self.db.request("DELETE", self.keys)
+
+    def stream(self, handler, token=None, stream_id=None):
+        return RestStream(self.db, self.keys, handler)
+
+
+class RestStream:
+    """Server-sent events for one path; the handler gets {"event", "path", "data"} like pyrebase."""
+
+    def __init__(self, db, keys, handler):
+        self.db = db
+        self.keys = keys
+        self.handler = handler
+        self._closed = threading.Event()
+        self._conn = None
+        self._thread = threading.Thread(target=self._run, name="rtdb-stream", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._closed.is_set():
+            try:
+                self._listen()
+            except Exception as e:
+                if self._closed.is_set():
+                    return
+                print(f"⚠️ Stream /{'/'.join(self.keys)} dropped ({e}); reconnecting...")
+                time.sleep(1)
+
+    def _listen(self):
+        # No read timeout: the server sends keep-alives, and close() shuts the socket
+        self._conn = conn = self.db._connect(timeout=None)
+        conn.request("GET", self.db.url_for(self.keys), headers={"Accept": "text/event-stream"})
+        response = conn.getresponse()
+        if response.status >= 400:
+            raise RestError(f"HTTP {response.status}")
+        event = None
+        for raw in response:
+            line = raw.decode("utf-8").rstrip("\r\n")
+            if line.startswith("event:"):
+                event = line[6:].strip()
+            elif line.startswith("data:") and event in ("put", "patch"):
+                message = json.loads(line[5:].strip())
+                try:
+                    self.handler({"event": event, "path": message["path"], "data": message["data"]})
+                except Exception as e:
+                    print(f"⚠️ Stream handler error: {e}")
+            elif line.startswith("data:") and event in ("cancel", "auth_revoked"):
+                raise RestError(f"stream {event}")
+        if not self._closed.is_set():
+            raise RestError("server closed the stream")
+
+    def close(self):
+        self._closed.set()
+        conn = self._conn
+        if conn is not None and conn.sock is not None:
+            try:
+                conn.sock.shutdown(socket.SHUT_RDWR)   # unblocks the reader thread
+            except OSError:
+                pass
+            conn.close()
@@ -0,0 +1,183 @@
+import json
+import queue
+import socket
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+from utils.local_rtdb import LocalRTDB
+
+# ----------------- Local Realtime Database server ----------------- #
+# Serves a LocalRTDB tree over the subset of the RTDB REST + streaming
+# protocol pyrebase (and utils/rtdb_rest.py) use:
+#
+#   GET    /<path>.json[?shallow=true]    value (or {key: true} for shallow)
+#   GET    with Accept: text/event-stream  put/patch events, keep-alive every 30 s
+#   PUT / PATCH / DELETE / POST           set / multi-path update / remove / push
+#
+# The ?auth= token is accepted and ignored. latency_ms delays every request
+# and bandwidth_kbps throttles bodies both ways, so sync can be measured as
+# if a real network were in between.
+#
+#   python -m utils.rtdb_server --port 8765 --latency-ms 40 --bandwidth-kbps 2000
+
+KEEP_ALIVE_S = 30
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "LocalRTDB/1.0"
+
+    def setup(self):
+        super().setup()
+        # Headers and body go out in separate writes; don't let Nagle hold the body back
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def log_message(self, format, *args):
+        pass   # one line per request would drown the benchmarks
+
+    # ----- helpers -----
+    def _keys(self):
+        parts = urlsplit(self.path)
+        path = unquote(parts.path)
+        if path.endswith(".json"):
+            path = path[:-5]
+        return [p for p in path.split("/") if p], parse_qs(parts.query)
+
+    def _throttle(self, size):
+        bandwidth = self.server.bandwidth_bps
+        if bandwidth:
+            time.sleep(size / bandwidth)
+
+    def _read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        data = self.rfile.read(length) if length else b""
+        self._throttle(len(data))
+        return json.loads(data) if data else None
+
+    def _reply(self, value, status=200):
+        body = json.dumps(value).encode("utf-8")
+        self._throttle(len(body))
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _delay(self):
+        if self.server.latency_s:
+            time.sleep(self.server.latency_s)
+
+    # ----- verbs -----
+    def do_GET(self):
+        self._delay()
+        keys, query = self._keys()
+        if "text/event-stream" in (self.headers.get("Accept") or ""):
+            return self._stream(keys)
+        value = self.server.db.read(keys)
+        if query.get("shallow") == ["true"] and isinstance(value, dict):
+            value = {key: True for key in value}
+        self._reply(value)
+
+    def do_PUT(self):
+        self._delay()
+        keys, _ = self._keys()
+        value = self._read_body()
+        self.server.db.write(keys, value)
+        self._reply(value)
+
+    def do_PATCH(self):
+        self._delay()
+        keys, _ = self._keys()
+        values = self._read_body() or {}
+        self.server.db.update(keys, values)
+        self._reply(values)
+
+    def do_DELETE(self):
+        self._delay()
+        keys, _ = self._keys()
+        self.server.db.write(keys, None)
+        self._reply(None)
+
+    def do_POST(self):
+        self._delay()
+        keys, _ = self._keys()
+        value = self._read_body()
+        name = f"-{int(time.time() * 1000):x}{uuid.uuid4().hex[:8]}"
+        self.server.db.write(keys + [name], value)
+        self._reply({"name": name})
+
+    def _stream(self, keys):
+        events = queue.Queue()
+        stream = self.server.db.subscribe(keys, events.put)
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        try:
+            while not self.server.stopping.is_set():
+                try:
+                    message = events.get(timeout=KEEP_ALIVE_S)
+                except queue.Empty:
+                    self.wfile.write(b"event: keep-alive\ndata: null\n\n")
+                    self.wfile.flush()
+                    continue
+                data = json.dumps({"path": message["path"], "data": message["data"]}).encode("utf-8")
+                self._throttle(len(data))
+                self.wfile.write(b"event: " + message["event"].encode("ascii") + b"\ndata: " + data + b"\n\n")
+                self.wfile.flush()
+        except OSError:
+            pass   # client went away
+        finally:
+            stream.close()
+
+
+class RTDBServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, db=None, host="127.0.0.1", port=0, latency_ms=0, bandwidth_kbps=0):
+        super().__init__((host, port), _Handler)
+        self.db = db if db is not None else LocalRTDB()
+        self.latency_s = latency_ms / 1000.0
+        self.bandwidth_bps = bandwidth_kbps * 1024 / 8 if bandwidth_kbps else 0
+        self.stopping = threading.Event()
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        """Serve on a background thread; returns self."""
+        self._thread = threading.Thread(target=self.serve_forever, name="rtdb-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.stopping.set()
+        self.shutdown()
+        self.server_close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Local stand-in for the Firebase Realtime Database.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--data", help="JSON file holding the tree (created if missing)")
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--bandwidth-kbps", type=float, default=0, help="0 = unlimited")
+    args = parser.parse_args()
+
+    server = RTDBServer(LocalRTDB(args.data), args.host, args.port, args.latency_ms, args.bandwidth_kbps)
+    print(f"🔥 Local RTDB serving {args.data or '(memory)'} at {server.url} "
+          f"(latency {args.latency_ms:g} ms, bandwidth {args.bandwidth_kbps or 'unlimited'} kbps)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()